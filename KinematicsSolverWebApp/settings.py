@@ -56,6 +56,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -100,11 +101,37 @@ DATABASES = {
         'NAME': os.environ.get('POSTGRES_NAME'),
         'USER': os.environ.get('POSTGRES_USER'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
-        'HOST': 'db',
-        'PORT': 5432,
+        'HOST': os.environ.get('POSTGRES_HOST', 'db'),
+        'PORT': int(os.environ.get('POSTGRES_PORT', 5432)),
     }
 }
 
+# Local runs without Postgres, e.g. load tests: SQLITE_NAME=db.sqlite3 python manage.py runserver
+
+if os.environ.get('SQLITE_NAME'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, os.environ['SQLITE_NAME']),
+    }
+
+# Cache shared by all worker processes: throttle buckets, live jog states, workspace tiles, profiling reports.
+# Redis when REDIS_URL is set (needs the redis package), otherwise files in CACHE_DIR shared by workers of one host
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -151,6 +178,107 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MEDIA_ROOT = BASE_DIR / 'static/img/avatars/'
 
+# Shared on disk precomputations of robots (workspaces, lookup tables)
+
+KINEMATICS_ARTIFACT_DIR = os.environ.get('KINEMATICS_ARTIFACT_DIR', os.path.join(BASE_DIR, 'artifacts'))
+
+# Size limit of all artifacts [MB], the least recently used ones are removed when it is exceeded (0 - no limit),
+# and number of memory maps every worker keeps open
+
+KINEMATICS_ARTIFACT_MAX_MB = float(os.environ.get('KINEMATICS_ARTIFACT_MAX_MB', 2048))
+
+KINEMATICS_ARTIFACT_MAX_OPENED = 32
+
+# Joint values per joint of the dense workspace sample, lowered for robots with many joints so the sample has
+# at most MAX_POINTS configurations, and finest octree level streamed to the browser
+
+KINEMATICS_WORKSPACE_SAMPLES = 24
+
+KINEMATICS_WORKSPACE_MAX_POINTS = 2000000
+
+KINEMATICS_WORKSPACE_MAX_LEVEL = 7
+
+# Cells along the longer side of the radius-height manipulability heatmaps
+
+KINEMATICS_MANIPULABILITY_CELLS = 64
+
+# Kinematics backend of RoboticArm batch solvers: "numpy" (vectorized), "python" (reference) or "numba"
+# (needs the numba package, compiled code is cached in __pycache__ or NUMBA_CACHE_DIR)
+
+KINEMATICS_SOLVER_BACKEND = os.environ.get('KINEMATICS_SOLVER_BACKEND', 'numpy')
+
+# Largest number of joints of robots described by DH parameters
+
+KINEMATICS_MAX_DOF = 8
+
+# Largest number of configurations or targets of one request of batch endpoints
+
+KINEMATICS_MAX_BATCH = 10000
+
+# Multi-robot evaluation: largest number of targets solved for all robots of the project at once
+
+KINEMATICS_EVALUATE_MAX_TARGETS = 10000
+
+# Threads of every worker process calculating FK/IK records created by the forms
+
+KINEMATICS_TASK_WORKERS = 2
+
+# Seconds a record may stay pending, then its calculation is started again when its status is polled.
+# Jobs are kept only by the worker process, restart loses them. recalculate_kinematics --pending recovers all
+
+KINEMATICS_TASK_TIMEOUT = 300
+
+# Threads of every worker process building workspaces, manipulability heatmaps and lookup tables, and seconds
+# a build may stay pending before a request may start it again
+
+KINEMATICS_BUILD_WORKERS = 1
+
+KINEMATICS_BUILD_TIMEOUT = 600
+
+# Live jog mode: frames per second streamed to the browser, seconds without slider changes closing the stream
+# and open streams of every worker process (each holds a thread). Slider states are passed to the stream through
+# the cache, jog is refused with DEBUG off unless the cache is shared between worker processes.
+
+KINEMATICS_JOG_FPS = 20
+
+KINEMATICS_JOG_IDLE_TIMEOUT = 30
+
+KINEMATICS_JOG_MAX_STREAMS = 4
+
+# Motion planner: largest planning and smoothing time [s] and number of obstacles sent with one request
+
+KINEMATICS_PLANNER_TIMEOUT = 2.0
+
+KINEMATICS_PLANNER_MAX_OBSTACLES = 100
+
+# Tolerance analysis: largest number of Monte Carlo samples of all poses of one request
+
+KINEMATICS_TOLERANCE_MAX_SAMPLES = 5000000
+
+# Calibration: largest number of measured samples of one request
+
+KINEMATICS_CALIBRATION_MAX_SAMPLES = 1000000
+
+# Public api throttling: token bucket of every client holds CAPACITY tokens refilled by RATE tokens per second,
+# a call costs tokens according to its work, calls costing more than CAPACITY are rejected with 413.
+
+KINEMATICS_THROTTLE_CAPACITY = float(os.environ.get('KINEMATICS_THROTTLE_CAPACITY', 120))
+
+KINEMATICS_THROTTLE_RATE = float(os.environ.get('KINEMATICS_THROTTLE_RATE', 20))
+
+KINEMATICS_THROTTLE_CACHE = 'default'
+
+# Clients are identified by REMOTE_ADDR, set NUM_PROXIES to the number of trusted reverse proxies to use
+# X-Forwarded-For instead. Otherwise clients could choose their own identity by sending the header.
+
+REST_FRAMEWORK = {
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Request profiling of staff users (?_profile=1 or X-Profile: 1 header): seconds the report is kept in the cache
+
+KINEMATICS_PROFILE_TTL = 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
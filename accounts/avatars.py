@@ -0,0 +1,117 @@
+""" Module allows resized variants of users avatars to be generated and looked up"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Variant name: edge length in px. Sizes are 2x the css avatar classes (avatar-xs 24px, avatar-sm 36px, ...)
+AVATAR_SIZES = {
+    'xs': 48,
+    'sm': 72,
+    'md': 96,
+    'lg': 116,
+    'xl': 148,
+    'xxl': 220,
+}
+AVATAR_QUALITY = 85
+# Avatar of users without uploaded one, shared by all of them
+DEFAULT_AVATAR = 'default-avatar'
+
+
+def avatar_variant_name(name: str, size: str) -> str:
+    """
+    Name of the resized variant stored next to the original avatar. \n
+    Example: avatar_01.png -> avatar_01_48x48.jpg \n
+    :param name: Name of the original avatar file
+    :param size: Key of AVATAR_SIZES
+    :return: variant name
+    """
+    stem = os.path.splitext(name)[0]
+    edge = AVATAR_SIZES[size]
+    return '{}_{}x{}.jpg'.format(stem, edge, edge)
+
+
+def normalize_avatar(image: Image.Image) -> Image.Image:
+    """
+    Apply EXIF orientation, drop alpha channel and crop image to the centered square.\n
+    :param image: Opened avatar image
+    :return: normalized image
+    """
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+    edge = min(image.size)
+    return ImageOps.fit(image, (edge, edge), method=Image.LANCZOS)
+
+
+def create_avatar_variants(field_file, overwrite: bool = True) -> list:
+    """
+    Generate all AVATAR_SIZES variants of the avatar. Missing or broken files are skipped.\n
+    :param field_file: FieldFile of the users avatar
+    :param overwrite: Regenerate existing variants, otherwise existing variants are kept,
+     e.g. variants of DEFAULT_AVATAR shared by many users
+    :return: list of variant names
+    """
+    storage = field_file.storage
+    names = {size: avatar_variant_name(field_file.name, size) for size in AVATAR_SIZES}
+    if not overwrite and all(storage.exists(name) for name in names.values()):
+        return list(names.values())
+    created = []
+    try:
+        with storage.open(field_file.name, 'rb') as source:
+            image = normalize_avatar(Image.open(source))
+    except (OSError, ValueError):
+        return created
+
+    # Resize from the largest variant down, every step works on a smaller image
+    for size in sorted(AVATAR_SIZES, key=AVATAR_SIZES.get, reverse=True):
+        edge = AVATAR_SIZES[size]
+        if image.width > edge:
+            image = image.resize((edge, edge), Image.LANCZOS)
+        name = names[size]
+        if storage.exists(name):
+            if not overwrite:
+                created.append(name)
+                continue
+            storage.delete(name)
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=AVATAR_QUALITY, optimize=True, progressive=True)
+        saved = storage.save(name, ContentFile(buffer.getvalue()))
+        if saved != name:
+            # Other request saved the same variant in the meantime, storage renamed this copy
+            storage.delete(saved)
+        created.append(name)
+    return created
+
+
+def delete_avatar_variants(field_file, name: str) -> None:
+    """
+    Delete variants of the replaced avatar, variants of DEFAULT_AVATAR are shared and kept.\n
+    :param field_file: FieldFile of the users avatar, its storage is used
+    :param name: Name of the replaced avatar file
+    """
+    if not name or name == DEFAULT_AVATAR:
+        return
+    for size in AVATAR_SIZES:
+        variant = avatar_variant_name(name, size)
+        if field_file.storage.exists(variant):
+            field_file.storage.delete(variant)
+
+
+def avatar_variant_url(field_file, size: str) -> str:
+    """
+    Url of the variant, falls back to the original when variants were not generated.
+    Generated variants are recorded on the user, so storage is not queried.\n
+    :param field_file: FieldFile of the users avatar
+    :param size: Key of AVATAR_SIZES
+    :return: url
+    """
+    if not field_file:
+        return ''
+    if getattr(field_file.instance, 'avatar_variants', '') != field_file.name:
+        return field_file.url
+    return field_file.storage.url(avatar_variant_name(field_file.name, size))
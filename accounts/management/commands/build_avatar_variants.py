@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import create_avatar_variants
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    """
+        Generate resized variants for avatars uploaded before variants were introduced.
+    """
+    help = 'Generate resized avatar variants for all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate existing variants')
+
+    def handle(self, *args, **options):
+        created = 0
+        # Shared default avatar is regenerated at most once
+        regenerated = set()
+        users = User.objects.exclude(avatar__isnull=True).exclude(avatar='').only('avatar', 'avatar_variants')
+        for user in users.iterator():
+            if options['force'] or user.avatar_variants != user.avatar.name:
+                name = user.avatar.name
+                overwrite = options['force'] and name not in regenerated
+                variants = create_avatar_variants(user.avatar, overwrite)
+                regenerated.add(name)
+                created += len(variants)
+                User.objects.filter(pk=user.pk).update(avatar_variants=user.avatar.name if variants else '')
+        self.stdout.write(self.style.SUCCESS('Created {} avatar variants'.format(created)))
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-19 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_variants',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from .avatars import DEFAULT_AVATAR, create_avatar_variants, delete_avatar_variants
+
 
 class User(AbstractUser):
     username = models.CharField(
@@ -13,7 +15,30 @@ class User(AbstractUser):
     city = models.CharField(max_length=100, default='Unknown city')
     phoneNumber = models.IntegerField(default=555666333)
     bio = models.CharField(max_length=225, default='Users bio')
-    avatar = models.ImageField(null=True, default="default-avatar")
+    avatar = models.ImageField(null=True, default=DEFAULT_AVATAR)
+    # Name of the avatar the resized variants were generated from
+    avatar_variants = models.CharField(max_length=255, blank=True, default='')
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = []
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_avatar = dict(zip(field_names, values)).get('avatar')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'avatar' not in update_fields:
+            return
+        # Newly uploaded avatar gets its resized variants stored next to the original
+        name = self.avatar.name if self.avatar else ''
+        loaded = getattr(self, '_loaded_avatar', None)
+        if name and name != loaded:
+            variants = create_avatar_variants(self.avatar, overwrite=name != DEFAULT_AVATAR)
+            self.avatar_variants = name if variants else ''
+            super().save(update_fields=['avatar_variants'])
+            delete_avatar_variants(self.avatar, loaded)
+        self._loaded_avatar = name
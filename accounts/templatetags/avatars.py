@@ -0,0 +1,14 @@
+from django import template
+
+from accounts.avatars import avatar_variant_url
+
+register = template.Library()
+
+
+@register.filter
+def avatar_url(avatar, size='xs'):
+    """
+        Url of the resized avatar variant. \n
+        Usage: {{ user.avatar|avatar_url:'xs' }}
+    """
+    return avatar_variant_url(avatar, size)
@@ -0,0 +1,99 @@
+""" Module allows identical concurrent solver calls to share one in-flight computation"""
+import functools
+import json
+import threading
+
+
+class _Call:
+    """ In-flight computation, waiting callers block on the event.\n """
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """ Class allows concurrent calls with the same key to be coalesced (single-flight).
+    First caller computes the result, callers arriving before it finishes wait and get the same result.
+    Nothing is cached after the computation ends, so the next call computes again.\n """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {}
+
+    def _count(self, group: str, name: str) -> None:
+        counters = self.stats.setdefault(group, {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0})
+        counters[name] += 1
+
+    def do(self, group: str, key: str, function, *args):
+        """
+        Call function or wait for the identical call already in flight.\n
+        Results are shared between callers and must not be modified.\n
+        :param group: Name of the counters group, e.g. "fk"
+        :param key: Key of the call, equal keys must mean equal results
+        :param function: Function to call
+        :param args: Arguments of the function
+        :return: result of the function, exception of the function is raised for every caller
+        """
+        key = (group, key)
+        with self._lock:
+            self._count(group, 'calls')
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._count(group, 'executions')
+            else:
+                self._count(group, 'coalesced')
+
+        if leader:
+            try:
+                call.result = function(*args)
+            except BaseException as error:
+                # Followers get the error of any kind, e.g. KeyboardInterrupt, instead of missing result
+                call.error = error
+                with self._lock:
+                    self._count(group, 'errors')
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def metrics(self) -> dict:
+        """
+        Counters of this process.\n
+        :return: dictionary: group -> calls, executions, coalesced, errors, in_flight
+        """
+        with self._lock:
+            metrics = {group: dict(counters) for group, counters in self.stats.items()}
+            for group, _ in self._calls:
+                metrics[group]['in_flight'] = metrics[group].get('in_flight', 0) + 1
+        for counters in metrics.values():
+            counters.setdefault('in_flight', 0)
+        return metrics
+
+
+solver_flight = SingleFlight()
+
+
+def single_flight(group: str):
+    """
+    Decorator coalescing concurrent calls of the function with identical json serializable arguments.\n
+    :param group: Name of the counters group
+    :return: decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args):
+            key = json.dumps(args, sort_keys=True)
+            return solver_flight.do(group, key, function, *args)
+        return wrapper
+    return decorator
@@ -0,0 +1,84 @@
+""" Module allows public api calls to be throttled per client with token buckets weighted by the requested work"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+
+class CostTooLarge(APIException):
+    """ Call requesting more work than the bucket can ever hold, it would never be allowed.\n """
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request costs more than the throttle capacity, split it into smaller requests.'
+    default_code = 'cost_too_large'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """ Class allows every client (user or IP address) to spend tokens refilled at constant rate.
+    Each call costs tokens according to the work it requests, view may define throttle_cost(request) for it.
+    Buckets are kept in the cache from KINEMATICS_THROTTLE_CACHE, shared between worker processes by settings.
+    Rejected call gets 429 with Retry-After - time until the bucket holds enough tokens,
+    call costing more than the capacity gets 413.\n """
+    cache_prefix = 'throttle_bucket'
+    _lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.capacity = float(settings.KINEMATICS_THROTTLE_CAPACITY)
+        self.rate = float(settings.KINEMATICS_THROTTLE_RATE)
+        self.cache = caches[settings.KINEMATICS_THROTTLE_CACHE]
+        self.delay = None
+
+    def get_cache_key(self, request, view) -> str:
+        if request.user and request.user.is_authenticated:
+            ident = 'user_{}'.format(request.user.pk)
+        else:
+            ident = 'ip_{}'.format(self.get_ident(request))
+        return '{}_{}'.format(self.cache_prefix, ident)
+
+    def get_cost(self, request, view) -> float:
+        """
+        :return: Tokens of the call, at least 1
+        """
+        cost = 1.0
+        if hasattr(view, 'throttle_cost'):
+            try:
+                cost = float(view.throttle_cost(request))
+            except (KeyError, TypeError, ValueError, AttributeError):
+                # Incorrect data is rejected by the view itself
+                cost = 1.0
+        return max(cost, 1.0)
+
+    def consume(self, key: str, cost: float) -> float:
+        """
+        Refill the bucket for the time since the last call and take tokens.\n
+        :param key: Cache key of the bucket
+        :param cost: Tokens to take
+        :return: 0 if tokens were taken, otherwise seconds until the bucket holds enough tokens
+        """
+        # Lock serializes threads of this process, calls of other processes may still interleave
+        # between get and set, which admits at most one extra call per race
+        with self._lock:
+            now = time.time()
+            tokens, updated = self.cache.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            delay = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                delay = (cost - tokens) / self.rate
+            # Full bucket is the default, so the entry may expire when it would be refilled
+            self.cache.set(key, (tokens, now), timeout=int((self.capacity - tokens) / self.rate) + 1)
+        return delay
+
+    def allow_request(self, request, view) -> bool:
+        cost = self.get_cost(request, view)
+        if cost > self.capacity:
+            raise CostTooLarge()
+        self.delay = self.consume(self.get_cache_key(request, view), cost)
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
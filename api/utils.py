@@ -1,6 +1,16 @@
+import numpy as np
+
 from api.robotic_arm import RoboticArm
+from api.singleflight import single_flight
+from robot.calculations import links_arrays, evaluate_robots, evaluation_to_dict
+from robot.collision import check_collisions
+from robot.kinematic_chain import KinematicChain
+from robot.planner import RrtConnect, Validator
+from robot.tolerance import tolerance_analysis, tolerance_sample_count, tolerance_summary
+from robot.trajectory import interpolate_path, time_optimal_profile, profile_to_dict
 
 
+@single_flight('ik')
 def calculate_ik(links: dict, x: int, y: int, z: int, alpha: int):
     """
     Calculate forward kinematics of robotic arm.
@@ -9,15 +19,78 @@ def calculate_ik(links: dict, x: int, y: int, z: int, alpha: int):
     :param y: y value
     :param z: z value
     :param alpha: alpha value
-    :return: config1, config2
+    :return: config1, config2, collision of both configurations and all solution branches
     """
     Robot_IK = RoboticArm(links)
     Robot_IK.ik_solver(x, y, z, alpha)
     config_1 = Robot_IK.ik_get_config1()
     config_2 = Robot_IK.ik_get_config2()
-    return config_1, config_2
+    collision = calculate_collision(links, [config_1[0], config_2[0]], Robot_IK)
+    branches = calculate_ik_branches(links, x, y, z, alpha, Robot_IK)
+    return config_1, config_2, collision, branches
+
+
+def calculate_ik_branches(links: dict, x: int, y: int, z: int, alpha: int, arm: RoboticArm = None):
+    """
+    Calculate every inverse kinematics solution branch of robotic arm in one pass.
+    :param links: dictionary of robotic links param
+    :param x: x values
+    :param y: y value
+    :param z: z value
+    :param alpha: alpha value
+    :param arm: RoboticArm of the links to reuse
+    :return: list of branches: thetas, validity against robots joints ranges and collision
+    """
+    Robot_IK = arm or RoboticArm(links)
+    try:
+        configs, valid, status = Robot_IK.ik_solve_branches(x, y, z, alpha)
+    except TypeError:
+        return []
+    reachable = ~np.isnan(configs).any(axis=-1)
+    collision = [None] * len(configs)
+    if reachable.any():
+        for index, value in zip(np.flatnonzero(reachable), calculate_collision(links, configs[reachable], Robot_IK)):
+            collision[index] = value
+    return [{'thetas': np.round(config, 2).tolist() if reach else None,
+             'valid': bool(is_valid),
+             'collision': collision[index]}
+            for index, (config, reach, is_valid) in enumerate(zip(configs, reachable, valid))]
+
+
+def calculate_multi_robot(robots: list, targets: list):
+    """
+    Solve inverse kinematics of targets for many robots in one vectorized pass.
+    :param robots: list of {"name": ..., "links": dictionary of robotic links param}
+    :param targets: list of [x, y, z, alpha] targets
+    :return: dictionary with feasibility, joint margin and best configuration matrices of robots and targets
+    """
+    lengths, ranges, defined = links_arrays([robot['links'] for robot in robots])
+    names = [robot.get('name', 'Robot {}'.format(index + 1)) for index, robot in enumerate(robots)]
+    return evaluation_to_dict(evaluate_robots(lengths, ranges, targets, defined), names)
 
 
+def calculate_ik_sequence(links: dict, targets: list, start: list = None):
+    """
+    Calculate inverse kinematics of ordered targets with minimal joint motion between them.
+    :param links: dictionary of robotic links param
+    :param targets: list of [x, y, z, alpha] targets
+    :param start: [theta1, theta2, theta3, theta4] before the 1st target, optional
+    :return: dictionary with chosen configurations, branches and joint motion of every step
+    """
+    Robot_IK = RoboticArm(links)
+    configs, branches, motion, status = Robot_IK.ik_solve_sequence(targets, start)
+    if configs is None:
+        return {'status_calc': status, 'configs': None, 'branches': None, 'motion': None, 'total_motion': None}
+    return {
+        'status_calc': status,
+        'configs': np.round(configs, 2).tolist(),
+        'branches': branches.tolist(),
+        'motion': np.round(motion, 2).tolist(),
+        'total_motion': round(float(motion.sum()), 2),
+    }
+
+
+@single_flight('fk')
 def calculate_fk(links: dict, theta1: float, theta2: float, theta3: float, theta4: float):
     """
         Calculate forward kinematics of robotic arm.
@@ -33,3 +106,102 @@ def calculate_fk(links: dict, theta1: float, theta2: float, theta3: float, theta
     dh_table = Robot_FK.fk_dh(theta1, theta2, theta3, theta4)
     print(result_xyz, dh_table)
     return result_xyz, dh_table
+
+
+def calculate_collision(links: dict, thetas: list, arm: RoboticArm = None):
+    """
+        Check self-collision and floor collision of robotic arm in many configurations.
+        :param links: dictionary of robotic links param
+        :param thetas: list of [theta1, theta2, theta3, theta4] configurations
+        :param arm: RoboticArm of the links to reuse
+        :return: list of bools, True - configuration in collision, None if robot is not defined correctly
+        """
+    Robot_FK = arm or RoboticArm(links)
+    try:
+        positions = Robot_FK.fk_positions_batch(thetas)
+    except TypeError:
+        return [None] * len(thetas)
+    return check_collisions(positions).tolist()
+
+
+def calculate_chain(chain: dict, thetas: list, jacobian: bool = False):
+    """
+        Calculate forward kinematics of robotic arm described by general DH table.
+        :param chain: dictionary with "dh" table and optional "joints" mask and "ranges"
+        :param thetas: list of configurations, each with one value per joint
+        :param jacobian: add jacobians of the end effector
+        :return: dictionary with positions of links ends and optional jacobians
+        """
+    Robot_chain = KinematicChain.from_dict(chain)
+    frames = Robot_chain.fk_frames(thetas)
+    result = {
+        'positions': np.round(frames[..., :3, 3], 3).tolist(),
+        'end_effector': np.round(frames[..., -1, :3, 3], 3).tolist(),
+        'in_range': Robot_chain.in_range(np.array(thetas, dtype=float, ndmin=2)).tolist(),
+    }
+    if jacobian:
+        result['jacobian'] = np.round(Robot_chain.jacobian(thetas), 6).tolist()
+    return result
+
+
+def calculate_trajectory(waypoints: list, velocity: list, acceleration: list, samples: int = 200,
+                         links: dict = None):
+    """
+        Calculate the fastest timing of piecewise linear joint path under joints limits.
+        :param waypoints: list of [theta1, theta2, theta3, theta4] waypoints
+        :param velocity: joints velocities limits [deg/s]
+        :param acceleration: joints accelerations limits [deg/s^2]
+        :param samples: number of path samples
+        :param links: dictionary of robotic links param, samples are checked for collisions if given
+        :return: dictionary with duration and time, positions, velocities and accelerations profiles,
+         collision flag of every sample if links are given
+        """
+    path = interpolate_path(waypoints, samples)
+    result = profile_to_dict(time_optimal_profile(path, velocity, acceleration))
+    if links is not None:
+        result['collision'] = calculate_collision(links, path)
+        result['collision_free'] = not any(result['collision'])
+    return result
+
+
+def calculate_plan(links: dict, start: list, goal: list, obstacles: list = None, timeout: float = 2.0):
+    """
+        Plan collision free joint space path of robotic arm.
+        :param links: dictionary of robotic links param
+        :param start: [theta1, theta2, theta3, theta4] start configuration
+        :param goal: [theta1, theta2, theta3, theta4] goal configuration
+        :param obstacles: list of [x, y, z, r] spherical obstacles
+        :param timeout: planning time limit in seconds
+        :return: dictionary with smoothed path, status and planner statistics
+        """
+    Robot_chain = RoboticArm(links).fk_chain()
+    planner = RrtConnect(Robot_chain, Validator(Robot_chain, obstacles))
+    path, status = planner.plan(start, goal, timeout)
+    return {
+        'status_calc': status,
+        'path': np.round(path, 2).tolist() if path is not None else None,
+        'stats': planner.stats,
+    }
+
+
+def calculate_tolerance(links: dict, poses: list, length_tolerance, joint_tolerance, samples: int = 10000,
+                        distribution: str = 'normal', confidence: float = 0.95):
+    """
+        Monte Carlo analysis of end effector accuracy of robotic arm.
+        :param links: dictionary of robotic links param
+        :param poses: list of [theta1, theta2, theta3, theta4], or number of poses sampled in joints ranges
+        :param length_tolerance: [link1 ... link5] tolerances in mm or one value
+        :param joint_tolerance: [theta1 ... theta4] errors in degrees or one value
+        :param samples: number of samples of every pose
+        :param distribution: "normal" or "uniform"
+        :param confidence: probability of error ellipsoids
+        :return: dictionary with error ellipsoids of every pose and workspace summary
+        """
+    tolerance_sample_count(poses, samples)
+    Robot_chain = RoboticArm(links).fk_chain()
+    if isinstance(poses, int):
+        poses = Robot_chain.sample(poses, seed=0)
+    result = tolerance_analysis(Robot_chain, poses, length_tolerance, joint_tolerance, samples, distribution,
+                                confidence, seed=0)
+    result['poses'] = np.asarray(poses, dtype=float)
+    return tolerance_summary(result)
@@ -1,12 +1,18 @@
 import datetime
 from django.db.models import Count
 from rest_framework import generics, request, status
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from api.utils import calculate_ik, calculate_fk
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from api.singleflight import solver_flight
+from api.throttling import TokenBucketThrottle
+from api.utils import calculate_ik, calculate_fk, calculate_collision, calculate_chain, \
+    calculate_ik_sequence, calculate_trajectory, calculate_plan, calculate_tolerance, \
+    calculate_multi_robot
+from robot.tolerance import tolerance_sample_count
 
 
 @api_view(['GET'])
@@ -21,6 +27,13 @@ def apiOverview(request):
         'Inverse Kin Calc': '/api/ik-calc/<str:link1>_<str:link1_min>_<str:link1_max>/<str:link2>_<str:link2_min>_<str:link2_max>/<str:link3>_<str:link3_min>_<str:link3_max>/<str:link4>_<str:link4_min>_<str:link4_max>/<str:link5>_<str:link5_min>_<str:link5_max>/'
                             '<str:x>_<str:y>_<str:z>_<str:alpha>/',
         'Inverse Kin Calc_ex': '/api/ik-calc/118_-80_80/150_5_175/150_-115_55/54_-85_85/0_0_0/0_0_472_90/',
+        'Chain Kin Calc (POST)': '/api/chain-calc/',
+        'Inverse Kin Sequence (POST)': '/api/ik-sequence/',
+        'Multi Robot Inverse Kin (POST)': '/api/multi-robot-ik/',
+        'Trajectory Timing (POST)': '/api/trajectory/',
+        'Motion Planner (POST)': '/api/plan/',
+        'Tolerance Analysis (POST)': '/api/tolerance/',
+        'Solver Metrics': '/api/solver-metrics/',
 
     }
 
@@ -32,6 +45,7 @@ class FkCalcAPIView(generics.ListAPIView):
         An api endpoint for forward kinematics calculation.
     """
     permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
     # serializer_class = FkSerializer
 
     def get(self, request, *args, **kwargs):
@@ -69,6 +83,7 @@ class FkCalcAPIView(generics.ListAPIView):
         z = float(result[0][1][3][2])
         alpha = float(result[0][0])
         status_calc = result[0][2]
+        collision = calculate_collision(links, [[float(theta1), float(theta2), float(theta3), float(theta4)]])[0]
         data = {
                     'link1': int(link1),
                     'link1_min': int(link1_min),
@@ -95,6 +110,7 @@ class FkCalcAPIView(generics.ListAPIView):
                     'y': y,
                     'z': z,
                     'alpha': alpha,
+                    'collision': collision,
                 }
         return Response(data, status=status.HTTP_200_OK)
 
@@ -104,8 +120,13 @@ class IkCalcAPIView(generics.ListAPIView):
         An api endpoint for inverse kinematics calculation.
     """
     permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
     # serializer_class = IkSerializer
 
+    def throttle_cost(self, request):
+        # Both configurations and all branches are solved
+        return 2
+
     def get(self, request, *args, **kwargs):
         link1 = self.kwargs.get('link1')
         link1_min = self.kwargs.get('link1_min')
@@ -154,6 +175,7 @@ class IkCalcAPIView(generics.ListAPIView):
         theta44 = float(result[1][0][3])
         status_config1 = result[0][1]
         status_config2 = result[1][1]
+        collision = result[2]
         data = {
                     'link1': int(link1),
                     'link1_min': int(link1_min),
@@ -185,8 +207,201 @@ class IkCalcAPIView(generics.ListAPIView):
                     'theta22': float(theta22),
                     'theta33': float(theta33),
                     'theta44': float(theta44),
+                    'collision_config1': collision[0] if 'Success' in status_config1 else None,
+                    'collision_config2': collision[1] if 'Success' in status_config2 else None,
+                    'branches': result[3],
 
                 }
         return Response(data, status=status.HTTP_200_OK)
 
 
+class ChainCalcAPIView(APIView):
+    """
+        An api endpoint for forward kinematics and jacobians of robotic arm with any number of joints.\n
+        Example body: {"dh": [[0, 118, 0, 90], [0, 0, 150, 0]], "joints": [true, true], "thetas": [[0, 90]], "jacobian": true}\n
+        DH table has at most KINEMATICS_MAX_DOF rows and at most KINEMATICS_MAX_BATCH configurations
+        of 5 rows (or fewer of longer tables) are calculated by one request.
+    """
+    permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+
+    def throttle_cost(self, request):
+        # Work grows with rows of every configuration, 5 rows of the 4 joints preset cost 1 / 50
+        rows = min(len(request.data['dh']), settings.KINEMATICS_MAX_DOF)
+        return len(request.data['thetas']) * rows / 250 * (2 if request.data.get('jacobian') else 1)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            rows = len(request.data['dh'])
+            if rows > settings.KINEMATICS_MAX_DOF:
+                raise ValueError('At most {} DH rows are allowed'.format(settings.KINEMATICS_MAX_DOF))
+            joints = request.data.get('joints')
+            if joints is not None and len(joints) != rows:
+                raise ValueError('joints must have one value per DH row')
+            if len(request.data['thetas']) * max(rows, 5) > settings.KINEMATICS_MAX_BATCH * 5:
+                raise ValueError('At most {} configurations of 5 rows are allowed'.format(
+                    settings.KINEMATICS_MAX_BATCH))
+            result = calculate_chain(request.data, request.data['thetas'], bool(request.data.get('jacobian', False)))
+        except (KeyError, TypeError, ValueError) as error:
+            return Response({'status_calc': 'Incorrect data: {}'.format(error)}, status=status.HTTP_400_BAD_REQUEST)
+        result['status_calc'] = 'Forward kinematics calculations ended successfully'
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class IkSequenceAPIView(APIView):
+    """
+        An api endpoint for inverse kinematics of ordered targets, e.g. pick-and-place sequence.\n
+        For every target the branch is chosen so the total joint motion of the sequence is minimal.\n
+        Example body: {"links": {"link1": [118, -80, 80], ...}, "targets": [[200, 0, 300, 0], ...], "start": [0, 90, 0, 0]}\n
+        At most KINEMATICS_MAX_BATCH targets are solved by one request.
+    """
+    permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+
+    def throttle_cost(self, request):
+        return 2 * len(request.data['targets'])
+
+    def post(self, request, *args, **kwargs):
+        try:
+            links = {name: [int(value) for value in request.data['links'][name]]
+                     for name in ('link1', 'link2', 'link3', 'link4', 'link5')}
+            if len(request.data['targets']) > settings.KINEMATICS_MAX_BATCH:
+                raise ValueError('At most {} targets are allowed'.format(settings.KINEMATICS_MAX_BATCH))
+            result = calculate_ik_sequence(links, request.data['targets'], request.data.get('start'))
+        except (KeyError, TypeError, ValueError) as error:
+            return Response({'status_calc': 'Incorrect data: {}'.format(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class MultiRobotIkAPIView(APIView):
+    """
+        An api endpoint for inverse kinematics of targets for many robots at once.\n
+        Result is feasibility, joint margin (smallest distance of joints to their limits) and best configuration
+        of every robot and target, robots are ranked by feasible targets and the worst margin.\n
+        Example body: {"robots": [{"name": "A", "links": {"link1": [118, -80, 80], ...}}, ...],
+        "targets": [[200, 0, 300, 0], ...]}
+    """
+    permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+
+    def throttle_cost(self, request):
+        return len(request.data['robots']) * len(request.data['targets']) / 100
+
+    def post(self, request, *args, **kwargs):
+        try:
+            robots = [{'name': str(robot.get('name', 'Robot {}'.format(index + 1))),
+                       'links': {name: [int(value) for value in robot['links'][name]]
+                                 for name in ('link1', 'link2', 'link3', 'link4', 'link5')}}
+                      for index, robot in enumerate(request.data['robots'])]
+            targets = request.data['targets']
+            if len(robots) * len(targets) > settings.KINEMATICS_EVALUATE_MAX_TARGETS * 10:
+                raise ValueError('at most {} robots and targets pairs'.format(
+                    settings.KINEMATICS_EVALUATE_MAX_TARGETS * 10))
+            result = calculate_multi_robot(robots, targets)
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            return Response({'status_calc': 'Incorrect data: {}'.format(error)}, status=status.HTTP_400_BAD_REQUEST)
+        result['status_calc'] = 'Inverse kinematics calculations ended successfully'
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class TrajectoryAPIView(APIView):
+    """
+        An api endpoint for the fastest timing of a joint path under joints velocity and acceleration limits.\n
+        Example body: {"waypoints": [[0, 90, 0, 0], [45, 60, -30, 0]], "velocity": [90, 90, 120, 180],
+        "acceleration": [180, 180, 240, 360], "samples": 200, "links": {"link1": [118, -80, 80], ...}}\n
+        Samples are checked for self-collision and floor collision when optional links are given.
+        At most KINEMATICS_MAX_BATCH waypoints are allowed.
+    """
+    permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+
+    def throttle_cost(self, request):
+        return (min(int(request.data.get('samples', 200)), 5000) + len(request.data['waypoints'])) / 100
+
+    def post(self, request, *args, **kwargs):
+        try:
+            samples = min(int(request.data.get('samples', 200)), 5000)
+            if len(request.data['waypoints']) > settings.KINEMATICS_MAX_BATCH:
+                raise ValueError('At most {} waypoints are allowed'.format(settings.KINEMATICS_MAX_BATCH))
+            links = request.data.get('links')
+            if links is not None:
+                links = {name: [int(value) for value in links[name]]
+                         for name in ('link1', 'link2', 'link3', 'link4', 'link5')}
+            result = calculate_trajectory(request.data['waypoints'], request.data['velocity'],
+                                          request.data['acceleration'], samples, links)
+        except (KeyError, TypeError, ValueError) as error:
+            return Response({'status_calc': 'Incorrect data: {}'.format(error)}, status=status.HTTP_400_BAD_REQUEST)
+        result['status_calc'] = 'Trajectory calculations ended successfully'
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class PlanAPIView(APIView):
+    """
+        An api endpoint for collision free joint space path between two configurations (RRT-Connect).\n
+        Example body: {"links": {"link1": [118, -80, 80], ...}, "start": [-60, 90, 0, 0], "goal": [60, 90, 0, 0],
+        "obstacles": [[250, 0, 100, 40]], "timeout": 1.0}\n
+        At most KINEMATICS_PLANNER_MAX_OBSTACLES obstacles are allowed, smoothing ends with the time limit too.
+    """
+    permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+
+    def throttle_cost(self, request):
+        # Planning may use the whole time limit, 10 tokens per second
+        return 10 * min(float(request.data.get('timeout', settings.KINEMATICS_PLANNER_TIMEOUT)),
+                        settings.KINEMATICS_PLANNER_TIMEOUT)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            links = {name: [int(value) for value in request.data['links'][name]]
+                     for name in ('link1', 'link2', 'link3', 'link4', 'link5')}
+            timeout = min(float(request.data.get('timeout', settings.KINEMATICS_PLANNER_TIMEOUT)),
+                          settings.KINEMATICS_PLANNER_TIMEOUT)
+            if len(request.data.get('obstacles') or []) > settings.KINEMATICS_PLANNER_MAX_OBSTACLES:
+                raise ValueError('At most {} obstacles are allowed'.format(settings.KINEMATICS_PLANNER_MAX_OBSTACLES))
+            result = calculate_plan(links, request.data['start'], request.data['goal'],
+                                    request.data.get('obstacles'), timeout)
+        except (KeyError, TypeError, ValueError) as error:
+            return Response({'status_calc': 'Incorrect data: {}'.format(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class ToleranceAPIView(APIView):
+    """
+        An api endpoint for Monte Carlo analysis of end effector accuracy under links tolerances and joints errors.\n
+        "poses" is a list of configurations or number of poses sampled across the workspace.\n
+        Example body: {"links": {"link1": [118, -80, 80], ...}, "poses": [[0, 90, 0, 0]], "length_tolerance": 0.1,
+        "joint_tolerance": [0.05, 0.05, 0.05, 0.05], "samples": 10000, "distribution": "normal", "confidence": 0.95}
+    """
+    permission_classes = (AllowAny,)
+    throttle_classes = (TokenBucketThrottle,)
+
+    def throttle_cost(self, request):
+        return tolerance_sample_count(request.data.get('poses', 1), int(request.data.get('samples', 10000))) / 100000
+
+    def post(self, request, *args, **kwargs):
+        try:
+            links = {name: [int(value) for value in request.data['links'][name]]
+                     for name in ('link1', 'link2', 'link3', 'link4', 'link5')}
+            poses = request.data['poses']
+            samples = int(request.data.get('samples', 10000))
+            tolerance_sample_count(poses, samples, settings.KINEMATICS_TOLERANCE_MAX_SAMPLES)
+            result = calculate_tolerance(links, poses, request.data['length_tolerance'],
+                                         request.data['joint_tolerance'], samples,
+                                         request.data.get('distribution', 'normal'),
+                                         float(request.data.get('confidence', 0.95)))
+        except (KeyError, TypeError, ValueError) as error:
+            return Response({'status_calc': 'Incorrect data: {}'.format(error)}, status=status.HTTP_400_BAD_REQUEST)
+        result['status_calc'] = 'Tolerance analysis ended successfully'
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class SolverMetricsAPIView(APIView):
+    """
+        An api endpoint for single-flight counters of fk and ik solvers in this process.\n
+        coalesced - calls which waited for an identical call already in flight instead of computing.\n
+        Only staff users can read the counters.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(solver_flight.metrics(), status=status.HTTP_200_OK)
@@ -0,0 +1,261 @@
+""" Module allows the running web app and api to be load tested by many concurrent virtual users"""
+import asyncio
+import random
+import re
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+FK_PATH = '/api/fk-calc/118_-80_80/150_5_175/150_-115_55/54_-85_85/0_0_0/{}_{}_{}_{}/'
+IK_PATH = '/api/ik-calc/118_-80_80/150_5_175/150_-115_55/54_-85_85/0_0_0/{}_{}_{}_{}/'
+THETA_FIELD = re.compile(r'name="(theta\d)"[^>]*?value="([^"]*)"')
+
+
+class HttpClient:
+    """ Minimal asyncio HTTP/1.1 client with keep-alive connection and cookies, one for every virtual user.\n """
+
+    def __init__(self, base_url: str, timeout: float = 30.0) -> None:
+        url = urlsplit(base_url)
+        if url.scheme != 'http':
+            raise ValueError("Only http:// servers are supported")
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = None
+        self.writer = None
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, form: dict = None, headers: dict = None):
+        """
+        Send request, connection is opened again when server closed it.\n
+        :param method: "GET" or "POST"
+        :param path: Path with query string
+        :param form: Fields of url encoded POST body
+        :param headers: Additional headers
+        :return: status, headers, body
+        """
+        body = urlencode(form).encode() if form is not None else b''
+        lines = ['{} {} HTTP/1.1'.format(method, path), 'Host: {}:{}'.format(self.host, self.port),
+                 'Connection: keep-alive', 'Content-Length: {}'.format(len(body))]
+        if form is not None:
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join('{}={}'.format(*item) for item in self.cookies.items()))
+        lines += ['{}: {}'.format(*item) for item in (headers or {}).items()]
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+                return await asyncio.wait_for(self._response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Keep-alive connection closed by the server between requests
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readuntil(b'\r\n')).decode('latin-1').strip()
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            name = name.strip().lower()
+            if name == 'set-cookie':
+                cookie, _ = (value.strip() + ';').split(';', 1)
+                key, cookie_value = cookie.split('=', 1)
+                self.cookies[key] = cookie_value
+            headers[name] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                body += (await self.reader.readexactly(size + 2))[:size]
+                if not size:
+                    break
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, headers, body
+
+    async def login(self, username: str, password: str) -> None:
+        await self.request('GET', '/accounts/login')
+        status, _, _ = await self.request('POST', '/accounts/login', {
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.cookies.get('csrftoken', '')})
+        if status != 302 or 'sessionid' not in self.cookies:
+            raise ValueError("Login of {} failed".format(username))
+
+
+class Recorder:
+    """ Latencies and statuses of all requests grouped by request name.\n """
+
+    def __init__(self) -> None:
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+        self.ended = None
+
+    async def call(self, name: str, client: HttpClient, method: str, path: str, form: dict = None):
+        """
+        Send request and record its latency, status or error.\n
+        :return: status, headers, body or None when request failed
+        """
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, form, {'Referer': 'http://{}:{}{}'.format(
+                client.host, client.port, path)} if form is not None else None)
+        except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError) as error:
+            self.errors.setdefault(name, {})
+            self.errors[name][type(error).__name__] = self.errors[name].get(type(error).__name__, 0) + 1
+            return None
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        statuses = self.statuses.setdefault(name, {})
+        statuses[response[0]] = statuses.get(response[0], 0) + 1
+        return response
+
+    def report(self) -> dict:
+        """
+        :return: dictionary: duration, and for "total" and every request name: requests, errors, statuses,
+         throughput [req/s], mean, p50, p95, p99, max latency [ms]
+        """
+        duration = (self.ended or time.perf_counter()) - self.started
+        names = sorted(set(self.latencies) | set(self.errors))
+        groups = {name: (self.latencies.get(name, []), self.statuses.get(name, {}), self.errors.get(name, {}))
+                  for name in names}
+        groups['total'] = (
+            [latency for name in names for latency in self.latencies.get(name, [])],
+            {status: sum(self.statuses.get(name, {}).get(status, 0) for name in names)
+             for status in {status for statuses in self.statuses.values() for status in statuses}},
+            {error: sum(self.errors.get(name, {}).get(error, 0) for name in names)
+             for error in {error for errors in self.errors.values() for error in errors}})
+
+        result = {'duration': round(duration, 3), 'requests': {}}
+        for name, (latencies, statuses, errors) in groups.items():
+            latencies = np.array(latencies) * 1000
+            stats = {
+                'requests': len(latencies),
+                'errors': errors,
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                'throughput': round(len(latencies) / duration, 2) if duration > 0 else 0.0,
+            }
+            if len(latencies):
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                stats.update({'mean_ms': round(float(latencies.mean()), 2), 'p50_ms': round(float(p50), 2),
+                              'p95_ms': round(float(p95), 2), 'p99_ms': round(float(p99), 2),
+                              'max_ms': round(float(latencies.max()), 2)})
+            result['requests'][name] = stats
+        return result
+
+
+async def api_fk(client: HttpClient, recorder: Recorder, options: dict, generator: random.Random) -> None:
+    thetas = (generator.randint(-80, 80), generator.randint(5, 175), generator.randint(-115, 55),
+              generator.randint(-85, 85))
+    await recorder.call('api-fk', client, 'GET', FK_PATH.format(*thetas))
+
+
+async def api_ik(client: HttpClient, recorder: Recorder, options: dict, generator: random.Random) -> None:
+    target = (generator.randint(150, 350), generator.randint(-100, 100), generator.randint(100, 350),
+              generator.choice((-45, 0, 45, 90)))
+    await recorder.call('api-ik', client, 'GET', IK_PATH.format(*target))
+
+
+async def dashboard(client: HttpClient, recorder: Recorder, options: dict, generator: random.Random) -> None:
+    await recorder.call('dashboard', client, 'GET', '/robot/dashboard')
+
+
+async def robot_detail(client: HttpClient, recorder: Recorder, options: dict, generator: random.Random) -> None:
+    await recorder.call('robot-detail', client, 'GET', '/robot/robot-detail/{}/'.format(options['robot']))
+
+
+async def fk_update(client: HttpClient, recorder: Recorder, options: dict, generator: random.Random) -> None:
+    """ Open FK update form and submit it with the same thetas, like a user saving the calculation.\n """
+    path = '/robot/fk-update/{}/'.format(options['fk'])
+    response = await recorder.call('fk-update-form', client, 'GET', path)
+    if response is None or response[0] != 200:
+        return
+    form = dict(THETA_FIELD.findall(response[2].decode('utf-8', 'replace')))
+    form.update({'notes': 'Load test', 'csrfmiddlewaretoken': client.cookies.get('csrftoken', '')})
+    await recorder.call('fk-update-submit', client, 'POST', path, form)
+
+
+# Scenario: (steps with weights, needs logged in user, required options)
+SCENARIOS = {
+    'api': ([(api_fk, 3), (api_ik, 1)], False, ()),
+    'pages': ([(dashboard, 1), (robot_detail, 2)], True, ('robot',)),
+    'fk-update': ([(fk_update, 1)], True, ('fk',)),
+    'mixed': ([(api_fk, 4), (api_ik, 2), (dashboard, 1), (robot_detail, 2), (fk_update, 1)], True, ('robot', 'fk')),
+}
+
+
+async def virtual_user(base_url: str, scenario: str, options: dict, recorder: Recorder, deadline: float,
+                       seed: int) -> None:
+    steps, login, _ = SCENARIOS[scenario]
+    generator = random.Random(seed)
+    client = HttpClient(base_url)
+    try:
+        if login:
+            await client.login(options['username'], options['password'])
+        functions, weights = zip(*steps)
+        while time.perf_counter() < deadline:
+            await generator.choices(functions, weights)[0](client, recorder, options, generator)
+            if options.get('think_time'):
+                await asyncio.sleep(generator.expovariate(1 / options['think_time']))
+    finally:
+        await client.close()
+
+
+async def run_load(base_url: str, scenario: str, users: int = 10, duration: float = 30.0, ramp_up: float = 0.0,
+                   seed: int = 0, **options) -> dict:
+    """
+    Run the scenario by concurrent virtual users, each with its own connection and session.\n
+    :param base_url: Address of the running server, e.g. http://127.0.0.1:8000
+    :param scenario: Name from SCENARIOS
+    :param users: Number of virtual users
+    :param duration: Test time in seconds
+    :param ramp_up: Time in seconds in which users are started
+    :param seed: Seed of random requests
+    :param options: username, password, robot, fk, think_time [s]
+    :return: report dictionary returned by Recorder.report
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError("Scenario must be one of: {}".format(', '.join(SCENARIOS)))
+    _, login, required = SCENARIOS[scenario]
+    missing = [name for name in required + (('username', 'password') if login else ()) if not options.get(name)]
+    if missing:
+        raise ValueError("Scenario {} requires: {}".format(scenario, ', '.join(missing)))
+
+    recorder = Recorder()
+    deadline = time.perf_counter() + ramp_up + duration
+
+    async def start(index):
+        await asyncio.sleep(ramp_up * index / max(users, 1))
+        await virtual_user(base_url, scenario, options, recorder, deadline, seed + index)
+
+    results = await asyncio.gather(*(start(index) for index in range(users)), return_exceptions=True)
+    recorder.ended = time.perf_counter()
+    report = recorder.report()
+    report.update({'scenario': scenario, 'users': users, 'base_url': base_url,
+                   'failed_users': [str(result) for result in results if isinstance(result, Exception)]})
+    return report
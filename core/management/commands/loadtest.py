@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import SCENARIOS, run_load
+
+
+class Command(BaseCommand):
+    """
+        Load test a running server with concurrent virtual users and print json report
+        with throughput and p50/p95/p99 latencies of every request.
+    """
+    help = 'Load test running web app and api'
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', nargs='?', default='http://127.0.0.1:8000')
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='api')
+        parser.add_argument('--users', type=int, default=10, help='Number of concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30.0, help='Test time in seconds')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Time in seconds in which users are started')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between user steps in seconds')
+        parser.add_argument('--username', help='User of logged in scenarios')
+        parser.add_argument('--password')
+        parser.add_argument('--robot', type=int, help='Robot id of pages scenarios')
+        parser.add_argument('--fk', type=int, help='Forward kinematics id of fk-update scenario')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Json report file, stdout by default')
+
+    def handle(self, *args, **options):
+        try:
+            report = asyncio.run(run_load(
+                options['base_url'], options['scenario'], options['users'], options['duration'], options['ramp_up'],
+                options['seed'], username=options['username'], password=options['password'],
+                robot=options['robot'], fk=options['fk'], think_time=options['think_time']))
+        except ValueError as error:
+            raise CommandError(str(error))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            total = report['requests'].get('total', {})
+            self.stdout.write(self.style.SUCCESS('{} requests, {} req/s, p99 {} ms'.format(
+                total.get('requests', 0), total.get('throughput', 0), total.get('p99_ms'))))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
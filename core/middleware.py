@@ -0,0 +1,199 @@
+""" Module allows single requests of staff users to be profiled on demand"""
+import cProfile
+import contextlib
+import os
+import pstats
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PROFILE_PARAMETER = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+REPORT_CACHE_KEY = 'profile_report_{}'
+# Apps whose functions form the solver call tree
+SOLVER_APPS = ('robot', 'api', 'core')
+
+
+class QueryRecorder:
+    """ Database execute wrapper recording SQL queries with timings of one request.\n """
+
+    def __init__(self) -> None:
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'database': context['connection'].alias,
+                'many': many,
+            })
+
+    def summary(self) -> dict:
+        counts = {}
+        for query in self.queries:
+            counts[query['sql']] = counts.get(query['sql'], 0) + 1
+        return {
+            'count': len(self.queries),
+            'total_ms': round(sum(query['ms'] for query in self.queries), 3),
+            'duplicates': {sql: count for sql, count in counts.items() if count > 1},
+            'queries': self.queries,
+        }
+
+
+def _function_name(function) -> str:
+    filename, line, name = function
+    return '{}:{}({})'.format(os.path.relpath(filename, settings.BASE_DIR) if filename.startswith(
+        str(settings.BASE_DIR)) else filename, line, name)
+
+
+def _is_solver(function) -> bool:
+    filename = function[0]
+    if not filename.startswith(str(settings.BASE_DIR)):
+        return False
+    return os.path.relpath(filename, settings.BASE_DIR).split(os.sep)[0] in SOLVER_APPS
+
+
+def call_tree(stats: pstats.Stats, min_ms: float = 0.1, max_depth: int = 12) -> list:
+    """
+    Call tree of the project functions, calls of library functions are collapsed into their callers.\n
+    :param stats: Stats of the request profile
+    :param min_ms: Smallest cumulative time of listed function
+    :param max_depth: Largest depth of the tree
+    :return: list of nested dictionaries: function, calls, own_ms, cumulative_ms, children
+    """
+    raw = stats.stats
+    callees = {}
+    for function, (_, _, _, _, callers) in raw.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(function)
+
+    def solver_callees(function):
+        # Project functions called directly or through library functions, breadth first over library functions
+        found, visited, queue = set(), {function}, list(callees.get(function, []))
+        while queue:
+            callee = queue.pop()
+            if callee in visited:
+                continue
+            visited.add(callee)
+            if _is_solver(callee):
+                found.add(callee)
+            else:
+                queue += callees.get(callee, [])
+        return found
+
+    expanded = set()
+
+    def node(function, depth):
+        # Function called from many places is expanded only under its first caller, so the tree stays small
+        _, calls, own, cumulative, _ = raw[function]
+        expanded.add(function)
+        children = []
+        if depth < max_depth:
+            for callee in sorted(nearest[function], key=lambda item: -raw[item][3]):
+                if callee not in expanded and raw[callee][3] * 1000 >= min_ms:
+                    children.append(node(callee, depth + 1))
+        return {
+            'function': _function_name(function),
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+            'children': children,
+        }
+
+    solver = [function for function in raw if _is_solver(function)]
+    nearest = {function: solver_callees(function) for function in solver}
+    called = set().union(*nearest.values())
+    roots = sorted((function for function in solver if function not in called and raw[function][3] * 1000 >= min_ms),
+                   key=lambda item: -raw[item][3])
+    return [node(function, 0) for function in roots if function not in expanded]
+
+
+def top_functions(stats: pstats.Stats, limit: int = 30) -> list:
+    """
+    :return: list of dictionaries of the slowest functions by cumulative time
+    """
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [{'function': _function_name(function), 'calls': calls, 'own_ms': round(own * 1000, 3),
+             'cumulative_ms': round(cumulative * 1000, 3)} for function, (_, calls, own, cumulative, _) in rows]
+
+
+class ProfilingMiddleware:
+    """ Middleware allows staff user to profile one request with ?_profile=1 or X-Profile: 1 header.
+    View runs under cProfile and its SQL queries are recorded with timings. Report is stored in the default cache
+    (shared between worker processes by settings CACHES) for KINEMATICS_PROFILE_TTL seconds and its id
+    is returned in X-Profile-Id header, ?_profile=json returns the report instead of the response.
+    Api calls without session are authenticated by the DRF authentication classes (e.g. Basic) to find the user.
+    Profiler and query recorder are bound to the request thread and its connections,
+    so other requests are not affected.\n """
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def requested(self, request):
+        mode = request.GET.get(PROFILE_PARAMETER) or request.META.get(PROFILE_HEADER)
+        if not mode or mode in ('0', 'false'):
+            return None
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            user = self.api_user(request)
+        if user is None or not user.is_authenticated or not user.is_staff:
+            return None
+        return mode
+
+    @staticmethod
+    def api_user(request):
+        """
+        User of DRF authentication classes, the views authenticate api calls only after the middleware.\n
+        :return: User or None if credentials are missing or incorrect
+        """
+        authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        try:
+            return Request(request, authenticators=authenticators).user
+        except APIException:
+            return None
+
+    def __call__(self, request):
+        mode = self.requested(request)
+        if mode is None:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        total = time.perf_counter() - started
+
+        stats = pstats.Stats(profiler)
+        report = {
+            'id': uuid.uuid4().hex,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'sql': recorder.summary(),
+            'solver_tree': call_tree(stats),
+            'top_functions': top_functions(stats),
+        }
+        if mode == 'json':
+            return JsonResponse(report)
+        cache.set(REPORT_CACHE_KEY.format(report['id']), report, settings.KINEMATICS_PROFILE_TTL)
+        response['X-Profile-Id'] = report['id']
+        return response
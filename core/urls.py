@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import HomeView
+from .views import HomeView, ProfileReportView
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
+    path('profile-report/<str:pk>/', ProfileReportView.as_view(), name='profile-report'),
 ]
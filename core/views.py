@@ -1,5 +1,9 @@
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
 from django.shortcuts import redirect
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
+
+from core.middleware import REPORT_CACHE_KEY
 
 
 class HomeView(TemplateView):
@@ -9,3 +13,21 @@ class HomeView(TemplateView):
         if request.user.is_authenticated:
             return redirect('dashboard')
         return super(HomeView, self).dispatch(request, *args, **kwargs)
+
+
+class ProfileReportView(View):
+    """
+        Json report of request profiled by ProfilingMiddleware, kept for KINEMATICS_PROFILE_TTL seconds. \n
+        Only staff users can see reports.
+    """
+
+    def get(self, request, *args, **kwargs):
+        report = cache.get(REPORT_CACHE_KEY.format(self.kwargs['pk']))
+        if report is None:
+            raise Http404
+        return JsonResponse(report)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated or not request.user.is_staff:
+            return redirect('home')
+        return super(ProfileReportView, self).dispatch(request, *args, **kwargs)
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Project, Robot, ForwardKinematics, InverseKinematics
+from .models import Project, Scene, Robot, ForwardKinematics, InverseKinematics
 # Register your models here.
 admin.site.register(Project)
+admin.site.register(Scene)
 admin.site.register(Robot)
 admin.site.register(ForwardKinematics)
 admin.site.register(InverseKinematics)
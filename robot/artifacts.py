@@ -0,0 +1,179 @@
+""" Module allows large per robot precomputations to be stored on disk and shared between worker processes"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+# Bump when format or meaning of stored arrays changes, old files are ignored
+ARTIFACT_VERSION = 1
+
+
+def geometry_hash(chain) -> str:
+    """
+    Hash of robots geometry, the same for every robot with identical DH table, joints and ranges.\n
+    :param chain: KinematicChain
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(str(ARTIFACT_VERSION).encode())
+    for array in (chain.dh_table, chain.joints, chain.ranges):
+        array = np.ascontiguousarray(array, dtype=float)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:24]
+
+
+class ArtifactStore:
+    """ Class allows numpy arrays to be written once to versioned .npy files and opened with numpy.memmap.
+    Files are read only after creation, so all workers share them through the page cache.
+    Artifacts are addressed by geometry, one file serves every robot with the same geometry,
+    so they are never removed per robot, only the least recently used ones by collect.\n """
+
+    def __init__(self, root=None, max_opened: int = None, max_bytes: int = None) -> None:
+        """
+        :param root: Directory of artifacts, settings.KINEMATICS_ARTIFACT_DIR by default
+        :param max_opened: Number of memory maps kept open, settings.KINEMATICS_ARTIFACT_MAX_OPENED by default
+        :param max_bytes: Size limit of all artifacts, settings.KINEMATICS_ARTIFACT_MAX_MB by default
+        """
+        self._root = root
+        self._max_opened = max_opened
+        self._max_bytes = max_bytes
+        self._opened = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        if self._root is None:
+            return Path(getattr(settings, 'KINEMATICS_ARTIFACT_DIR', Path(settings.BASE_DIR) / 'artifacts'))
+        return Path(self._root)
+
+    @property
+    def max_opened(self) -> int:
+        if self._max_opened is None:
+            return getattr(settings, 'KINEMATICS_ARTIFACT_MAX_OPENED', 32)
+        return self._max_opened
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            return int(getattr(settings, 'KINEMATICS_ARTIFACT_MAX_MB', 0) * 2 ** 20)
+        return self._max_bytes
+
+    def path(self, name: str, key: str) -> Path:
+        """
+        :param name: Kind of artifact, e.g. "workspace-16"
+        :param key: Geometry hash
+        :return: Path of the artifact file
+        """
+        return self.root / name / '{}.v{}.npy'.format(key, ARTIFACT_VERSION)
+
+    def load(self, name: str, key: str):
+        """
+        Open artifact as read only memory map. Only max_opened least recently used maps are kept open.\n
+        :param name: Kind of artifact
+        :param key: Geometry hash
+        :return: numpy.memmap or None if artifact does not exist
+        """
+        path = self.path(name, key)
+        with self._lock:
+            array = self._opened.get(path)
+            if array is not None:
+                self._opened.move_to_end(path)
+                return array
+            try:
+                array = np.load(path, mmap_mode='r')
+            except FileNotFoundError:
+                return None
+            self._opened[path] = array
+            while len(self._opened) > self.max_opened:
+                self._opened.popitem(last=False)
+        # Modification time marks recently used artifacts for collect, access time is often not updated
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return array
+
+    def save(self, name: str, key: str, array: np.array):
+        """
+        Write artifact to temporary file and atomically replace the target.\n
+        Readers never see partially written file. \n
+        :param name: Kind of artifact
+        :param key: Geometry hash
+        :param array: Array to store
+        :return: numpy.memmap of the stored artifact
+        """
+        path = self.path(name, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.save(file, np.ascontiguousarray(array))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        with self._lock:
+            self._opened.pop(path, None)
+        self.collect(keep=path)
+        return self.load(name, key)
+
+    def get_or_build(self, name: str, key: str, builder):
+        """
+        Open artifact or build and store it when it does not exist yet.\n
+        :param name: Kind of artifact
+        :param key: Geometry hash
+        :param builder: Function without parameters returning array
+        :return: numpy.memmap
+        """
+        array = self.load(name, key)
+        if array is None:
+            array = self.save(name, key, builder())
+        return array
+
+    def collect(self, max_bytes: int = None, keep: Path = None) -> int:
+        """
+        Remove least recently used artifacts until all of them take at most max_bytes.\n
+        Workers which already mapped removed files keep valid mapping until they close it,
+        removed artifacts are built again on next use.\n
+        :param max_bytes: Size limit, max_bytes of the store by default, 0 - no limit
+        :param keep: Path never removed, e.g. just saved artifact
+        :return: number of removed files
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = 0
+        if not max_bytes or not self.root.exists():
+            return removed
+        files = []
+        for path in self.root.glob('*/*.npy'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            with self._lock:
+                self._opened.pop(path, None)
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+
+store = ArtifactStore()
@@ -0,0 +1,161 @@
+""" Module allows forward and inverse kinematics of the 4 joints robotic arm to be calculated by selectable backends"""
+import abc
+import time
+
+import numpy as np
+from django.conf import settings
+
+from robot.kernels import IK_TOLERANCE, fk_kernel, ik_branches, ik_kernel
+from robot.kinematic_chain import KinematicChain
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _lengths(links: dict) -> np.array:
+    return np.array([links["link{}".format(number)][0] for number in range(1, 6)], dtype=float)
+
+
+def _targets(px, py, pz, alfa):
+    """
+    :return: Targets broadcast against each other as array (m, 4) and their common shape
+    """
+    values = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (px, py, pz, alfa)))
+    return np.ascontiguousarray(np.stack([value.ravel() for value in values], axis=-1)), values[0].shape
+
+
+class SolverBackend(abc.ABC):
+    """ Base of the kinematics backends used by RoboticArm, all of them return the same arrays.\n """
+    name = None
+
+    @abc.abstractmethod
+    def fk_positions(self, links: dict, thetas) -> np.array:
+        """
+        :param links: dictionary, example: {"link1": [118, -80, 80], ...}
+        :param thetas: Array like of shape (m, 4) with theta1..theta4 in degrees
+        :return: Array of shape (m, 6, 3): base origin, end of link1 ... end of link5
+        """
+
+    @abc.abstractmethod
+    def ik_branches(self, links: dict, px, py, pz, alfa) -> np.array:
+        """
+        :param links: dictionary, example: {"link1": [118, -80, 80], ...}
+        :param px: Target x, targets are broadcast against each other
+        :param py: Target y
+        :param pz: Target z
+        :param alfa: Effector orientation in degrees
+        :return: Array of shape (..., 4, 4) in the order of ik_branches, nan if unreachable
+        """
+
+
+class KernelBackend(SolverBackend):
+    """ Backend running the scalar kernels, loops are interpreted by Python.\n """
+    name = 'python'
+    fk_kernel = staticmethod(fk_kernel)
+    ik_kernel = staticmethod(ik_kernel)
+
+    def fk_positions(self, links: dict, thetas) -> np.array:
+        thetas = np.ascontiguousarray(np.array(thetas, dtype=float, ndmin=2))
+        if thetas.shape[-1] != 4:
+            raise ValueError("Configurations must have 4 joint values")
+        out = np.empty((len(thetas), 6, 3))
+        self.fk_kernel(_lengths(links), thetas, out)
+        return out
+
+    def ik_branches(self, links: dict, px, py, pz, alfa) -> np.array:
+        targets, shape = _targets(px, py, pz, alfa)
+        out = np.empty((len(targets), 4, 4))
+        self.ik_kernel(_lengths(links), targets, IK_TOLERANCE, out)
+        return out.reshape(shape + (4, 4))
+
+
+class NumpyBackend(SolverBackend):
+    """ Backend vectorized over all configurations and targets with NumPy.\n """
+    name = 'numpy'
+
+    def fk_positions(self, links: dict, thetas) -> np.array:
+        return KinematicChain.from_links(links).fk_positions(thetas)
+
+    def ik_branches(self, links: dict, px, py, pz, alfa) -> np.array:
+        return ik_branches(*_lengths(links), px, py, pz, alfa)
+
+
+class NumbaBackend(KernelBackend):
+    """ Backend running the scalar kernels compiled by Numba. Compiled code is cached on disk
+    (__pycache__ or NUMBA_CACHE_DIR), so new workers load it instead of compiling again.\n """
+    name = 'numba'
+
+    def __init__(self) -> None:
+        if numba is None:
+            raise ValueError("Backend numba needs the numba package")
+        self.fk_kernel = numba.njit(cache=True)(fk_kernel)
+        self.ik_kernel = numba.njit(cache=True)(ik_kernel)
+
+
+BACKENDS = {backend.name: backend for backend in (KernelBackend, NumpyBackend, NumbaBackend)}
+_instances = {}
+
+
+def available_backends() -> list:
+    return [name for name in BACKENDS if name != 'numba' or numba is not None]
+
+
+def get_backend(name: str = None) -> SolverBackend:
+    """
+    :param name: "python", "numpy" or "numba", settings.KINEMATICS_SOLVER_BACKEND by default
+    :return: Shared instance of the backend
+    """
+    name = name or getattr(settings, 'KINEMATICS_SOLVER_BACKEND', 'numpy')
+    if name not in BACKENDS:
+        raise ValueError("Backend must be one of: {}".format(', '.join(BACKENDS)))
+    backend = _instances.get(name)
+    if backend is None:
+        backend = _instances[name] = BACKENDS[name]()
+    return backend
+
+
+def compare_backends(links: dict, samples: int = 10000, names: list = None, seed=None) -> dict:
+    """
+    Check backends against the Python reference and measure their throughput on the same random inputs.\n
+    :param links: dictionary, example: {"link1": [118, -80, 80], ...}
+    :param samples: Number of configurations and targets
+    :param names: Backends to compare, all available by default
+    :param seed: Seed of the random generator
+    :return: dictionary of backends: fk and ik largest differences to the reference, calls per second
+    """
+    chain = KinematicChain.from_links(links)
+    thetas = chain.sample(samples, seed)
+    positions = chain.fk_positions(thetas)[:, -1]
+    # Every other target is moved randomly, so unreachable targets are compared too
+    positions[::2] += np.random.default_rng(seed).normal(0.0, chain.reach() / 4, positions[::2].shape)
+    targets = np.column_stack([positions, thetas[:, 1] + thetas[:, 2] + thetas[:, 3]])
+
+    reference = get_backend('python')
+    expected_fk = reference.fk_positions(links, thetas)
+    expected_ik = reference.ik_branches(links, *targets.T)
+    report = {}
+    for name in names or available_backends():
+        backend = get_backend(name)
+        # The first call compiles or loads compiled code, it is not measured
+        backend.fk_positions(links, thetas[:1])
+        backend.ik_branches(links, *targets[:1].T)
+
+        started = time.perf_counter()
+        fk = backend.fk_positions(links, thetas)
+        fk_time = time.perf_counter() - started
+        started = time.perf_counter()
+        ik = backend.ik_branches(links, *targets.T)
+        ik_time = time.perf_counter() - started
+
+        same_nan = np.array_equal(np.isnan(ik), np.isnan(expected_ik))
+        angles = np.abs((ik - expected_ik + 180) % 360 - 180)
+        report[name] = {
+            'fk_max_difference': float(np.max(np.abs(fk - expected_fk))),
+            'ik_max_difference': float(np.nanmax(angles)) if same_nan and not np.all(np.isnan(angles)) else None,
+            'ik_same_reachability': same_nan,
+            'fk_per_second': round(samples / max(fk_time, 1e-12)),
+            'ik_per_second': round(samples / max(ik_time, 1e-12)),
+        }
+    return report
@@ -0,0 +1,136 @@
+""" Module allows stored forward and inverse kinematics calculations of many robots to be calculated at once"""
+import numpy as np
+
+from robot.ik_solver import ik_valid_mask
+from robot.kernels import ik_branches
+from robot.kinematic_chain import dh_matrices
+
+# Twist and theta offset of rows of the 4 joints preset, the same as KinematicChain.from_links
+PRESET_ALPHA = np.radians([90.0, 0.0, 0.0, 0.0, 0.0])
+PRESET_THETA = np.radians([0.0, 0.0, 0.0, 0.0, -90.0])
+
+
+def links_arrays(links: list):
+    """
+    Stack geometries of robots into arrays.\n
+    :param links: list of links dictionaries, example: [{"link1": [118, -80, 80], ...}, ...]
+    :return: lengths, ranges, defined: Arrays (n, 5) of link1..link5, (n, 4, 2) of joints [min, max]
+     and bool array (n,) of geometries the solvers accept - integer, non negative lengths and ranges given
+    """
+    lengths = np.zeros((len(links), 5))
+    ranges = np.zeros((len(links), 4, 2))
+    defined = np.zeros(len(links), dtype=bool)
+    for index, robot_links in enumerate(links):
+        values = [robot_links["link{}".format(number)] for number in range(1, 6)]
+        if any(not isinstance(value[0], int) or value[0] < 0 for value in values) or \
+                any(limit is None for value in values[:4] for limit in value[1:3]):
+            continue
+        lengths[index] = [value[0] for value in values]
+        ranges[index] = [value[1:3] for value in values[:4]]
+        defined[index] = True
+    return lengths, ranges, defined
+
+
+def fk_values(lengths: np.array, thetas: np.array) -> np.array:
+    """
+    End effector position and orientation of every record, the rounding rules of FkSolver.fk_solver.\n
+    :param lengths: Array (m, 5) of link1..link5 lengths of the robot of every record
+    :param thetas: Array (m, 4) of theta1..theta4 in degrees
+    :return: Array (m, 4) with [x, y, z, alpha], alpha is 0 if it can not be calculated
+    """
+    theta = np.broadcast_to(PRESET_THETA, lengths.shape).copy()
+    theta[:, :4] += np.radians(thetas)
+    d = np.zeros_like(lengths)
+    d[:, 0] = lengths[:, 0]
+    a = lengths.copy()
+    a[:, 0] = 0.0
+    matrices = dh_matrices(theta, d, a, np.cos(PRESET_ALPHA), np.sin(PRESET_ALPHA))
+    frame = matrices[:, 0]
+    positions = []
+    for row in range(1, lengths.shape[1]):
+        frame = frame @ matrices[:, row]
+        positions.append(np.round(frame[:, :3, 3]))
+    # Orientation from the height of the effector above the end of the 2nd link
+    link4 = np.round(lengths[:, 3])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = (positions[-1][:, 2] - positions[-3][:, 2]) / link4
+    alpha = np.where((link4 != 0) & (np.abs(ratio) <= 1),
+                     np.round(np.degrees(np.arcsin(np.clip(np.nan_to_num(ratio), -1, 1)))), 0.0)
+    return np.column_stack([positions[-1], alpha])
+
+
+def ik_values(lengths: np.array, ranges: np.array, targets: np.array) -> np.array:
+    """
+    Both elbow configurations of every record, base towards the target. Configuration outside of joints ranges
+    or unreachable is [0, 0, 0, 0], the same as IkSolver.ik_get_config1 and ik_get_config2.\n
+    :param lengths: Array (m, 5) of link1..link5 lengths of the robot of every record
+    :param ranges: Array (m, 4, 2) of joints [min, max]
+    :param targets: Array (m, 4) of [x, y, z, alpha]
+    :return: Array (m, 8) with theta1..theta4 of config 1 and theta11..theta44 of config 2
+    """
+    configs = ik_branches(*lengths.T, *np.asarray(targets, dtype=float).T)[:, :2]
+    valid = ik_valid_mask(configs, ranges[:, None])
+    configs = np.where(valid[..., None], np.round(configs, 2), 0.0)
+    return configs.reshape(len(configs), 8)
+
+
+def evaluate_robots(lengths: np.array, ranges: np.array, targets, defined: np.array = None) -> dict:
+    """
+    Solve every target for every robot in one vectorized pass, geometries are broadcast against targets.\n
+    Joint margin of a configuration is the smallest distance of its joints to their limits, the best branch
+    of a robot and target is the valid one with the largest margin.\n
+    :param lengths: Array (n, 5) of link1..link5 lengths of robots
+    :param ranges: Array (n, 4, 2) of joints [min, max]
+    :param targets: Array like (t, 4) of [x, y, z, alpha]
+    :param defined: Bool array (n,) returned by links_arrays, other robots are infeasible
+    :return: dictionary: feasible (n, t) bool, margin (n, t) in degrees, nan if infeasible,
+     branch (n, t) of the best branch, -1 if infeasible, configs (n, t, 4) of the best branches
+    """
+    targets = np.array(targets, dtype=float, ndmin=2)
+    if targets.shape[1] != 4:
+        raise ValueError("Targets must be [x, y, z, alpha]")
+    # (n, 1) geometries against (1, t) targets give branches of shape (n, t, 4, 4)
+    configs = ik_branches(*(lengths.T[:, :, None]), *(targets.T[:, None, :]))
+    limits = ranges[:, None, None]
+    valid = ik_valid_mask(configs, limits)
+    with np.errstate(invalid='ignore'):
+        margins = np.min(np.minimum(configs - limits[..., 0], limits[..., 1] - configs), axis=-1)
+    margins = np.where(valid, margins, -np.inf)
+    branch = np.argmax(margins, axis=-1)
+    feasible = np.any(valid, axis=-1)
+    if defined is not None:
+        feasible &= defined[:, None]
+    margin = np.take_along_axis(margins, branch[..., None], axis=-1)[..., 0]
+    best = np.take_along_axis(configs, branch[..., None, None], axis=-2)[..., 0, :]
+    return {
+        'feasible': feasible,
+        'margin': np.where(feasible, np.maximum(margin, 0.0), np.nan),
+        'branch': np.where(feasible, branch, -1),
+        'configs': np.where(feasible[..., None], best, np.nan),
+    }
+
+
+def evaluation_to_dict(result: dict, names: list, decimals: int = 2) -> dict:
+    """
+    Json serializable result of evaluate_robots with robots ranked by feasible targets and the worst margin.\n
+    :param result: dictionary returned by evaluate_robots
+    :param names: Names of robots, rows of the matrices
+    :param decimals: Number of decimals
+    :return: dictionary: robots, feasible, margin, branch, configs matrices, ranking of robots indexes
+    """
+    feasible = result['feasible']
+    margin = np.round(result['margin'], decimals)
+    counts = feasible.sum(axis=1)
+    # Smallest margin over the feasible targets, robots without feasible targets are the last
+    worst = np.where(counts > 0, np.min(np.where(feasible, margin, np.inf), axis=1, initial=np.inf), -1.0)
+    ranking = sorted(range(len(names)), key=lambda index: (-counts[index], -worst[index]))
+    configs = np.round(result['configs'], decimals)
+    return {
+        'robots': list(names),
+        'feasible': feasible.tolist(),
+        'margin': [[None if np.isnan(value) else float(value) for value in row] for row in margin],
+        'branch': result['branch'].tolist(),
+        'configs': [[None if np.isnan(config[0]) else config.tolist() for config in row] for row in configs],
+        'feasible_count': counts.tolist(),
+        'ranking': ranking,
+    }
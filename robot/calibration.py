@@ -0,0 +1,182 @@
+""" Module allows DH parameters of robotic arm to be fitted to measured end effector positions"""
+import numpy as np
+
+from robot.kinematic_chain import KinematicChain
+
+# Largest number of samples whose jacobians are held in memory at once
+CHUNK_SIZE = 65536
+
+
+def calibration_parameters(chain: KinematicChain, offsets: bool = False) -> list:
+    """
+    Fitted entries of the DH table: non zero d and a of every row and optionally theta offsets of joints.\n
+    :param chain: KinematicChain
+    :param offsets: Fit joints zero offsets too
+    :return: list of (row, column) of the DH table, column 0 - theta, 1 - d, 2 - a
+    """
+    parameters = [(row, column) for row in range(len(chain.dh_table)) for column in (1, 2)
+                  if chain.dh_table[row, column] != 0]
+    if offsets:
+        parameters += [(int(row), 0) for row in chain.joints]
+    return parameters
+
+
+def with_parameters(chain: KinematicChain, parameters: list, values: np.array) -> KinematicChain:
+    """
+    :return: Copy of the chain with given values of the DH table entries
+    """
+    dh_table = chain.dh_table.copy()
+    for (row, column), value in zip(parameters, values):
+        dh_table[row, column] = value
+    joints = np.zeros(len(dh_table), dtype=bool)
+    joints[chain.joints] = True
+    return KinematicChain(dh_table, joints, chain.ranges)
+
+
+def position_jacobian(chain: KinematicChain, q: np.array, parameters: list):
+    """
+    End effector positions and their analytic derivatives by the DH table entries.\n
+    d of row i moves the end along z axis of the frame before the row, a along x axis of the frame after it,
+    theta rotates the rest of the chain around that z axis.\n
+    :param chain: KinematicChain
+    :param q: Array of shape (m, dof) in degrees
+    :param parameters: list of (row, column) returned by calibration_parameters
+    :return: positions, jacobian: Arrays (m, 3) and (m, 3, p), derivatives by mm and degree
+    """
+    frames = chain.fk_frames(q)
+    end = frames[:, -1, :3, 3]
+    columns = []
+    for row, column in parameters:
+        if column == 1:
+            columns.append(frames[:, row, :3, 2])
+        elif column == 2:
+            columns.append(frames[:, row + 1, :3, 0])
+        else:
+            axis = frames[:, row, :3, 2]
+            columns.append(np.radians(1.0) * np.cross(axis, end - frames[:, row, :3, 3]))
+    return end, np.stack(columns, axis=-1)
+
+
+def _residual_stats(residuals: np.array) -> dict:
+    distance = np.linalg.norm(residuals, axis=1)
+    p50, p95 = np.percentile(distance, [50, 95])
+    return {
+        'rms': float(np.sqrt(np.mean(distance ** 2))),
+        'rms_xyz': np.sqrt(np.mean(residuals ** 2, axis=0)).tolist(),
+        'mean': float(distance.mean()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'max': float(distance.max()),
+    }
+
+
+def calibrate(chain: KinematicChain, thetas, measured, offsets: bool = False, iterations: int = 30,
+              tolerance: float = 1e-10) -> dict:
+    """
+    Fit DH parameters to measured end effector positions with Levenberg-Marquardt least squares.\n
+    Normal equations J^T J and J^T r are accumulated in chunks of CHUNK_SIZE samples, so memory of one step
+    does not depend on the number of samples. Lengths enter positions linearly, so without offsets
+    the first step already reaches the optimum.\n
+    :param chain: KinematicChain with nominal parameters, used as the starting point
+    :param thetas: Array like of shape (m, dof) of commanded joints in degrees
+    :param measured: Array like of shape (m, 3) of measured end effector positions in mm
+    :param offsets: Fit joints zero offsets too
+    :param iterations: Largest number of iterations
+    :param tolerance: Relative decrease of squared residuals ending the fit
+    :return: dictionary: chain (fitted KinematicChain), parameters, nominal, fitted, std_error, iterations,
+     condition of the problem, status, before and after residual statistics
+    """
+    thetas = np.array(thetas, dtype=float, ndmin=2)
+    measured = np.array(measured, dtype=float, ndmin=2)
+    if thetas.shape[1] != chain.dof or measured.shape != (len(thetas), 3):
+        raise ValueError("Samples must have {} joint values and 3 coordinates".format(chain.dof))
+    if not np.all(np.isfinite(thetas)) or not np.all(np.isfinite(measured)):
+        raise ValueError("Samples must have finite values")
+    parameters = calibration_parameters(chain, offsets)
+    if len(thetas) * 3 <= len(parameters):
+        raise ValueError("At least {} samples are needed".format(len(parameters) // 3 + 1))
+
+    def normal_equations(values):
+        fitted = with_parameters(chain, parameters, values)
+        jtj = np.zeros((len(parameters), len(parameters)))
+        jtr = np.zeros(len(parameters))
+        cost = 0.0
+        for start in range(0, len(thetas), CHUNK_SIZE):
+            positions, jacobian = position_jacobian(fitted, thetas[start:start + CHUNK_SIZE], parameters)
+            residual = measured[start:start + CHUNK_SIZE] - positions
+            jtj += np.einsum('mip,miq->pq', jacobian, jacobian)
+            jtr += np.einsum('mip,mi->p', jacobian, residual)
+            cost += float(np.sum(residual ** 2))
+        return jtj, jtr, cost
+
+    nominal = np.array([chain.dh_table[row, column] for row, column in parameters])
+    values = nominal.copy()
+    jtj, jtr, cost = normal_equations(values)
+    damping = 1e-6
+    iteration = 0
+    for iteration in range(1, iterations + 1):
+        scale = np.diag(jtj).copy()
+        scale[scale <= 0] = 1.0
+        step = np.linalg.solve(jtj + damping * np.diag(scale), jtr)
+        new_values = values + step
+        new_jtj, new_jtr, new_cost = normal_equations(new_values)
+        if new_cost <= cost:
+            converged = cost - new_cost <= tolerance * max(cost, 1e-12)
+            values, jtj, jtr, cost = new_values, new_jtj, new_jtr, new_cost
+            damping = max(damping / 10, 1e-12)
+            if converged:
+                break
+        else:
+            damping *= 10
+            if damping > 1e6:
+                break
+
+    fitted = with_parameters(chain, parameters, values)
+    before = measured - chain.fk_positions(thetas)[:, -1]
+    after = measured - fitted.fk_positions(thetas)[:, -1]
+    # Standard errors from the residual variance and the inverse of J^T J
+    variance = cost / max(3 * len(thetas) - len(parameters), 1)
+    std_error = np.sqrt(np.clip(np.diag(np.linalg.pinv(jtj)) * variance, 0, None))
+    # Condition of the scaled normal matrix, poses which do not excite some parameters or parameters
+    # with the same effect (e.g. last joint offset and two perpendicular tool lengths) make it singular
+    scale = np.sqrt(np.clip(np.diag(jtj), 1e-300, None))
+    eigenvalues = np.linalg.eigvalsh(jtj / np.outer(scale, scale))
+    condition = float(eigenvalues[-1] / max(eigenvalues[0], 1e-300))
+    if condition > 1e8:
+        status = 'Warning: Parameters are not identifiable from the samples, fitted values are one of many solutions'
+    else:
+        status = 'Calibration ended successfully'
+    names = {0: 'theta', 1: 'd', 2: 'a'}
+    return {
+        'chain': fitted,
+        'parameters': ['{}{}'.format(names[column], row + 1) for row, column in parameters],
+        'nominal': nominal,
+        'fitted': values,
+        'std_error': std_error,
+        'iterations': iteration,
+        'condition': condition,
+        'status': status,
+        'samples': len(thetas),
+        'before': _residual_stats(before),
+        'after': _residual_stats(after),
+    }
+
+
+def calibration_to_dict(result: dict, decimals: int = 4) -> dict:
+    """
+    Json serializable result of calibrate.\n
+    :param result: dictionary returned by calibrate
+    :param decimals: Number of decimals
+    :return: dictionary, fitted chain as {"dh": ..., "joints": ..., "ranges": ...}
+    """
+    data = {}
+    for name, value in result.items():
+        if name == 'chain':
+            data[name] = value.to_dict()
+        elif isinstance(value, np.ndarray):
+            data[name] = np.round(value, decimals).tolist()
+        elif isinstance(value, dict):
+            data[name] = {key: np.round(item, decimals).tolist() for key, item in value.items()}
+        else:
+            data[name] = value
+    return data
@@ -0,0 +1,16 @@
+""" Module allows deployment settings the robot app relies on to be checked"""
+from django.core.checks import Error, Tags, register
+
+from robot.jog import jog_cache_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_jog_cache(app_configs, **kwargs):
+    """
+    Live jog passes slider states between worker processes through the default cache.\n
+    """
+    if jog_cache_shared():
+        return []
+    return [Error('Default cache is local to the worker process, live jog does not work with many workers.',
+                  hint='Configure CACHES with a backend shared between processes, e.g. Redis or file based.',
+                  id='robot.E001')]
@@ -0,0 +1,137 @@
+""" Module allows self-collision and floor collision of robotic arm to be checked"""
+import numpy as np
+
+# Radius of the capsule around every link [mm]
+LINK_RADIUS = 15.0
+# Height of the floor plane [mm]
+FLOOR_Z = 0.0
+EPS = 1e-9
+
+
+def segment_distance(p1: np.array, q1: np.array, p2: np.array, q2: np.array) -> np.array:
+    """
+    Vectorized shortest distance between segments p1-q1 and p2-q2. \n
+    All points are broadcast against each other, last axis holds xyz.\n
+    Based on the closest points of two segments algorithm (Ericson, Real-Time Collision Detection).\n
+    :param p1: Start points of 1st segments
+    :param q1: End points of 1st segments
+    :param p2: Start points of 2nd segments
+    :param q2: End points of 2nd segments
+    :return: Array of distances
+    """
+    d1 = q1 - p1
+    d2 = q2 - p2
+    r = p1 - p2
+    a = np.einsum('...i,...i->...', d1, d1)
+    e = np.einsum('...i,...i->...', d2, d2)
+    f = np.einsum('...i,...i->...', d2, r)
+    c = np.einsum('...i,...i->...', d1, r)
+    b = np.einsum('...i,...i->...', d1, d2)
+    denom = a * e - b * b
+
+    a_safe = np.where(a > EPS, a, 1.0)
+    e_safe = np.where(e > EPS, e, 1.0)
+    denom_safe = np.where(denom > EPS, denom, 1.0)
+
+    # General case, parallel segments start from s = 0
+    s = np.where(denom > EPS, np.clip((b * f - c * e) / denom_safe, 0, 1), 0.0)
+    t = (b * s + f) / e_safe
+    s = np.where(t < 0, np.clip(-c / a_safe, 0, 1), np.where(t > 1, np.clip((b - c) / a_safe, 0, 1), s))
+    t = np.clip(t, 0, 1)
+
+    # Degenerated segments (points)
+    first_point = a <= EPS
+    second_point = e <= EPS
+    s = np.where(first_point, 0.0, s)
+    t = np.where(first_point, np.clip(f / e_safe, 0, 1), t)
+    s = np.where(second_point, np.where(first_point, 0.0, np.clip(-c / a_safe, 0, 1)), s)
+    t = np.where(second_point, 0.0, t)
+
+    closest1 = p1 + d1 * s[..., None]
+    closest2 = p2 + d2 * t[..., None]
+    return np.linalg.norm(closest1 - closest2, axis=-1)
+
+
+def link_capsules(positions: np.array) -> np.array:
+    """
+    Drop links with 0 length, so links connected through them are treated as neighbours.\n
+    Links lengths do not depend on the configuration, 1st configuration is used to find them.\n
+    :param positions: Array of shape (n, points, 3) returned by fk_positions_batch
+    :return: Array of shape (n, k, 3) with k - 1 capsules axes
+    """
+    lengths = np.linalg.norm(np.diff(positions[0], axis=0), axis=-1)
+    keep = np.concatenate([[True], lengths > EPS])
+    return positions[:, keep]
+
+
+def self_collision(positions: np.array, radius: float = LINK_RADIUS) -> np.array:
+    """
+    Check if not neighbouring link capsules intersect each other.\n
+    :param positions: Array of shape (n, points, 3) returned by fk_positions_batch
+    :param radius: Radius of the links capsules
+    :return: Bool array of shape (n,), True - configuration in collision
+    """
+    points = link_capsules(positions)
+    first, second = np.triu_indices(points.shape[1] - 1, 2)
+    if not len(first):
+        return np.zeros(len(positions), dtype=bool)
+
+    distance = segment_distance(points[:, first], points[:, first + 1], points[:, second], points[:, second + 1])
+    return np.any(distance < 2 * radius, axis=1)
+
+
+def floor_collision(positions: np.array, radius: float = LINK_RADIUS, floor_z: float = FLOOR_Z) -> np.array:
+    """
+    Check if moving links capsules go below the floor plane.\n
+    Base link and the joint on its top are fixed, so they are skipped.\n
+    :param positions: Array of shape (n, points, 3) returned by fk_positions_batch
+    :param radius: Radius of the links capsules
+    :param floor_z: Height of the floor plane
+    :return: Bool array of shape (n,), True - configuration in collision
+    """
+    return np.any(positions[:, 2:, 2] < floor_z + radius, axis=1)
+
+
+def check_collisions(positions: np.array, radius: float = LINK_RADIUS, floor: bool = True) -> np.array:
+    """
+    Check self-collision and optionally floor collision of many configurations at once.\n
+    :param positions: Array of shape (n, points, 3) returned by fk_positions_batch
+    :param radius: Radius of the links capsules
+    :param floor: Check collision with the floor plane
+    :return: Bool array of shape (n,), True - configuration in collision
+    """
+    collision = self_collision(positions, radius)
+    if floor:
+        collision |= floor_collision(positions, radius)
+    return collision
+
+
+def point_segment_distance(points: np.array, p: np.array, q: np.array) -> np.array:
+    """
+    Vectorized shortest distance between points and segments p-q, all broadcast against each other.\n
+    :param points: Points, last axis holds xyz
+    :param p: Start points of segments
+    :param q: End points of segments
+    :return: Array of distances
+    """
+    d = q - p
+    length = np.einsum('...i,...i->...', d, d)
+    t = np.einsum('...i,...i->...', points - p, d) / np.where(length > EPS, length, 1.0)
+    closest = p + d * np.clip(t, 0, 1)[..., None]
+    return np.linalg.norm(points - closest, axis=-1)
+
+
+def sphere_collision(positions: np.array, spheres: np.array, radius: float = LINK_RADIUS) -> np.array:
+    """
+    Check if links capsules intersect spherical obstacles (fixtures).\n
+    :param positions: Array of shape (n, points, 3) returned by fk_positions_batch
+    :param spheres: Array like of shape (k, 4) with [x, y, z, r] of each obstacle
+    :param radius: Radius of the links capsules
+    :return: Bool array of shape (n,), True - configuration in collision
+    """
+    spheres = np.array(spheres, dtype=float, ndmin=2).reshape(-1, 4)
+    if not len(spheres):
+        return np.zeros(len(positions), dtype=bool)
+    # (n, links, 1, 3) against (k, 3)
+    distance = point_segment_distance(spheres[:, :3], positions[:, :-1, None], positions[:, 1:, None])
+    return np.any(distance < spheres[:, 3] + radius, axis=(1, 2))
@@ -3,6 +3,9 @@ from typing import Tuple, List
 import numpy as np
 import math
 
+from robot.backends import get_backend
+from robot.kinematic_chain import KinematicChain, dh_matrices
+
 
 class FkSolver:
     """ Class allows to calculate forward kinematics of the robotic arm with given parameters and specified length of robotic arm links.
@@ -202,6 +205,61 @@ class FkSolver:
                             status)
             return return_error
 
+    @staticmethod
+    def fk_hom_matrix_batch(theta: np.array, d: np.array, a: np.array, alpha: np.array) -> np.array:
+        """
+        Vectorized generation of homogenous transformation matrices. \n
+        Parameters are broadcast against each other, angles in radians.\n
+        :param theta: Joint rotation angles
+        :param d: Offsets along previous z
+        :param a: Lengths along common normal
+        :param alpha: Twist angles
+        :return: t_dh - array of homogenous trans. matrices with shape (..., 4, 4)
+        """
+        return dh_matrices(theta, d, a, np.cos(alpha), np.sin(alpha))
+
+    def fk_chain(self) -> KinematicChain:
+        """
+        Kinematic chain preset of the initialized robotic model.\n
+        :return: KinematicChain
+        """
+        if None in (self.link1, self.link2, self.link3, self.link4, self.link5):
+            raise TypeError("Robot configurations not defined correctly")
+        return KinematicChain.from_links({"link1": [self.link1, self.link1_min, self.link1_max],
+                                          "link2": [self.link2, self.link2_min, self.link2_max],
+                                          "link3": [self.link3, self.link3_min, self.link3_max],
+                                          "link4": [self.link4, self.link4_min, self.link4_max],
+                                          "link5": [self.link5, self.link5_min, self.link5_max]})
+
+    def fk_positions_batch(self, thetas) -> np.array:
+        """
+        Calculate positions of all links ends for many configurations at once, backend is set by
+        KINEMATICS_SOLVER_BACKEND.\n
+        Example: thetas = [[0.0, 90.0, 0.0, 0.0], [10.0, 45.0, -30.0, 0.0]] \n
+        :param thetas: Array like of shape (n, 4) with theta1..theta4 in degrees
+        :return: Array of shape (n, 6, 3): base origin, end of link1 ... end of link5
+        """
+        if None in (self.link1, self.link2, self.link3, self.link4, self.link5):
+            raise TypeError("Robot configurations not defined correctly")
+        return get_backend().fk_positions(self.links, thetas)
+
+    def fk_alpha(self, positions) -> Tuple[int, str]:
+        """
+        End effector orientation from already calculated links positions, the same rule as in fk_solver.\n
+        :param positions: Array like of shape (6, 3) returned by fk_positions_batch for one configuration
+        :return: alpha; status
+        """
+        try:
+            if round(self.link4) == 0:
+                raise ZeroDivisionError
+            z_ef = round(positions[-1][2]) - round(positions[3][2])
+            alpha = math.degrees(math.asin(z_ef / round(self.link4)))
+            return round(alpha), "Forward kinematics calculations ended successfully"
+        except ZeroDivisionError:
+            return 0, "ZeroDivisionError: Table_dh[-2][-2] must be != 0"
+        except ValueError:
+            return 0, "Sth went wrong"
+
     @staticmethod
     def fk_solve_user(dh_table) -> Tuple[int, List[Tuple[float, float, float]], str]:
         """
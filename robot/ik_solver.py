@@ -1,6 +1,66 @@
 """ Module allows inverse kinematics to be calculated"""
+from typing import Tuple
 
 import math
+import numpy as np
+
+from robot.backends import get_backend
+from robot.kernels import IK_TOLERANCE
+
+
+def ik_valid_mask(configs: np.array, ranges: np.array) -> np.array:
+    """
+    Vectorized comparison of solution branches against joint ranges.\n
+    :param configs: Array of shape (..., 4) returned by ik_branches
+    :param ranges: Array of shape (..., 4, 2) with [min, max] of each joint, broadcast against configs
+    :return: Bool array of shape configs.shape[:-1]
+    """
+    ranges = np.asarray(ranges, dtype=float)
+    with np.errstate(invalid='ignore'):
+        inside = (configs >= ranges[..., 0] - IK_TOLERANCE) & (configs <= ranges[..., 1] + IK_TOLERANCE)
+    return np.all(inside, axis=-1)
+
+
+def ik_min_motion(configs: np.array, valid: np.array, start=None) -> Tuple[np.array, np.array]:
+    """
+    Choose one solution branch for every target of a sequence, so the total joint motion is minimal.\n
+    Dynamic programming over the branches (Viterbi): every step keeps the cheapest path ending in each branch.\n
+    Joint motion between two configurations is the sum of absolute joint angle differences.\n
+    :param configs: Array of shape (m, b, dof) returned by ik_branches for m targets
+    :param valid: Bool array of shape (m, b) returned by ik_valid_mask
+    :param start: Array like of shape (dof,) with the joint state before the 1st target, optional
+    :return: branches, motion: Int array (m,) of chosen branches and array (m,) of joint motion of every step,
+     None, None if any target has no valid branch
+    """
+    configs = np.asarray(configs, dtype=float)
+    valid = np.asarray(valid, dtype=bool)
+    count, branches_count = valid.shape
+    if count == 0 or not np.all(np.any(valid, axis=1)):
+        return None, None
+
+    if start is None:
+        cost = np.zeros(branches_count)
+    else:
+        cost = np.abs(configs[0] - np.asarray(start, dtype=float)).sum(axis=-1)
+    cost = np.where(valid[0], cost, np.inf)
+    previous = np.zeros((count, branches_count), dtype=int)
+    with np.errstate(invalid='ignore'):
+        for step in range(1, count):
+            # motion[i, j] - from branch i of previous target to branch j of this target
+            motion = np.abs(configs[step - 1][:, None] - configs[step][None]).sum(axis=-1)
+            total = np.where(valid[step - 1][:, None] & valid[step][None], cost[:, None] + motion, np.inf)
+            previous[step] = np.argmin(total, axis=0)
+            cost = total[previous[step], np.arange(branches_count)]
+
+    branches = np.empty(count, dtype=int)
+    branches[-1] = np.argmin(cost)
+    for step in range(count - 1, 0, -1):
+        branches[step - 1] = previous[step, branches[step]]
+
+    path = configs[np.arange(count), branches]
+    before = path[:1] if start is None else np.asarray(start, dtype=float)[None]
+    motion = np.abs(np.diff(np.concatenate([before, path]), axis=0)).sum(axis=-1)
+    return branches, motion
 
 
 class IkSolver:
@@ -191,8 +251,62 @@ class IkSolver:
         finally:
             print('Inverse kinematics calculations ended')
 
+    def ik_ranges(self) -> np.array:
+        """
+        Joints ranges of the robotic arm.\n
+        :return: Array of shape (4, 2) with [min, max] of theta0..theta3
+        """
+        return np.array([[self.link1_min, self.link1_max],
+                         [self.link2_min, self.link2_max],
+                         [self.link3_min, self.link3_max],
+                         [self.link4_min, self.link4_max]], dtype=float)
+
+    def ik_solve_branches(self, px, py, pz, alfa) -> Tuple[np.array, np.array, str]:
+        """
+        Calculate all solution branches in one pass and filter them with the robots joints ranges.\n
+        Targets may be given as arrays to solve many of them at once, backend is set by KINEMATICS_SOLVER_BACKEND.\n
+        :param px: Target x
+        :param py: Target y
+        :param pz: Target z
+        :param alfa: Effector orientation in degrees
+        :return: configs, valid, status: Array (..., 4, 4) of branches, bool validity mask (..., 4) and status
+        """
+        if None in (self.link1, self.link2, self.link3, self.link4, self.link5):
+            raise TypeError("Robot configurations not defined correctly")
+
+        configs = get_backend().ik_branches(self.links, px, py, pz, alfa)
+        valid = ik_valid_mask(configs, self.ik_ranges())
+        if np.any(valid):
+            status = 'Calculations ended successfully'
+        else:
+            status = 'Warning: No results'
+        return configs, valid, status
+
+    def ik_solve_sequence(self, targets, start=None) -> Tuple[np.array, np.array, np.array, str]:
+        """
+        Solve ordered targets (e.g. pick-and-place sequence) choosing branches with minimal joint motion.\n
+        Example: targets = [[200, 0, 300, 0], [200, 50, 250, -30]] \n
+        :param targets: Array like of shape (m, 4) with [x, y, z, alfa] of every target
+        :param start: [theta1, theta2, theta3, theta4] before the 1st target, optional
+        :return: configs, branches, motion, status: Arrays (m, 4) of chosen configurations, (m,) of branches
+         and (m,) of joint motion of every step, None if the sequence can not be solved
+        """
+        targets = np.array(targets, dtype=float, ndmin=2)
+        if targets.ndim != 2 or targets.shape[1] != 4:
+            raise ValueError("Targets must have shape (m, 4)")
+        configs, valid, _ = self.ik_solve_branches(*targets.T)
+        branches, motion = ik_min_motion(configs, valid, start)
+        if branches is None:
+            unreachable = np.flatnonzero(~np.any(valid, axis=1))
+            step = int(unreachable[0]) + 1 if len(unreachable) else 0
+            return None, None, None, 'Warning: No results for target {}'.format(step)
+        path = configs[np.arange(len(configs)), branches]
+        return path, branches, motion, 'Calculations ended successfully'
+
     def ik_get_config1(self):
-        if -80 <= self.theta0 <= 80 and 5 <= self.theta1 <= 175 and -115 <= self.theta2 <= 55 and -85 <= self.theta3 <= 85:
+        if self.theta1 is not None and \
+                self.link1_min <= self.theta0 <= self.link1_max and self.link2_min <= self.theta1 <= self.link2_max and \
+                self.link3_min <= self.theta2 <= self.link3_max and self.link4_min <= self.theta3 <= self.link4_max:
             status_config_1 = "Config_1: Success"
             config_1 = [round(self.theta0, 2), round(self.theta1, 2), round(self.theta2, 2), round(self.theta3, 2)]
 
@@ -203,7 +317,9 @@ class IkSolver:
         return config_1, status_config_1
 
     def ik_get_config2(self):
-        if -80 <= self.theta0 <= 80 and 5 <= self.theta11 <= 175 and -115 <= self.theta22 <= 55 and -85 <= self.theta33 <= 85:
+        if self.theta11 is not None and \
+                self.link1_min <= self.theta0 <= self.link1_max and self.link2_min <= self.theta11 <= self.link2_max and \
+                self.link3_min <= self.theta22 <= self.link3_max and self.link4_min <= self.theta33 <= self.link4_max:
             status_config_2 = "Config_2: Success"
             config_2 = [round(self.theta0, 2), round(self.theta11, 2), round(self.theta22, 2), round(self.theta33, 2)]
 
@@ -0,0 +1,120 @@
+""" Module allows robotic arm to be jogged live: slider states are coalesced and FK results streamed as server-sent events"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from robot.collision import check_collisions
+from robot.kinematic_chain import IncrementalFk
+from robot.robotic_arm import RoboticArm
+
+
+# Cache backends keeping values only in the worker process, slider states would not reach other workers
+LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+_streams = None
+_streams_lock = threading.Lock()
+
+
+def jog_cache_shared() -> bool:
+    """
+    Check if the default cache is shared between worker processes, live jog needs it to pass slider states.\n
+    :return: bool
+    """
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHES
+
+
+def stream_slots() -> threading.BoundedSemaphore:
+    """
+    Every open stream holds a worker thread, at most KINEMATICS_JOG_MAX_STREAMS are open in the process.\n
+    """
+    global _streams
+    with _streams_lock:
+        if _streams is None:
+            _streams = threading.BoundedSemaphore(settings.KINEMATICS_JOG_MAX_STREAMS)
+    return _streams
+
+
+def jog_key(user_id: int, fk_id: int) -> str:
+    return 'fk-jog:{}:{}'.format(user_id, fk_id)
+
+
+def jog_publish(user_id: int, fk_id: int, thetas: list) -> int:
+    """
+    Store the latest slider state, older unsent states are overwritten (coalesced).\n
+    Cache is used, so the state is visible to the worker process holding the stream
+    when the cache backend is shared between processes.\n
+    :param user_id: Id of the jogging user
+    :param fk_id: Id of the forward kinematics record
+    :param thetas: [theta1, theta2, theta3, theta4]
+    :return: version of the state
+    """
+    key = jog_key(user_id, fk_id)
+    state = cache.get(key) or {'version': 0}
+    state = {'version': state['version'] + 1, 'thetas': thetas}
+    cache.set(key, state, settings.KINEMATICS_JOG_IDLE_TIMEOUT * 2)
+    return state['version']
+
+
+def jog_frame(robot_fk: RoboticArm, evaluator: IncrementalFk, thetas: list) -> dict:
+    """
+    Forward kinematics of one frame.\n
+    Sliders usually move one joint at a time, so the evaluator recomputes only transforms from that joint onward.\n
+    :param robot_fk: Robotic arm of the jogged robot
+    :param evaluator: Incremental FK of the stream
+    :param thetas: [theta1, theta2, theta3, theta4]
+    :return: dictionary with end effector position, orientation, links positions and collision flag
+    """
+    positions = evaluator.positions(thetas)
+    alpha, status = robot_fk.fk_alpha(positions)
+    return {
+        'thetas': thetas,
+        'x': float(round(positions[-1][0])),
+        'y': float(round(positions[-1][1])),
+        'z': float(round(positions[-1][2])),
+        'alpha': alpha,
+        'status_calc': status,
+        'positions': positions.round(1).tolist(),
+        'collision': bool(check_collisions(positions[None])[0]),
+    }
+
+
+def jog_events(robot_fk: RoboticArm, user_id: int, fk_id: int):
+    """
+    Generator of server-sent events. At most one FK is calculated per frame, only for the newest slider state.\n
+    Stream ends after KINEMATICS_JOG_IDLE_TIMEOUT seconds without slider changes, browser reconnects when needed.
+    Stream holds a worker thread, when all stream slots of the process are taken it ends at once with busy event.\n
+    :param robot_fk: Robotic arm of the jogged robot, links must be validated by the caller
+    :param user_id: Id of the jogging user
+    :param fk_id: Id of the forward kinematics record
+    :return: generator of event strings
+    """
+    key = jog_key(user_id, fk_id)
+    evaluator = IncrementalFk(robot_fk.fk_chain())
+    frame_time = 1 / settings.KINEMATICS_JOG_FPS
+    slots = stream_slots()
+    if not slots.acquire(blocking=False):
+        yield 'event: busy\ndata: {}\n\n'
+        return
+    try:
+        sent_version = None
+        last_change = last_event = time.monotonic()
+        yield 'retry: 1000\n\n'
+
+        while time.monotonic() - last_change < settings.KINEMATICS_JOG_IDLE_TIMEOUT:
+            started = time.monotonic()
+            state = cache.get(key)
+            if state is not None and state['version'] != sent_version:
+                sent_version = state['version']
+                last_change = last_event = started
+                frame = jog_frame(robot_fk, evaluator, state['thetas'])
+                yield 'id: {}\ndata: {}\n\n'.format(sent_version, json.dumps(frame))
+            elif started - last_event > 15:
+                # Heartbeat keeps proxies from closing idle connection
+                last_event = started
+                yield ': heartbeat\n\n'
+            time.sleep(max(0.0, frame_time - (time.monotonic() - started)))
+    finally:
+        slots.release()
@@ -0,0 +1,138 @@
+""" Module allows inverse and forward kinematics of the 4 joints robotic arm to be calculated by NumPy and scalar kernels"""
+import math
+
+import numpy as np
+
+# Tolerance of acos argument at the edge of the workspace
+IK_TOLERANCE = 1e-6
+
+
+def ik_branches(l0, l1, l2, l3, l4, px, py, pz, alfa) -> np.array:
+    """
+    Vectorized inverse kinematics returning every analytic solution branch.\n
+    All parameters are broadcast against each other, so many targets or many robots can be solved at once.\n
+    Branches order: \n
+    0 - base, elbow config 1 \n
+    1 - base, elbow config 2 \n
+    2 - base flipped by 180 deg, elbow config 1 \n
+    3 - base flipped by 180 deg, elbow config 2 \n
+    :param l0: Base height
+    :param l1: 1st links length
+    :param l2: 2nd links length
+    :param l3: "L" effector dimension
+    :param l4: "H" effector dimension
+    :param px: Target x
+    :param py: Target y
+    :param pz: Target z
+    :param alfa: Effector orientation in degrees
+    :return: Array of shape (..., 4, 4) with [theta0, theta1, theta2, theta3] in degrees, nan if unreachable
+    """
+    l0, l1, l2, l3, l4, px, py, pz, alfa = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (l0, l1, l2, l3, l4, px, py, pz, alfa)))
+    alfa = np.radians(alfa)
+
+    # XY plane - base rotation and R for both base configurations, shape (..., 2)
+    theta0 = np.arctan2(py, px)
+    vector_r = np.hypot(px, py)
+    theta0 = np.stack([theta0, theta0 + math.pi], axis=-1)
+    vector_r = np.stack([vector_r, -vector_r], axis=-1)
+
+    # Effector ZR plane
+    c = np.hypot(l3, l4)[..., None]
+    beta = np.arctan2(l4, l3)[..., None]
+    z_2nd_link = (pz - l0)[..., None] - c * np.sin(alfa[..., None] - beta)
+    r_2nd_link = vector_r - c * np.cos(alfa[..., None] - beta)
+
+    # ZR plane - both elbow configurations, shape (..., 2, 2)
+    l1 = l1[..., None]
+    l2 = l2[..., None]
+    delta = r_2nd_link ** 2 + z_2nd_link ** 2
+    denominator = 2 * l1 * l2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_theta2 = np.where(denominator > 0, (delta - l1 ** 2 - l2 ** 2) / np.where(denominator > 0, denominator, 1),
+                              np.where(np.abs(np.sqrt(delta) - l1 - l2) <= IK_TOLERANCE, 1.0, np.nan))
+        cos_theta2 = np.where(np.abs(cos_theta2) <= 1 + IK_TOLERANCE, np.clip(cos_theta2, -1, 1), np.nan)
+        theta2 = np.arccos(cos_theta2)
+    theta2 = np.stack([theta2, -theta2], axis=-1)
+    theta1 = np.arctan2(z_2nd_link, r_2nd_link)[..., None] - np.arctan2(
+        l2[..., None] * np.sin(theta2), l1[..., None] + l2[..., None] * np.cos(theta2))
+    theta3 = alfa[..., None, None] - theta1 - theta2
+    theta0 = np.broadcast_to(theta0[..., None], theta1.shape)
+
+    configs = np.degrees(np.stack([theta0, theta1, theta2, theta3], axis=-1))
+    # Wrap angles to [-180, 180)
+    configs = (configs + 180) % 360 - 180
+    return configs.reshape(configs.shape[:-3] + (4, 4))
+
+
+def fk_kernel(lengths, thetas, out):
+    """
+    Positions of base and all links ends, one configuration after another.\n
+    Base rotates the vertical plane of the arm, links 2-4 and the effector are planar in it.\n
+    :param lengths: Array (5,) of link1..link5 lengths
+    :param thetas: Array (m, 4) of theta1..theta4 in degrees
+    :param out: Array (m, 6, 3) filled with positions
+    """
+    for i in range(thetas.shape[0]):
+        base = math.radians(thetas[i, 0])
+        cos_base = math.cos(base)
+        sin_base = math.sin(base)
+        radius = 0.0
+        height = lengths[0]
+        angle = 0.0
+        out[i, 0, 0] = 0.0
+        out[i, 0, 1] = 0.0
+        out[i, 0, 2] = 0.0
+        out[i, 1, 0] = 0.0
+        out[i, 1, 1] = 0.0
+        out[i, 1, 2] = height
+        for link in range(4):
+            if link < 3:
+                angle += math.radians(thetas[i, link + 1])
+            else:
+                angle -= math.pi / 2
+            radius += lengths[link + 1] * math.cos(angle)
+            height += lengths[link + 1] * math.sin(angle)
+            out[i, link + 2, 0] = radius * cos_base
+            out[i, link + 2, 1] = radius * sin_base
+            out[i, link + 2, 2] = height
+
+
+def ik_kernel(lengths, targets, tolerance, out):
+    """
+    Every analytic solution branch, one target after another, in the order and with the rules of ik_branches.\n
+    :param lengths: Array (5,) of link1..link5 lengths
+    :param targets: Array (m, 4) of [x, y, z, alfa in degrees]
+    :param tolerance: Tolerance of acos argument at the edge of the workspace
+    :param out: Array (m, 4, 4) filled with branches in degrees, nan if unreachable
+    """
+    l0, l1, l2, l3, l4 = lengths[0], lengths[1], lengths[2], lengths[3], lengths[4]
+    c = math.hypot(l3, l4)
+    beta = math.atan2(l4, l3)
+    for i in range(targets.shape[0]):
+        px, py, pz = targets[i, 0], targets[i, 1], targets[i, 2]
+        alfa = math.radians(targets[i, 3])
+        theta0 = math.atan2(py, px)
+        radius = math.hypot(px, py)
+        z_2nd_link = pz - l0 - c * math.sin(alfa - beta)
+        for base in range(2):
+            r_2nd_link = (radius if base == 0 else -radius) - c * math.cos(alfa - beta)
+            delta = r_2nd_link ** 2 + z_2nd_link ** 2
+            if 2 * l1 * l2 > 0:
+                cos_theta2 = (delta - l1 ** 2 - l2 ** 2) / (2 * l1 * l2)
+            elif abs(math.sqrt(delta) - l1 - l2) <= tolerance:
+                cos_theta2 = 1.0
+            else:
+                cos_theta2 = math.nan
+            if abs(cos_theta2) <= 1 + tolerance:
+                theta2 = math.acos(min(max(cos_theta2, -1.0), 1.0))
+            else:
+                theta2 = math.nan
+            for elbow in range(2):
+                branch = 2 * base + elbow
+                theta = theta2 if elbow == 0 else -theta2
+                theta1 = math.atan2(z_2nd_link, r_2nd_link) - math.atan2(l2 * math.sin(theta), l1 + l2 * math.cos(theta))
+                values = (theta0 + math.pi * base, theta1, theta, alfa - theta1 - theta)
+                for joint in range(4):
+                    # Wrap angles to [-180, 180)
+                    out[i, branch, joint] = (math.degrees(values[joint]) + 180) % 360 - 180
@@ -0,0 +1,276 @@
+""" Module allows forward kinematics and jacobians of any serial robotic arm to be calculated"""
+import numpy as np
+
+
+def dh_matrices(theta: np.array, d: np.array, a: np.array, cos_alpha: np.array, sin_alpha: np.array) -> np.array:
+    """
+    Vectorized generation of homogenous transformation matrices. \n
+    Parameters are broadcast against each other, theta in radians.\n
+    :param theta: Joint rotation angles
+    :param d: Offsets along previous z
+    :param a: Lengths along common normal
+    :param cos_alpha: Cosines of twist angles
+    :param sin_alpha: Sines of twist angles
+    :return: Array of homogenous trans. matrices with shape (..., 4, 4)
+    """
+    theta, d, a, cos_alpha, sin_alpha = np.broadcast_arrays(theta, d, a, cos_alpha, sin_alpha)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+
+    t_dh = np.zeros(theta.shape + (4, 4))
+    t_dh[..., 0, 0] = cos_t
+    t_dh[..., 0, 1] = -sin_t * cos_alpha
+    t_dh[..., 0, 2] = sin_t * sin_alpha
+    t_dh[..., 0, 3] = a * cos_t
+    t_dh[..., 1, 0] = sin_t
+    t_dh[..., 1, 1] = cos_t * cos_alpha
+    t_dh[..., 1, 2] = -cos_t * sin_alpha
+    t_dh[..., 1, 3] = a * sin_t
+    t_dh[..., 2, 1] = sin_alpha
+    t_dh[..., 2, 2] = cos_alpha
+    t_dh[..., 2, 3] = d
+    t_dh[..., 3, 3] = 1
+    return t_dh
+
+
+class KinematicChain:
+    """ Class allows to calculate forward kinematics and jacobians of serial robotic arm with any number of revolute joints.
+    Chain is described by Denavit–Hartenberg table stored as contiguous (n, 4) array.\n """
+
+    def __init__(self, dh_table, joints=None, ranges=None) -> None:
+        """
+        Initials DH table of the chain. \n
+        Example: dh_table row: [theta, d, a, alpha], angles in degrees \n
+        dh_table = [[0, 118, 0, 90],
+         [0, 0, 150, 0],
+         [-90, 0, 54, 0]]\n
+        joints = [True, True, False] - last row is fixed \n
+        For joint rows theta is an offset added to the joint angle.\n
+        :param dh_table: Array like of shape (n, 4)
+        :param joints: Bool array like of shape (n,), rows with variable theta. All rows by default
+        :param ranges: Array like of shape (dof, 2) with [min, max] of each joint in degrees
+        """
+        dh_table = np.array(dh_table, dtype=float, ndmin=2)
+        if dh_table.ndim != 2 or dh_table.shape[1] != 4:
+            raise ValueError("DH table must have shape (n, 4)")
+        if joints is None:
+            joints = np.ones(len(dh_table), dtype=bool)
+        joints = np.asarray(joints, dtype=bool)
+        if joints.shape != (len(dh_table),):
+            raise ValueError("Joints mask must have one value for each DH row")
+
+        # Contiguous table and constant terms
+        self.dh_table = np.ascontiguousarray(dh_table)
+        self.joints = np.flatnonzero(joints)
+        self.dof = len(self.joints)
+        self.theta = np.radians(self.dh_table[:, 0])
+        self.d = self.dh_table[:, 1].copy()
+        self.a = self.dh_table[:, 2].copy()
+        alpha = np.radians(self.dh_table[:, 3])
+        self.cos_alpha = np.cos(alpha)
+        self.sin_alpha = np.sin(alpha)
+
+        if ranges is None:
+            ranges = np.tile([-180.0, 180.0], (self.dof, 1))
+        self.ranges = np.array(ranges, dtype=float).reshape(self.dof, 2)
+
+    @classmethod
+    def from_links(cls, links: dict) -> "KinematicChain":
+        """
+        Preset of the 4 joints robotic arm used by FkSolver and IkSolver. \n
+        :param links: dictionary, example: {"link1": [118, -80, 80], ...}
+        :return: KinematicChain
+        """
+        dh_table = [[0, links["link1"][0], 0, 90],
+                    [0, 0, links["link2"][0], 0],
+                    [0, 0, links["link3"][0], 0],
+                    [0, 0, links["link4"][0], 0],
+                    [-90, 0, links["link5"][0], 0]]
+        ranges = [links["link{}".format(number)][1:3] for number in range(1, 5)]
+        return cls(dh_table, joints=[True, True, True, True, False], ranges=ranges)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KinematicChain":
+        """
+        Chain stored as json. \n
+        Example: {"dh": [[0, 118, 0, 90], ...], "joints": [true, ...], "ranges": [[-80, 80], ...]}\n
+        :param data: dictionary
+        :return: KinematicChain
+        """
+        return cls(data["dh"], joints=data.get("joints"), ranges=data.get("ranges"))
+
+    def to_dict(self) -> dict:
+        """
+        Json serializable description of the chain.\n
+        :return: dictionary
+        """
+        joints = np.zeros(len(self.dh_table), dtype=bool)
+        joints[self.joints] = True
+        return {"dh": self.dh_table.tolist(), "joints": joints.tolist(), "ranges": self.ranges.tolist()}
+
+    def _thetas(self, q) -> np.array:
+        """
+        Full theta column for every configuration.\n
+        :param q: Array like of shape (m, dof) in degrees
+        :return: Array of shape (m, n) in radians
+        """
+        q = np.radians(np.array(q, dtype=float, ndmin=2))
+        if q.shape[-1] != self.dof:
+            raise ValueError("Configurations must have {} joint values".format(self.dof))
+        theta = np.broadcast_to(self.theta, q.shape[:-1] + self.theta.shape).copy()
+        theta[..., self.joints] += q
+        return theta
+
+    def matrices(self, q) -> np.array:
+        """
+        Homogenous transformation matrix of every DH row.\n
+        :param q: Array like of shape (m, dof) in degrees
+        :return: Array of shape (m, n, 4, 4)
+        """
+        return dh_matrices(self._thetas(q), self.d, self.a, self.cos_alpha, self.sin_alpha)
+
+    def fk_frames(self, q) -> np.array:
+        """
+        Cumulative transformations T0, T0 @ T1, ... for every configuration.\n
+        :param q: Array like of shape (m, dof) in degrees
+        :return: Array of shape (m, n + 1, 4, 4), first frame is the base
+        """
+        matrices = self.matrices(q)
+        frames = np.empty(matrices.shape[:-3] + (len(self.dh_table) + 1, 4, 4))
+        frames[..., 0, :, :] = np.eye(4)
+        for i in range(len(self.dh_table)):
+            frames[..., i + 1, :, :] = frames[..., i, :, :] @ matrices[..., i, :, :]
+        return frames
+
+    def fk_positions(self, q) -> np.array:
+        """
+        Positions of base and all links ends.\n
+        :param q: Array like of shape (m, dof) in degrees
+        :return: Array of shape (m, n + 1, 3)
+        """
+        return self.fk_frames(q)[..., :3, 3]
+
+    def jacobian(self, q) -> np.array:
+        """
+        Geometric jacobian of the end effector, columns are derivatives by joint angle in radians.\n
+        :param q: Array like of shape (m, dof) in degrees
+        :return: Array of shape (m, 6, dof): rows 0-2 linear velocity, rows 3-5 angular velocity
+        """
+        frames = self.fk_frames(q)
+        # Joint i rotates around z axis of the frame before its DH row
+        joint_frames = np.take(frames, self.joints, axis=-3)
+        axes = joint_frames[..., :3, 2]
+        origins = joint_frames[..., :3, 3]
+        end = frames[..., -1:, :3, 3]
+        linear = np.cross(axes, end - origins)
+        return np.concatenate([np.swapaxes(linear, -1, -2), np.swapaxes(axes, -1, -2)], axis=-2)
+
+    def in_range(self, q) -> np.array:
+        """
+        Check if configurations are inside joints ranges.\n
+        :param q: Array like of shape (m, dof) in degrees
+        :return: Bool array of shape (m,)
+        """
+        q = np.asarray(q, dtype=float)
+        return np.all((q >= self.ranges[:, 0]) & (q <= self.ranges[:, 1]), axis=-1)
+
+    def sample(self, number: int, seed=None) -> np.array:
+        """
+        Uniformly sampled configurations inside joints ranges.\n
+        :param number: Number of configurations
+        :param seed: Seed of the random generator
+        :return: Array of shape (number, dof)
+        """
+        generator = np.random.default_rng(seed)
+        return generator.uniform(self.ranges[:, 0], self.ranges[:, 1], (number, self.dof))
+
+    def reach(self) -> float:
+        """
+        Upper bound of the distance between base and end effector.\n
+        :return: float
+        """
+        return float(np.sum(np.abs(self.d)) + np.sum(np.abs(self.a)))
+
+
+class IncrementalFk:
+    """ Class allows forward kinematics of consecutive configurations to be calculated incrementally.
+    Prefix products T0 @ T1 @ ... are cached, only rows from the first changed joint onward are recomputed.\n """
+
+    def __init__(self, chain: KinematicChain) -> None:
+        """
+        :param chain: KinematicChain
+        """
+        self.chain = chain
+        self.q = None
+        self.frames = np.empty((len(chain.dh_table) + 1, 4, 4))
+        self.frames[0] = np.eye(4)
+        # Number of recomputed DH rows, for statistics
+        self.recomputed = 0
+
+    def solve(self, q) -> np.array:
+        """
+        Cumulative transformations of the configuration.\n
+        :param q: Array like of shape (dof,) in degrees
+        :return: Array of shape (n + 1, 4, 4), valid until the next call
+        """
+        q = np.array(q, dtype=float)
+        if self.q is None:
+            first_row = 0
+        else:
+            changed = np.flatnonzero(q != self.q)
+            if not len(changed):
+                return self.frames
+            first_row = self.chain.joints[changed[0]]
+        self.q = q
+
+        chain = self.chain
+        theta = chain._thetas(q)[0, first_row:]
+        matrices = dh_matrices(theta, chain.d[first_row:], chain.a[first_row:],
+                               chain.cos_alpha[first_row:], chain.sin_alpha[first_row:])
+        for i, matrix in enumerate(matrices, start=first_row):
+            self.frames[i + 1] = self.frames[i] @ matrix
+        self.recomputed += len(matrices)
+        return self.frames
+
+    def positions(self, q) -> np.array:
+        """
+        Positions of base and all links ends.\n
+        :param q: Array like of shape (dof,) in degrees
+        :return: Array of shape (n + 1, 3)
+        """
+        return self.solve(q)[:, :3, 3].copy()
+
+
+def sweep_positions(chain: KinematicChain, grids: list) -> np.array:
+    """
+    End effector positions of nested joint sweeps (cartesian product of joint values, first joint outermost).\n
+    Prefix product of outer joints is calculated once and broadcast over all inner joints values,
+    so the inner loop costs one matrix product per configuration instead of one per DH row.\n
+    :param chain: KinematicChain
+    :param grids: List of dof 1D arrays with values of each joint in degrees
+    :return: Array of shape (len(grids[0]), ..., len(grids[-1]), 3)
+    """
+    if len(grids) != chain.dof:
+        raise ValueError("Sweep must have {} joint grids".format(chain.dof))
+
+    def rows_product(start: int, stop: int) -> np.array:
+        # Product of fixed DH rows between joints
+        matrix = np.eye(4)
+        for row in range(start, stop):
+            matrix = matrix @ dh_matrices(chain.theta[row], chain.d[row], chain.a[row],
+                                          chain.cos_alpha[row], chain.sin_alpha[row])
+        return matrix
+
+    prefix = np.eye(4)
+    previous_row = 0
+    for number, (row, values) in enumerate(zip(chain.joints, grids)):
+        values = np.radians(np.asarray(values, dtype=float))
+        joint = dh_matrices(chain.theta[row] + values, chain.d[row], chain.a[row],
+                            chain.cos_alpha[row], chain.sin_alpha[row])
+        joint = rows_product(previous_row, row) @ joint
+        # (g0, ..., g_{k-1}, 1, 4, 4) @ (g_k, 4, 4) -> (g0, ..., g_k, 4, 4)
+        if number == chain.dof - 1:
+            # Last joint: only translation column of the final frame is needed
+            tail = joint @ rows_product(row + 1, len(chain.dh_table))[:, 3]
+            return np.einsum('...ij,kj->...ki', prefix[..., :3, :], tail)
+        prefix = prefix[..., None, :, :] @ joint if number else joint
+        previous_row = row + 1
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from robot.backends import BACKENDS, available_backends, compare_backends
+from robot.models import Robot
+
+DEFAULT_LINKS = {"link1": [118, -80, 80], "link2": [150, 5, 175], "link3": [150, -115, 55],
+                 "link4": [54, -85, 85], "link5": [0, 0, 0]}
+
+
+class Command(BaseCommand):
+    """
+        Check kinematics backends against the Python reference and print json report
+        with their largest differences and fk/ik throughput on the same random inputs.
+    """
+    help = 'Verify and benchmark kinematics backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--robot', type=int, help='Robot id, default geometry otherwise')
+        parser.add_argument('--backend', action='append', choices=sorted(BACKENDS),
+                            help='Backend to compare, all available by default')
+        parser.add_argument('--samples', type=int, default=10000, help='Number of configurations and targets')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        links = DEFAULT_LINKS
+        if options['robot'] is not None:
+            try:
+                links = Robot.objects.get(pk=options['robot']).get_links()
+            except Robot.DoesNotExist:
+                raise CommandError('Robot {} does not exist'.format(options['robot']))
+        missing = set(options['backend'] or []) - set(available_backends())
+        if missing:
+            raise CommandError('Backend {} is not available'.format(', '.join(sorted(missing))))
+        report = compare_backends(links, options['samples'], options['backend'], options['seed'])
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from robot.models import Project
+from robot.transfer import FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    """
+        Export robots of the project with their FK/IK calculations, rows are streamed so memory stays flat.
+    """
+    help = 'Export robots of the project as CSV or JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help='Output file, stdout by default')
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options['project_id'])
+        except Project.DoesNotExist:
+            raise CommandError('Project {} does not exist'.format(options['project_id']))
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for line in export_lines(project, options['format']):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
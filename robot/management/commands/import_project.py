@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from robot.models import Project
+from robot.transfer import FORMATS, parse_lines, import_rows
+
+
+class Command(BaseCommand):
+    """
+        Import robots with their FK/IK calculations into the project, in chunks inside one transaction.
+    """
+    help = 'Import robots from CSV or JSON lines file into the project'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='By default taken from the file extension')
+        parser.add_argument('--user', help='Username of robots owner, project admin by default')
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options['project_id'])
+        except Project.DoesNotExist:
+            raise CommandError('Project {} does not exist'.format(options['project_id']))
+        user = project.admin.first()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError('User {} does not exist'.format(options['user']))
+        if user is None:
+            raise CommandError('Project has no admin, use --user')
+        file_format = options['format'] or ('jsonl' if options['path'].endswith('.jsonl') else 'csv')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            try:
+                created = import_rows(project, user, parse_lines(lines, file_format))
+            except ValueError as error:
+                raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS('Imported {} robots'.format(created)))
@@ -0,0 +1,64 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+
+from robot.models import Project, Robot, recalculate_kinematics
+
+
+def recalculate_chunk(robot_ids: list) -> tuple:
+    """
+        Recalculate robots of one chunk in a worker process. \n
+        Connections inherited from the parent process are closed, so every worker opens its own.
+    """
+    connections.close_all()
+    return recalculate_kinematics(Robot.objects.filter(pk__in=robot_ids))
+
+
+class Command(BaseCommand):
+    """
+        Recalculate stored forward and inverse kinematics of all robots, or robots of the given projects,
+        in chunks of robots spread across worker processes.
+        With --pending only robots with records left pending by lost background jobs are recalculated.
+    """
+    help = 'Recalculate stored FK/IK records of robots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', nargs='*', type=int, help='Projects to recalculate, all by default')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Number of robots of one chunk')
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of worker processes, 1 runs in this process')
+        parser.add_argument('--pending', action='store_true',
+                            help='Only robots with FK/IK records pending after restart of the web workers')
+
+    def handle(self, *args, **options):
+        robots = Robot.objects.order_by('pk')
+        if options['project_id']:
+            missing = set(options['project_id']) - set(
+                Project.objects.filter(pk__in=options['project_id']).values_list('pk', flat=True))
+            if missing:
+                raise CommandError('Project {} does not exist'.format(', '.join(map(str, sorted(missing)))))
+            robots = robots.filter(project__in=options['project_id'])
+        if options['pending']:
+            robots = robots.filter(Q(fk_calc__status=None, fk_calc__isnull=False) |
+                                   Q(ik_calc__status=None, ik_calc__isnull=False))
+        if options['chunk_size'] < 1 or options['processes'] < 1:
+            raise CommandError('Chunk size and number of processes must be positive')
+
+        robot_ids = list(robots.values_list('pk', flat=True))
+        chunks = [robot_ids[start:start + options['chunk_size']]
+                  for start in range(0, len(robot_ids), options['chunk_size'])]
+        # Workers are forked, so they inherit configured Django. Spawned workers would import models
+        # before django.setup, without fork (Windows) chunks are recalculated in this process
+        if options['processes'] == 1 or len(chunks) < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+            results = [recalculate_kinematics(robots.filter(pk__in=chunk)) for chunk in chunks]
+        else:
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(min(options['processes'], len(chunks))) as pool:
+                results = pool.map(recalculate_chunk, chunks)
+
+        fk_count = sum(result[0] for result in results)
+        ik_count = sum(result[1] for result in results)
+        self.stdout.write('Recalculated {} robots: {} FK and {} IK records'.format(len(robot_ids), fk_count,
+                                                                                ik_count))
@@ -0,0 +1,119 @@
+""" Module allows closeness of robotic arm to singular configurations to be mapped over its workspace"""
+import numpy as np
+
+from robot.artifacts import store, geometry_hash
+from robot.workspace import CHUNK_SIZE, joint_grid, workspace_points
+
+# Condition number of exactly singular jacobian, json has no infinity
+SINGULAR_CONDITION = 1e12
+
+
+def manipulability_measures(jacobian: np.array):
+    """
+    Yoshikawa manipulability and condition number of the linear velocity part of jacobians.\n
+    Both come from singular values: w = product of them (sqrt(det(J J^T)) for dof >= 3),
+    condition = largest / smallest. w falls to 0 and condition grows to infinity near singularities.\n
+    :param jacobian: Array of shape (m, 6, dof) returned by KinematicChain.jacobian, derivatives by radian
+    :return: manipulability, condition: Arrays (m,) in mm^k and (m,)
+    """
+    singular = np.linalg.svd(jacobian[:, :3], compute_uv=False)
+    manipulability = np.prod(singular, axis=1)
+    singular_config = singular[:, -1] <= singular[:, 0] / SINGULAR_CONDITION
+    condition = np.where(singular_config, SINGULAR_CONDITION,
+                         singular[:, 0] / np.where(singular_config, 1.0, singular[:, -1]))
+    return manipulability, condition
+
+
+def configuration_measures(chain, q) -> np.array:
+    """
+    :param chain: KinematicChain
+    :param q: Array like of shape (m, dof) in degrees
+    :return: Array of shape (m, 2): manipulability, condition
+    """
+    return np.stack(manipulability_measures(chain.jacobian(q)), axis=-1)
+
+
+def sample_measures(chain, samples_per_joint: int = 16) -> np.array:
+    """
+    Measures over the regular grid of configurations, in the order of sample_workspace points.\n
+    :param chain: KinematicChain
+    :param samples_per_joint: Number of values of every joint
+    :return: Array of shape (samples_per_joint ** dof, 2), float32
+    """
+    total = samples_per_joint ** chain.dof
+    measures = np.empty((total, 2), dtype=np.float32)
+    for start in range(0, total, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, total)
+        measures[start:stop] = configuration_measures(chain, joint_grid(chain, samples_per_joint, start, stop))
+    return measures
+
+
+def joint_measures(chain, samples_per_joint: int = 16) -> np.array:
+    """
+    Measures of the joint grid stored as shared on disk artifact, built on first use.\n
+    :return: Read only numpy.memmap of shape (samples_per_joint ** dof, 2)
+    """
+    return store.get_or_build('manipulability-{}'.format(samples_per_joint), geometry_hash(chain),
+                              lambda: sample_measures(chain, samples_per_joint))
+
+
+def build_heatmap(points: np.array, measures: np.array, cells: int = 64) -> np.array:
+    """
+    Best measures reachable in every cell of the radius-height plane. The base joint only rotates the plane,
+    so each cell keeps the largest manipulability and the smallest condition number of configurations in it.\n
+    :param points: Array (m, 3) of end effector positions
+    :param measures: Array (m, 2) of manipulability and condition
+    :param cells: Number of cells along the longer side
+    :return: Array (4 + rows * columns * 2,): rows, columns, cell size, bottom height,
+     then manipulability and condition grids. Unreachable cells hold nan
+    """
+    radius = np.hypot(points[:, 0], points[:, 1])
+    height = points[:, 2]
+    size = max(float(radius.max()), float(height.max() - min(height.min(), 0.0)), 1e-9) / cells
+    bottom = min(float(height.min()), 0.0)
+    column = np.minimum((radius / size).astype(np.int64), cells - 1)
+    row = np.minimum(((height - bottom) / size).astype(np.int64), cells - 1)
+    rows = int(row.max()) + 1
+    flat = row * cells + column
+
+    manipulability = np.full(rows * cells, -np.inf)
+    condition = np.full(rows * cells, np.inf)
+    np.maximum.at(manipulability, flat, measures[:, 0])
+    np.minimum.at(condition, flat, measures[:, 1])
+    manipulability[np.isinf(manipulability)] = np.nan
+    condition[np.isinf(condition)] = np.nan
+    return np.concatenate([[rows, cells, size, bottom], manipulability, condition])
+
+
+def manipulability_heatmap(chain, samples_per_joint: int = 16, cells: int = 64) -> dict:
+    """
+    Radius-height heatmap of the workspace, stored as shared on disk artifact per robots geometry.\n
+    :param chain: KinematicChain
+    :param samples_per_joint: Number of values of every joint of the sampled grid
+    :param cells: Number of cells along the longer side
+    :return: dictionary: cell_size [mm], bottom [mm] - height of the first row, manipulability and condition
+     grids (rows, columns), rows are heights, columns radii
+    """
+    def builder():
+        points = np.asarray(workspace_points(chain, samples_per_joint), dtype=float)
+        return build_heatmap(points, np.asarray(joint_measures(chain, samples_per_joint), dtype=float), cells)
+
+    data = store.get_or_build('manipulability-rz-{}-{}'.format(samples_per_joint, cells), geometry_hash(chain),
+                              builder)
+    rows, columns = int(data[0]), int(data[1])
+    grids = np.asarray(data[4:]).reshape(2, rows, columns)
+    return {'cell_size': float(data[2]), 'bottom': float(data[3]),
+            'manipulability': grids[0], 'condition': grids[1]}
+
+
+def heatmap_to_dict(heatmap: dict, decimals: int = 3) -> dict:
+    """
+    Json serializable heatmap, unreachable cells are None.\n
+    """
+    data = {'cell_size': round(heatmap['cell_size'], decimals), 'bottom': round(heatmap['bottom'], decimals)}
+    for name in ('manipulability', 'condition'):
+        grid = np.round(heatmap[name], decimals)
+        data[name] = [[None if np.isnan(value) else float(value) for value in row] for row in grid]
+        reachable = grid[~np.isnan(grid)]
+        data[name + '_range'] = [float(reachable.min()), float(reachable.max())] if len(reachable) else None
+    return data
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robot', '0005_alter_forwardkinematics_robot_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='robot',
+            name='dh_params',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robot', '0006_robot_dh_params'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='robot',
+            name='link1_acc',
+            field=models.FloatField(blank=True, default=180.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link1_vel',
+            field=models.FloatField(blank=True, default=90.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link2_acc',
+            field=models.FloatField(blank=True, default=180.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link2_vel',
+            field=models.FloatField(blank=True, default=90.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link3_acc',
+            field=models.FloatField(blank=True, default=240.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link3_vel',
+            field=models.FloatField(blank=True, default=120.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link4_acc',
+            field=models.FloatField(blank=True, default=360.0, null=True),
+        ),
+        migrations.AddField(
+            model_name='robot',
+            name='link4_vel',
+            field=models.FloatField(blank=True, default=180.0, null=True),
+        ),
+    ]
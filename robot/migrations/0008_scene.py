@@ -0,0 +1,26 @@
+# Generated by Django 4.1.5 on 2026-10-19 11:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robot', '0007_robot_joint_limits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scene',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Scene', max_length=50)),
+                ('boxes', models.JSONField(blank=True, default=list)),
+                ('spheres', models.JSONField(blank=True, default=list)),
+                ('planes', models.JSONField(blank=True, default=list)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scene', to='robot.project')),
+            ],
+        ),
+    ]
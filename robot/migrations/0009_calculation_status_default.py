@@ -0,0 +1,31 @@
+# Generated by Django 4.1.5 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+def mark_pending(apps, schema_editor):
+    # Status was never set before background calculations, so False does not tell if results were calculated.
+    # Pending records are calculated again when their status is polled or by recalculate_kinematics --pending
+    for name in ('ForwardKinematics', 'InverseKinematics'):
+        apps.get_model('robot', name).objects.filter(status=False).update(status=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('robot', '0008_scene'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forwardkinematics',
+            name='status',
+            field=models.BooleanField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='inversekinematics',
+            name='status',
+            field=models.BooleanField(blank=True, default=None, null=True),
+        ),
+        migrations.RunPython(mark_pending, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.db.models.functions import datetime
 from django.urls import reverse
 from django.utils import timezone
 
 from accounts.models import User
+from robot.artifacts import geometry_hash
+from robot.calculations import links_arrays, fk_values, ik_values
+from robot.kinematic_chain import KinematicChain
+from robot.scene import scene_arrays, scene_index
 
 
 class Project(models.Model):
@@ -24,6 +31,36 @@ class Project(models.Model):
         return self.name
 
 
+class Scene(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='scene', null=False)
+    name = models.CharField(default='Scene', max_length=50)
+    # Obstacles rows: boxes [x_min, y_min, z_min, x_max, y_max, z_max], spheres [x, y, z, r],
+    # planes [nx, ny, nz, d] - half-space n . x < d is blocked
+    boxes = models.JSONField(default=list, blank=True)
+    spheres = models.JSONField(default=list, blank=True)
+    planes = models.JSONField(default=list, blank=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    def get_absolute_url(self):
+        return reverse('project-detail', kwargs={'pk': self.project_id})
+
+    def get_index(self):
+        """
+            Spatial index of obstacles used by collision queries, rebuilt after every modification.
+        """
+        return scene_index(self)
+
+    def clean(self):
+        super().clean()
+        try:
+            scene_arrays(self.boxes, self.spheres, self.planes)
+        except (TypeError, ValueError) as error:
+            raise ValidationError('Incorrect obstacles: {}'.format(error))
+
+    def __str__(self):
+        return self.name
+
+
 class Robot(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='robots', null=False)
     name = models.CharField(default='New robot', max_length=50)
@@ -46,10 +83,83 @@ class Robot(models.Model):
     link3_max = models.IntegerField(null=True, blank=True, default=55)
     link4_max = models.IntegerField(null=True, blank=True, default=85)
     link5_max = models.IntegerField(null=True, blank=True, default=0)
+    dh_params = models.JSONField(null=True, blank=True)
+    link1_vel = models.FloatField(null=True, blank=True, default=90.0)
+    link2_vel = models.FloatField(null=True, blank=True, default=90.0)
+    link3_vel = models.FloatField(null=True, blank=True, default=120.0)
+    link4_vel = models.FloatField(null=True, blank=True, default=180.0)
+    link1_acc = models.FloatField(null=True, blank=True, default=180.0)
+    link2_acc = models.FloatField(null=True, blank=True, default=180.0)
+    link3_acc = models.FloatField(null=True, blank=True, default=240.0)
+    link4_acc = models.FloatField(null=True, blank=True, default=360.0)
 
     def get_absolute_url(self):
         return reverse('robot-detail', kwargs={'pk': self.pk})
 
+    def get_links(self):
+        """
+            Links dictionary used by the solvers. \n
+            Example: {"link1": [118, -80, 80], ...}
+        """
+        return {"link1": [self.link1, self.link1_min, self.link1_max],
+                "link2": [self.link2, self.link2_min, self.link2_max],
+                "link3": [self.link3, self.link3_min, self.link3_max],
+                "link4": [self.link4, self.link4_min, self.link4_max],
+                "link5": [self.link5, self.link5_min, self.link5_max]}
+
+    def get_joint_limits(self):
+        """
+            Joints velocity [deg/s] and acceleration [deg/s^2] limits used by trajectory timing. \n
+            Example: ([90.0, 90.0, 120.0, 180.0], [180.0, 180.0, 240.0, 360.0])
+        """
+        return ([self.link1_vel, self.link2_vel, self.link3_vel, self.link4_vel],
+                [self.link1_acc, self.link2_acc, self.link3_acc, self.link4_acc])
+
+    def get_chain(self):
+        """
+            Kinematic chain of the robot. \n
+            General DH chain from dh_params if given, otherwise the 4 joints preset built from links.
+        """
+        if self.dh_params:
+            return KinematicChain.from_dict(self.dh_params)
+        return KinematicChain.from_links(self.get_links())
+
+    def geometry_key(self):
+        """
+            Hash of the robots geometry used as a key of shared on disk artifacts. \n
+            None if the geometry is not defined correctly.
+        """
+        try:
+            return geometry_hash(self.get_chain())
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, *args, **kwargs):
+        # Robot and its recalculated records are saved together, failed recalculation keeps the old links
+        with transaction.atomic():
+            previous = Robot.objects.filter(pk=self.pk).first() if self.pk else None
+            super().save(*args, **kwargs)
+            # Artifacts are addressed by geometry, the new geometry gets its own ones on first use.
+            # Stored calculations of the old links are stale
+            if previous is not None and previous.get_links() != self.get_links():
+                recalculate_kinematics([self])
+
+    def clean(self):
+        super().clean()
+        if self.dh_params:
+            try:
+                chain = KinematicChain.from_dict(self.dh_params)
+            except (KeyError, TypeError, ValueError) as error:
+                raise ValidationError({'dh_params': 'Incorrect DH parameters: {}'.format(error)})
+            if chain.dof > settings.KINEMATICS_MAX_DOF:
+                raise ValidationError({'dh_params': 'At most {} joints are allowed'.format(
+                    settings.KINEMATICS_MAX_DOF)})
+        for name in ('link1_vel', 'link2_vel', 'link3_vel', 'link4_vel',
+                     'link1_acc', 'link2_acc', 'link3_acc', 'link4_acc'):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValidationError({name: 'Limit must be positive'})
+
     def __str__(self):
         return self.name
 
@@ -64,7 +174,9 @@ class ForwardKinematics(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(null=True, blank=True)
     modified_by = models.ForeignKey(User, on_delete=models.CASCADE, null=False)
-    status = models.BooleanField(null=True, blank=True, default=False)
+    # True - results are calculated, False - calculation failed, None - calculation is pending,
+    # records saved without calculation (e.g. imported) are pending until they are calculated
+    status = models.BooleanField(null=True, blank=True, default=None)
     theta1 = models.FloatField(null=True, blank=True, default=0.0)
     theta2 = models.FloatField(null=True, blank=True, default=0.0)
     theta3 = models.FloatField(null=True, blank=True, default=0.0)
@@ -88,7 +200,9 @@ class InverseKinematics(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(null=True, blank=True)
     modified_by = models.ForeignKey(User, on_delete=models.CASCADE, null=False)
-    status = models.BooleanField(null=True, blank=True, default=False)
+    # True - results are calculated, False - calculation failed, None - calculation is pending,
+    # records saved without calculation (e.g. imported) are pending until they are calculated
+    status = models.BooleanField(null=True, blank=True, default=None)
     x = models.IntegerField(null=True, blank=True, default=0)
     y = models.IntegerField(null=True, blank=True, default=0)
     z = models.IntegerField(null=True, blank=True, default=0)
@@ -106,4 +220,77 @@ class InverseKinematics(models.Model):
         return reverse('ik-update', kwargs={'pk': self.pk})
 
     def __str__(self):
-        return self.Robot.name
\ No newline at end of file
+        return self.Robot.name
+
+
+FK_RESULT_FIELDS = ['x', 'y', 'z', 'alpha']
+IK_RESULT_FIELDS = ['theta1', 'theta2', 'theta3', 'theta4', 'theta11', 'theta22', 'theta33', 'theta44']
+
+
+def calculate_fk_records(records: list) -> list:
+    """
+        Set x, y, z and alpha of forward kinematics records of any robots in one vectorized pass. \n
+        Records of robots with incorrect links get zeros, the same as the form, and status False. \n
+        Robots described by dh_params are not the 4 joints preset, their records get status False too. \n
+        :param records: list of ForwardKinematics with Robot loaded
+        :return: records
+    """
+    if not records:
+        return records
+    lengths, _, defined = links_arrays([record.Robot.get_links() for record in records])
+    thetas = np.array([[record.theta1, record.theta2, record.theta3, record.theta4] for record in records],
+                      dtype=float)
+    defined &= np.all(np.isfinite(thetas), axis=1) & np.array([not record.Robot.dh_params for record in records])
+    values = np.zeros((len(records), len(FK_RESULT_FIELDS)))
+    values[defined] = fk_values(lengths[defined], thetas[defined])
+    for record, row, status in zip(records, values.tolist(), defined.tolist()):
+        for name, value in zip(FK_RESULT_FIELDS, row):
+            setattr(record, name, value)
+        record.status = status
+    return records
+
+
+def calculate_ik_records(records: list) -> list:
+    """
+        Set both configurations of inverse kinematics records of any robots in one vectorized pass. \n
+        Status is True if the records inputs and robots links were correct. \n
+        Robots described by dh_params are not the 4 joints preset, their records get status False. \n
+        :param records: list of InverseKinematics with Robot loaded
+        :return: records
+    """
+    if not records:
+        return records
+    lengths, ranges, defined = links_arrays([record.Robot.get_links() for record in records])
+    targets = np.array([[record.x, record.y, record.z, record.alpha] for record in records], dtype=float)
+    defined &= np.all(np.isfinite(targets), axis=1) & np.array([not record.Robot.dh_params for record in records])
+    values = np.zeros((len(records), len(IK_RESULT_FIELDS)))
+    values[defined] = ik_values(lengths[defined], ranges[defined], targets[defined])
+    for record, row, status in zip(records, values.tolist(), defined.tolist()):
+        for name, value in zip(IK_RESULT_FIELDS, row):
+            setattr(record, name, value)
+        record.status = status
+    return records
+
+
+def recalculate_kinematics(robots, batch_size: int = 1000) -> tuple:
+    """
+        Recalculate stored forward and inverse kinematics of robots, e.g. after their links were changed. \n
+        Results are written with bulk_update, so every batch costs one query. \n
+        :param robots: Iterable of Robot or queryset
+        :param batch_size: Number of records of one update query
+        :return: numbers of updated forward and inverse kinematics records
+    """
+    robots = {robot.pk: robot for robot in robots}
+    fk_records = list(ForwardKinematics.objects.filter(Robot__in=list(robots)))
+    ik_records = list(InverseKinematics.objects.filter(Robot__in=list(robots)))
+    # Robots of the caller, e.g. just saved instance, are used instead of loading them again
+    for record in fk_records + ik_records:
+        record.Robot = robots[record.Robot_id]
+    modified = timezone.now()
+    for record in calculate_fk_records(fk_records) + calculate_ik_records(ik_records):
+        record.modified = modified
+    ForwardKinematics.objects.bulk_update(fk_records, FK_RESULT_FIELDS + ['status', 'modified'],
+                                          batch_size=batch_size)
+    InverseKinematics.objects.bulk_update(ik_records, IK_RESULT_FIELDS + ['status', 'modified'],
+                                          batch_size=batch_size)
+    return len(fk_records), len(ik_records)
@@ -0,0 +1,278 @@
+""" Module allows collision free joint space motions to be planned with RRT-Connect"""
+import time
+
+import numpy as np
+
+from robot.collision import LINK_RADIUS, check_collisions, sphere_collision
+from robot.manipulability import manipulability_measures
+
+
+class Validator:
+    """ Class allows many configurations to be checked at once: joints ranges, self, floor and obstacles collisions.\n """
+
+    def __init__(self, chain, spheres=None, radius: float = LINK_RADIUS, floor: bool = True, scene=None,
+                 max_condition: float = None) -> None:
+        """
+        :param chain: KinematicChain
+        :param spheres: Array like of shape (k, 4) with [x, y, z, r] of obstacles, optional
+        :param radius: Radius of the links capsules
+        :param floor: Check collision with the floor plane
+        :param scene: SceneIndex of the project obstacles, optional
+        :param max_condition: Largest jacobian condition number, configurations closer to singularities are
+         rejected. Not checked by default
+        """
+        self.chain = chain
+        self.scene = scene
+        self.spheres = np.zeros((0, 4)) if spheres is None else np.array(spheres, dtype=float, ndmin=2).reshape(-1, 4)
+        self.radius = radius
+        self.floor = floor
+        self.max_condition = max_condition
+        # Number of checked configurations, for statistics
+        self.checked = 0
+
+    def __call__(self, q: np.array) -> np.array:
+        """
+        :param q: Array of shape (m, dof) in degrees
+        :return: Bool array of shape (m,), True - configuration is valid
+        """
+        q = np.asarray(q, dtype=float)
+        self.checked += len(q)
+        positions = self.chain.fk_positions(q)
+        collision = check_collisions(positions, self.radius, self.floor)
+        if len(self.spheres):
+            collision |= sphere_collision(positions, self.spheres, self.radius)
+        if self.scene is not None:
+            collision |= self.scene.collisions(positions, self.radius)
+        valid = self.chain.in_range(q) & ~collision
+        if self.max_condition is not None:
+            valid &= manipulability_measures(self.chain.jacobian(q))[1] <= self.max_condition
+        return valid
+
+
+def edge_points(start: np.array, end: np.array, resolution: float) -> np.array:
+    """
+    Configurations along the straight joint space edge, end included, start excluded.\n
+    :param start: Array (dof,)
+    :param end: Array (dof,)
+    :param resolution: Largest joint change between checked configurations in degrees
+    :return: Array of shape (k, dof)
+    """
+    count = max(int(np.ceil(np.max(np.abs(end - start)) / resolution)), 1)
+    return start + (end - start) * (np.arange(1, count + 1) / count)[:, None]
+
+
+class _Tree:
+    """ Tree of configurations stored in preallocated arrays.\n """
+
+    def __init__(self, root: np.array, capacity: int) -> None:
+        self.nodes = np.empty((capacity, len(root)))
+        self.parents = np.empty(capacity, dtype=int)
+        self.nodes[0] = root
+        self.parents[0] = -1
+        self.size = 1
+
+    def nearest(self, q: np.array) -> int:
+        return int(np.argmin(np.sum((self.nodes[:self.size] - q) ** 2, axis=1)))
+
+    def add(self, q: np.array, parent: int) -> int:
+        self.nodes[self.size] = q
+        self.parents[self.size] = parent
+        self.size += 1
+        return self.size - 1
+
+    def branch(self, index: int) -> np.array:
+        """ Configurations from the root to the node.\n """
+        path = []
+        while index >= 0:
+            path.append(self.nodes[index])
+            index = self.parents[index]
+        return np.array(path[::-1])
+
+
+class RrtConnect:
+    """ Class allows collision free path between two configurations to be planned.
+    Two trees grow from start and goal towards random configurations and towards each other.
+    Every edge is validated at once: configurations along it are checked with one batched FK and collision call.\n """
+
+    def __init__(self, chain, validator=None, step: float = 15.0, resolution: float = None,
+                 max_nodes: int = 5000, seed=None) -> None:
+        """
+        :param chain: KinematicChain, joints ranges bound the sampling
+        :param validator: Function (m, dof) -> bool (m,), Validator(chain) by default
+        :param step: Largest joint change of one extension in degrees
+        :param resolution: Largest joint change between checked configurations of an edge in degrees.
+         By default links move at most half of the capsules radius between checks
+        :param max_nodes: Largest number of nodes of both trees
+        :param seed: Seed of the random generator
+        """
+        self.chain = chain
+        self.validator = Validator(chain) if validator is None else validator
+        self.step = step
+        if resolution is None:
+            radius = getattr(self.validator, 'radius', LINK_RADIUS)
+            resolution = min(np.degrees(radius / 2 / max(chain.reach(), 1.0)), step)
+        self.resolution = resolution
+        self.max_nodes = max_nodes
+        self.generator = np.random.default_rng(seed)
+        self.stats = {}
+
+    def _steer(self, start: np.array, target: np.array, distance: float) -> np.array:
+        delta = target - start
+        length = np.max(np.abs(delta))
+        if length <= distance:
+            return target
+        return start + delta * (distance / length)
+
+    def _check_edge(self, start: np.array, end: np.array):
+        """
+        Check the edge with one batched call.\n
+        :return: points, valid: configurations along the edge and number of valid ones from its start
+        """
+        points = edge_points(start, end, self.resolution)
+        valid = self.validator(points)
+        self.stats['edges'] += 1
+        return points, len(points) if valid.all() else int(np.argmin(valid))
+
+    def _edge_free(self, start: np.array, end: np.array) -> bool:
+        points, valid = self._check_edge(start, end)
+        return valid == len(points)
+
+    def _extend(self, tree: _Tree, target: np.array) -> int:
+        """ One step towards target, returns new node or -1 when the step is blocked.\n """
+        nearest = tree.nearest(target)
+        new = self._steer(tree.nodes[nearest], target, self.step)
+        if not self._edge_free(tree.nodes[nearest], new):
+            return -1
+        return tree.add(new, nearest)
+
+    def _connect(self, tree: _Tree, target: np.array) -> int:
+        """
+        Grow the tree straight towards target. Whole segment is checked at once and
+        nodes are added every step along its valid part.\n
+        :return: node equal to target or -1 when the segment is blocked
+        """
+        nearest = tree.nearest(target)
+        start = tree.nodes[nearest]
+        points, valid = self._check_edge(start, target)
+        if not valid:
+            return -1
+        reached = valid == len(points)
+        end = target if reached else points[valid - 1]
+
+        nodes = edge_points(start, end, self.step)
+        nodes[-1] = end
+        free = tree.nodes.shape[0] - tree.size
+        parent = nearest
+        for node in nodes[:free]:
+            parent = tree.add(node, parent)
+        return parent if reached and len(nodes) <= free else -1
+
+    def plan(self, start, goal, timeout: float = 2.0, smoothing: int = 100):
+        """
+        Plan collision free path.\n
+        :param start: Array like (dof,) in degrees
+        :param goal: Array like (dof,) in degrees
+        :param timeout: Planning time limit in seconds
+        :param smoothing: Number of shortcut attempts
+        :return: path, status: Array (k, dof) of waypoints or None, status message. Statistics are in self.stats
+        """
+        started = time.perf_counter()
+        start = np.asarray(start, dtype=float)
+        goal = np.asarray(goal, dtype=float)
+        checked = getattr(self.validator, 'checked', 0)
+        self.stats = {'iterations': 0, 'edges': 0, 'nodes': 0, 'planning_ms': 0.0, 'smoothing_ms': 0.0,
+                      'raw_waypoints': 0, 'waypoints': 0, 'raw_length': 0.0, 'length': 0.0, 'checked': 0}
+
+        path, status = None, 'Warning: No path found'
+        endpoints = self.validator(np.stack([start, goal]))
+        if not endpoints[0]:
+            status = 'Warning: Start configuration is not valid'
+        elif not endpoints[1]:
+            status = 'Warning: Goal configuration is not valid'
+        else:
+            path = self._search(start, goal, started + timeout)
+            if path is None and time.perf_counter() - started >= timeout:
+                status = 'Warning: Planning timeout'
+        self.stats['planning_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        if path is not None:
+            self.stats['raw_waypoints'] = len(path)
+            self.stats['raw_length'] = round(path_length(path), 2)
+            smoothing_started = time.perf_counter()
+            path = self.shortcut(path, smoothing, started + timeout)
+            self.stats['smoothing_ms'] = round((time.perf_counter() - smoothing_started) * 1000, 2)
+            self.stats['waypoints'] = len(path)
+            self.stats['length'] = round(path_length(path), 2)
+            status = 'Planning ended successfully'
+        self.stats['checked'] = getattr(self.validator, 'checked', 0) - checked
+        return path, status
+
+    def _search(self, start: np.array, goal: np.array, deadline: float):
+        trees = [_Tree(start, self.max_nodes), _Tree(goal, self.max_nodes)]
+        if self._edge_free(start, goal):
+            self.stats['nodes'] = 2
+            return np.stack([start, goal])
+
+        low, high = self.chain.ranges[:, 0], self.chain.ranges[:, 1]
+        while time.perf_counter() < deadline and trees[0].size + trees[1].size < self.max_nodes - 1:
+            self.stats['iterations'] += 1
+            target = self.generator.uniform(low, high)
+            new = self._extend(trees[0], target)
+            if new >= 0:
+                other = self._connect(trees[1], trees[0].nodes[new])
+                if other >= 0:
+                    self.stats['nodes'] = trees[0].size + trees[1].size
+                    first, second = trees[0].branch(new), trees[1].branch(other)[::-1]
+                    path = np.concatenate([first, second[1:]])
+                    return path if np.array_equal(path[0], start) else path[::-1]
+            trees.reverse()
+        self.stats['nodes'] = trees[0].size + trees[1].size
+        return None
+
+    def shortcut(self, path: np.array, attempts: int = 100, deadline: float = None) -> np.array:
+        """
+        Smooth the path by replacing parts with straight valid edges.\n
+        Redundant waypoints are removed first, then random pairs of path points are joined.
+        Smoothing stops at the deadline, the rest of the path is kept as it is.\n
+        :param path: Array (k, dof)
+        :param attempts: Number of random shortcuts
+        :param deadline: time.perf_counter() value ending smoothing, no limit by default
+        :return: Array (j, dof), j <= k
+        """
+        def expired():
+            return deadline is not None and time.perf_counter() >= deadline
+
+        # Greedy pass: join each waypoint with the farthest directly reachable one
+        result = [path[0]]
+        index = 0
+        while index < len(path) - 1:
+            following = len(path) - 1
+            while following > index + 1 and not self._edge_free(path[index], path[following]):
+                following -= 1
+                if expired():
+                    # Edges of the path are valid
+                    following = index + 1
+            result.append(path[following])
+            index = following
+        path = np.array(result)
+
+        # Random shortcuts between points inside edges
+        for _ in range(attempts):
+            if len(path) < 3 or expired():
+                break
+            first, second = np.sort(self.generator.choice(len(path) - 1, 2, replace=False))
+            a = path[first] + (path[first + 1] - path[first]) * self.generator.uniform()
+            b = path[second] + (path[second + 1] - path[second]) * self.generator.uniform()
+            if path_length(np.stack([a, b])) >= path_length(np.concatenate([[a], path[first + 1:second + 1], [b]])):
+                continue
+            if self._edge_free(a, b):
+                path = np.concatenate([path[:first + 1], [a, b], path[second + 1:]])
+        return path
+
+
+def path_length(path: np.array) -> float:
+    """
+    :param path: Array (k, dof)
+    :return: Sum of joint space lengths of the edges in degrees
+    """
+    return float(np.sum(np.linalg.norm(np.diff(path, axis=0), axis=1)))
@@ -0,0 +1,271 @@
+""" Module allows link capsules to be checked against obstacles of the project scene through uniform grid index"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from robot.collision import LINK_RADIUS, EPS, point_segment_distance
+
+# Largest number of grid cells covered by obstacles, cell size grows above it
+MAX_INDEXED_CELLS = 1 << 20
+# Largest number of grid cells covered by one queried capsule, longer capsules are tested against all obstacles
+MAX_SEGMENT_CELLS = 64
+# Number of capsule-obstacle bounding box tests of one brute force step
+BRUTE_FORCE_PAIRS = 1 << 20
+# Iterations of the segment-box distance search, interval shrinks to (2/3)^n
+BOX_ITERATIONS = 40
+SCENE_CACHE_SIZE = 8
+
+
+def scene_arrays(boxes, spheres, planes):
+    """
+    Validate and convert scene obstacles to arrays.\n
+    :param boxes: Array like (b, 6) of axis aligned boxes [x_min, y_min, z_min, x_max, y_max, z_max]
+    :param spheres: Array like (s, 4) of spheres [x, y, z, r]
+    :param planes: Array like (p, 4) of half-spaces [nx, ny, nz, d], points with n . x < d are blocked
+    :return: boxes, spheres, planes arrays, plane normals are normalized
+    """
+    boxes, spheres, planes = ([] if value is None else value for value in (boxes, spheres, planes))
+    boxes = np.array(boxes, dtype=float).reshape(-1, 6)
+    spheres = np.array(spheres, dtype=float).reshape(-1, 4)
+    planes = np.array(planes, dtype=float).reshape(-1, 4)
+    if not np.all(np.isfinite(boxes)) or not np.all(np.isfinite(spheres)) or not np.all(np.isfinite(planes)):
+        raise ValueError("Obstacles must have finite values")
+    if np.any(boxes[:, 3:] < boxes[:, :3]):
+        raise ValueError("Boxes max corner must be above min corner")
+    if np.any(spheres[:, 3] <= 0):
+        raise ValueError("Spheres radius must be positive")
+    norm = np.linalg.norm(planes[:, :3], axis=1)
+    if np.any(norm <= EPS):
+        raise ValueError("Planes normal must be non zero")
+    return boxes, spheres, planes / norm[:, None]
+
+
+def segment_box_distance(p: np.array, q: np.array, lower: np.array, upper: np.array) -> np.array:
+    """
+    Vectorized distance between segments p-q and axis aligned boxes.\n
+    Distance to the box is convex along the segment, so it is minimized by ternary search.\n
+    :param p: Start points of segments (n, 3)
+    :param q: End points of segments (n, 3)
+    :param lower: Min corners of boxes (n, 3)
+    :param upper: Max corners of boxes (n, 3)
+    :return: Array (n,)
+    """
+    def distance(t):
+        point = p + (q - p) * t[:, None]
+        return np.linalg.norm(point - np.clip(point, lower, upper), axis=1)
+
+    low = np.zeros(len(p))
+    high = np.ones(len(p))
+    for _ in range(BOX_ITERATIONS):
+        first = low + (high - low) / 3
+        second = high - (high - low) / 3
+        closer = distance(first) <= distance(second)
+        high = np.where(closer, second, high)
+        low = np.where(closer, low, first)
+    return distance((low + high) / 2)
+
+
+class SceneIndex:
+    """ Class allows thousands of link capsules to be checked against obstacles at once.
+    Boxes and spheres are stored in uniform grid: every occupied cell keeps ids of obstacles overlapping it
+    (sorted cell keys with offsets, CSR layout). Capsules only test obstacles from cells they overlap,
+    so the cost grows with local obstacle density instead of their total number.
+    Planes are unbounded and tested directly.\n """
+
+    def __init__(self, boxes=None, spheres=None, planes=None, cell_size: float = None) -> None:
+        """
+        :param boxes: Array like (b, 6) of [x_min, y_min, z_min, x_max, y_max, z_max]
+        :param spheres: Array like (s, 4) of [x, y, z, r]
+        :param planes: Array like (p, 4) of [nx, ny, nz, d], points with n . x < d are blocked
+        :param cell_size: Edge of grid cells in mm, twice the median obstacle size by default
+        """
+        self.boxes, self.spheres, self.planes = scene_arrays(boxes, spheres, planes)
+        # Bounding boxes of indexed obstacles, boxes first
+        self.lower = np.concatenate([self.boxes[:, :3], self.spheres[:, :3] - self.spheres[:, 3:]])
+        self.upper = np.concatenate([self.boxes[:, 3:], self.spheres[:, :3] + self.spheres[:, 3:]])
+        self.candidates = 0
+
+        if not len(self.lower):
+            self.cell_size = cell_size or 1.0
+            self.origin = np.zeros(3)
+            self.shape = np.ones(3, dtype=np.int64)
+            self.keys = np.zeros(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.ids = np.zeros(0, dtype=np.int64)
+            return
+
+        if cell_size is None:
+            cell_size = 2 * float(np.median(np.max(self.upper - self.lower, axis=1)))
+        cell_size = max(cell_size, EPS)
+        self.origin = self.lower.min(axis=0)
+        extent = self.upper.max(axis=0) - self.origin
+        while True:
+            first = np.floor((self.lower - self.origin) / cell_size).astype(np.int64)
+            last = np.floor((self.upper - self.origin) / cell_size).astype(np.int64)
+            if np.sum(np.prod(last - first + 1, axis=1)) <= MAX_INDEXED_CELLS:
+                break
+            cell_size *= 2
+        self.cell_size = cell_size
+        self.shape = np.floor(extent / cell_size).astype(np.int64) + 1
+
+        obstacles, cells = self._cells(first, last)
+        keys = self._key(cells)
+        order = np.lexsort((obstacles, keys))
+        keys, self.ids = keys[order], obstacles[order]
+        self.keys, starts = np.unique(keys, return_index=True)
+        self.offsets = np.append(starts, len(keys)).astype(np.int64)
+
+    @staticmethod
+    def _cells(first: np.array, last: np.array):
+        """
+        Expand inclusive cell ranges into (item, cell) pairs.\n
+        :return: items, cells: Arrays (k,) and (k, 3)
+        """
+        extents = last - first + 1
+        counts = np.prod(extents, axis=1)
+        items = np.repeat(np.arange(len(first)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        extents = extents[items]
+        offset = np.stack([local // (extents[:, 1] * extents[:, 2]),
+                           local // extents[:, 2] % extents[:, 1],
+                           local % extents[:, 2]], axis=1)
+        return items, first[items] + offset
+
+    def _key(self, cells: np.array) -> np.array:
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+    def candidate_pairs(self, p: np.array, q: np.array, radius: float):
+        """
+        Broad phase: pairs of segments and indexed obstacles sharing a grid cell with overlapping bounding boxes.\n
+        Segments covering more than MAX_SEGMENT_CELLS cells, e.g. long links in a scene of small obstacles,
+        are compared with bounding boxes of all obstacles instead, so the work of one segment is bounded.\n
+        :param p: Start points of segments (n, 3)
+        :param q: End points of segments (n, 3)
+        :param radius: Radius of the capsules
+        :return: segments, obstacles: Arrays (k,) of indices
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(self.keys) or not len(p):
+            return empty, empty
+        lower = np.minimum(p, q) - radius
+        upper = np.maximum(p, q) + radius
+        first = np.floor((lower - self.origin) / self.cell_size).astype(np.int64)
+        last = np.floor((upper - self.origin) / self.cell_size).astype(np.int64)
+        inside = np.all((last >= 0) & (first < self.shape), axis=1)
+        segments = np.flatnonzero(inside)
+        first = np.clip(first[segments], 0, self.shape - 1)
+        last = np.clip(last[segments], 0, self.shape - 1)
+        large = np.prod(last - first + 1, axis=1) > MAX_SEGMENT_CELLS
+        brute_segments, brute_obstacles = self._overlapping(segments[large], lower, upper)
+        segments, first, last = segments[~large], first[~large], last[~large]
+
+        items, cells = self._cells(first, last)
+        keys = self._key(cells)
+        position = np.searchsorted(self.keys, keys)
+        position = np.minimum(position, len(self.keys) - 1)
+        hit = self.keys[position] == keys
+        items, position = items[hit], position[hit]
+
+        counts = self.offsets[position + 1] - self.offsets[position]
+        pair_items = np.repeat(items, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        obstacles = self.ids[np.repeat(self.offsets[position], counts) + local]
+        segments = segments[pair_items]
+
+        # Obstacle found through many cells of one segment is tested once
+        pairs = np.unique(segments * len(self.lower) + obstacles)
+        segments, obstacles = pairs // len(self.lower), pairs % len(self.lower)
+        overlap = np.all((lower[segments] <= self.upper[obstacles]) & (upper[segments] >= self.lower[obstacles]), axis=1)
+        return (np.concatenate([segments[overlap], brute_segments]),
+                np.concatenate([obstacles[overlap], brute_obstacles]))
+
+    def _overlapping(self, segments: np.array, lower: np.array, upper: np.array):
+        """
+        Pairs of segments and all obstacles with overlapping bounding boxes, tested in bounded steps.\n
+        :param segments: Indices of segments
+        :param lower: Min corners of bounding boxes of all segments (n, 3)
+        :param upper: Max corners of bounding boxes of all segments (n, 3)
+        :return: segments, obstacles: Arrays (k,) of indices
+        """
+        found_segments, found_obstacles = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        step = max(1, BRUTE_FORCE_PAIRS // len(self.lower))
+        for start in range(0, len(segments), step):
+            part = segments[start:start + step]
+            overlap = np.all((lower[part, None] <= self.upper) & (upper[part, None] >= self.lower), axis=2)
+            rows, obstacles = np.nonzero(overlap)
+            found_segments.append(part[rows])
+            found_obstacles.append(obstacles)
+        return np.concatenate(found_segments), np.concatenate(found_obstacles)
+
+    def segment_collisions(self, p: np.array, q: np.array, radius: float = LINK_RADIUS) -> np.array:
+        """
+        Check capsules p-q against all obstacles.\n
+        :param p: Start points of segments (n, 3)
+        :param q: End points of segments (n, 3)
+        :param radius: Radius of the capsules
+        :return: Bool array (n,), True - capsule intersects an obstacle
+        """
+        collision = np.zeros(len(p), dtype=bool)
+        if len(self.planes):
+            # Capsule end closest to the blocked side decides
+            signed = np.minimum(p @ self.planes[:, :3].T, q @ self.planes[:, :3].T) - self.planes[:, 3]
+            collision |= np.any(signed < radius, axis=1)
+
+        segments, obstacles = self.candidate_pairs(p, q, radius)
+        self.candidates = len(segments)
+        boxes = obstacles < len(self.boxes)
+        if np.any(boxes):
+            box = self.boxes[obstacles[boxes]]
+            distance = segment_box_distance(p[segments[boxes]], q[segments[boxes]], box[:, :3], box[:, 3:])
+            collision[segments[boxes][distance < radius]] = True
+        if np.any(~boxes):
+            sphere = self.spheres[obstacles[~boxes] - len(self.boxes)]
+            distance = point_segment_distance(sphere[:, :3], p[segments[~boxes]], q[segments[~boxes]])
+            collision[segments[~boxes][distance < sphere[:, 3] + radius]] = True
+        return collision
+
+    def collisions(self, positions: np.array, radius: float = LINK_RADIUS) -> np.array:
+        """
+        Check many configurations at once. Base link is fixed, so it is skipped like in floor_collision.\n
+        :param positions: Array of shape (n, points, 3) returned by fk_positions_batch
+        :param radius: Radius of the links capsules
+        :return: Bool array of shape (n,), True - configuration in collision
+        """
+        p = positions[:, 1:-1].reshape(-1, 3)
+        q = positions[:, 2:].reshape(-1, 3)
+        collision = self.segment_collisions(p, q, radius)
+        return collision.reshape(len(positions), -1).any(axis=1)
+
+    def info(self) -> dict:
+        return {
+            'boxes': len(self.boxes),
+            'spheres': len(self.spheres),
+            'planes': len(self.planes),
+            'cell_size': round(self.cell_size, 3),
+            'cells': len(self.keys),
+        }
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def scene_index(scene) -> SceneIndex:
+    """
+    Index of the scene model, kept per process until the scene is modified.\n
+    :param scene: Scene
+    :return: SceneIndex
+    """
+    key = (scene.pk, scene.modified)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = SceneIndex(scene.boxes, scene.spheres, scene.planes)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > SCENE_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
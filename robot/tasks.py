@@ -0,0 +1,145 @@
+""" Module allows stored kinematics calculations to be run off the request thread"""
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_build_executor = None
+# Key: (future, monotonic time of submission)
+_builds = OrderedDict()
+_builds_lock = threading.Lock()
+# Finished builds kept, so their results are returned without waiting
+BUILDS_CACHE_SIZE = 16
+# Builds queued or running at once, further keys are submitted when some of them finish
+BUILDS_MAX_PENDING = 8
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Shared pool of KINEMATICS_TASK_WORKERS threads of this process, created on first use.\n
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.KINEMATICS_TASK_WORKERS,
+                                       thread_name_prefix='kinematics')
+    return _executor
+
+
+def get_build_executor() -> ThreadPoolExecutor:
+    """
+    Pool of KINEMATICS_BUILD_WORKERS threads of this process for slow precomputations, separate from
+    the calculations of records, so long builds do not delay them.\n
+    """
+    global _build_executor
+    if _build_executor is None:
+        _build_executor = ThreadPoolExecutor(max_workers=settings.KINEMATICS_BUILD_WORKERS,
+                                             thread_name_prefix='kinematics-build')
+    return _build_executor
+
+
+def run_calculation(model, pk: int, calculate, fields: list) -> None:
+    """
+    Calculate one stored record and save its results, status is True when done and False when it failed.\n
+    :param model: ForwardKinematics or InverseKinematics
+    :param pk: Primary key of the record
+    :param calculate: Function setting results of list of records, e.g. calculate_fk_records
+    :param fields: Result fields saved with the status
+    """
+    try:
+        record = model.objects.select_related('Robot').filter(pk=pk).first()
+        if record is None:
+            return
+        calculate([record])
+        # Only results are saved, inputs edited in the meantime are kept
+        record.save(update_fields=fields + ['status'])
+    except Exception:
+        logger.exception('Calculation of %s %s failed', model.__name__, pk)
+        model.objects.filter(pk=pk).update(status=False)
+    finally:
+        # Connections of pool threads are not closed by request signals
+        connection.close()
+
+
+def enqueue_calculation(record, calculate, fields: list) -> None:
+    """
+    Mark record as being calculated and run the calculation in the pool once the transaction is committed,
+    so the worker sees the saved record.\n
+    :param record: Saved ForwardKinematics or InverseKinematics
+    :param calculate: Function setting results of list of records
+    :param fields: Result fields saved with the status
+    """
+    type(record).objects.filter(pk=record.pk).update(status=None)
+    record.status = None
+    transaction.on_commit(lambda: get_executor().submit(run_calculation, type(record), record.pk, calculate,
+                                                        fields))
+
+
+def resume_stale_calculation(record, calculate, fields: list) -> bool:
+    """
+    Start again calculation of record pending for more than KINEMATICS_TASK_TIMEOUT seconds since its modification.
+    Jobs live only in the pool of the worker process, so they are lost when it is restarted.
+    Only one of concurrent callers claims the record.\n
+    :param record: ForwardKinematics or InverseKinematics with status None
+    :param calculate: Function setting results of list of records
+    :param fields: Result fields saved with the status
+    :return: True if the calculation was started again
+    """
+    now = timezone.now()
+    if record.modified is not None and record.modified > now - datetime.timedelta(
+            seconds=settings.KINEMATICS_TASK_TIMEOUT):
+        return False
+    claimed = type(record).objects.filter(pk=record.pk, status=None, modified=record.modified).update(modified=now)
+    if claimed:
+        record.modified = now
+        enqueue_calculation(record, calculate, fields)
+    return bool(claimed)
+
+
+def _evict_builds(now: float) -> None:
+    """
+    Forget builds pending for more than KINEMATICS_BUILD_TIMEOUT seconds (queued ones are cancelled)
+    and the least recently used finished builds above BUILDS_CACHE_SIZE.\n
+    """
+    for key, (future, submitted) in list(_builds.items()):
+        if not future.done() and now - submitted > settings.KINEMATICS_BUILD_TIMEOUT:
+            future.cancel()
+            del _builds[key]
+    finished = [key for key, (future, _) in _builds.items() if future.done()]
+    for key in finished[:max(len(finished) - BUILDS_CACHE_SIZE, 0)]:
+        del _builds[key]
+
+
+def background_result(key, build):
+    """
+    Result of slow precomputation run in the build pool, e.g. robots workspace, so requests do not wait for it.\n
+    The first call starts the build and calls return None until it is finished. While BUILDS_MAX_PENDING builds
+    are pending, new keys are not submitted and None is returned, the next call tries again.
+    Failed build raises its exception once, the next call starts it again.\n
+    :param key: Hashable key of the build, equal keys must mean equal results
+    :param build: Function without parameters
+    :return: result of build or None while it is running
+    """
+    with _builds_lock:
+        now = time.monotonic()
+        _evict_builds(now)
+        entry = _builds.get(key)
+        if entry is None:
+            if sum(not future.done() for future, _ in _builds.values()) < BUILDS_MAX_PENDING:
+                _builds[key] = (get_build_executor().submit(build), now)
+            return None
+        future = entry[0]
+        if not future.done():
+            return None
+        _builds.move_to_end(key)
+        if future.exception() is not None:
+            del _builds[key]
+    return future.result()
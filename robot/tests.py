@@ -1,3 +1,59 @@
-from django.test import TestCase
+import unittest
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from robot.backends import SolverBackend, available_backends, get_backend
+from robot.ik_solver import ik_valid_mask
+from robot.kinematic_chain import KinematicChain
+
+LINKS = {"link1": [118, -80, 80], "link2": [150, 5, 175], "link3": [150, -115, 55], "link4": [54, -85, 85],
+         "link5": [0, 0, 0]}
+
+
+class BackendsTest(SimpleTestCase):
+    """ Every backend must return the same links positions, solution branches and reachability as the Python
+    reference, so KINEMATICS_SOLVER_BACKEND does not change results.\n """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        chain = KinematicChain.from_links(LINKS)
+        cls.thetas = chain.sample(2000, seed=0)
+        positions = chain.fk_positions(cls.thetas)[:, -1]
+        # Every other target is moved randomly, so unreachable targets are compared too
+        positions[::2] += np.random.default_rng(0).normal(0.0, chain.reach() / 4, positions[::2].shape)
+        cls.targets = np.column_stack([positions, cls.thetas[:, 1] + cls.thetas[:, 2] + cls.thetas[:, 3]])
+        cls.ranges = np.array([LINKS["link{}".format(number)][1:3] for number in range(1, 5)], dtype=float)
+
+    def assertSameResults(self, name):
+        reference, backend = get_backend('python'), get_backend(name)
+        np.testing.assert_allclose(backend.fk_positions(LINKS, self.thetas),
+                                   reference.fk_positions(LINKS, self.thetas), atol=1e-9)
+
+        expected = reference.ik_branches(LINKS, *self.targets.T)
+        configs = backend.ik_branches(LINKS, *self.targets.T)
+        np.testing.assert_array_equal(np.isnan(configs), np.isnan(expected))
+        reachable = ~np.isnan(expected)
+        np.testing.assert_allclose(((configs - expected + 180) % 360 - 180)[reachable], 0.0, atol=1e-6)
+        np.testing.assert_array_equal(ik_valid_mask(configs, self.ranges), ik_valid_mask(expected, self.ranges))
+
+    def test_reference_has_reachable_and_unreachable_targets(self):
+        reachable = ~np.isnan(get_backend('python').ik_branches(LINKS, *self.targets.T)).any(axis=(-1, -2))
+        self.assertTrue(reachable.any())
+        self.assertFalse(reachable.all())
+
+    def test_numpy_matches_python(self):
+        self.assertSameResults('numpy')
+
+    @unittest.skipUnless('numba' in available_backends(), 'numba is not installed')
+    def test_numba_matches_python(self):
+        self.assertSameResults('numba')
+
+    def test_base_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            SolverBackend()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend('fortran')
@@ -0,0 +1,192 @@
+""" Module allows spread of end effector position caused by links tolerances and joints errors to be estimated by Monte Carlo sampling"""
+import numpy as np
+
+from robot.kinematic_chain import dh_matrices
+
+# Largest number of perturbed configurations evaluated at once
+CHUNK_SIZE = 32768
+DISTRIBUTIONS = ('normal', 'uniform')
+# Scale of standard deviations giving ellipsoid with the probability of normal distribution in 3D
+CONFIDENCE_SCALES = {0.9: 2.5003, 0.95: 2.7955, 0.99: 3.3682}
+
+
+def _draw(generator, distribution: str, width: np.array, shape: tuple) -> np.array:
+    """
+    :param width: Standard deviation of normal or half-width of uniform distribution
+    """
+    if distribution == 'normal':
+        return generator.normal(0.0, 1.0, shape) * width
+    return generator.uniform(-1.0, 1.0, shape) * width
+
+
+def perturbed_positions(chain, q: np.array, length_tolerance: np.array, joint_tolerance: np.array,
+                        distribution: str, generator) -> np.array:
+    """
+    End effector positions of configurations with randomly changed geometry and joints.\n
+    :param chain: KinematicChain
+    :param q: Array of shape (m, dof) in degrees, one sample is drawn for every row
+    :param length_tolerance: Array (n,) of length tolerances of DH rows in mm, applied to non zero d and a
+    :param joint_tolerance: Array (dof,) of joints errors in degrees
+    :param distribution: "normal" or "uniform"
+    :param generator: numpy random Generator
+    :return: Array of shape (m, 3)
+    """
+    m, rows = len(q), len(chain.dh_table)
+    q = q + _draw(generator, distribution, joint_tolerance, (m, chain.dof))
+    d = chain.d + (chain.d != 0) * _draw(generator, distribution, length_tolerance, (m, rows))
+    a = chain.a + (chain.a != 0) * _draw(generator, distribution, length_tolerance, (m, rows))
+    matrices = dh_matrices(chain._thetas(q), d, a, chain.cos_alpha, chain.sin_alpha)
+    end = matrices[:, 0]
+    for i in range(1, rows):
+        end = end @ matrices[:, i]
+    return end[:, :3, 3]
+
+
+class ErrorStatistics:
+    """ Running mean, covariance and largest distance of error vectors of many poses.
+    Chunks are merged with the pairwise update of Chan et al., so samples are never stored.\n """
+
+    def __init__(self, poses: int) -> None:
+        self.count = np.zeros(poses)
+        self.mean = np.zeros((poses, 3))
+        self.m2 = np.zeros((poses, 3, 3))
+        self.max_error = np.zeros(poses)
+
+    def update(self, pose: np.array, errors: np.array) -> None:
+        """
+        Only poses between the smallest and the largest index of the chunk are updated, so the work
+        depends on the chunk and not on the number of all poses.\n
+        :param pose: Array (k,) of pose index of every error vector
+        :param errors: Array (k, 3) of error vectors
+        """
+        first = int(pose.min())
+        local = pose - first
+        poses = int(local.max()) + 1
+        window = slice(first, first + poses)
+        count = np.bincount(local, minlength=poses).astype(float)
+        present = count > 0
+        total = np.stack([np.bincount(local, errors[:, axis], poses) for axis in range(3)], axis=1)
+        mean = np.where(present[:, None], total / np.maximum(count, 1)[:, None], 0.0)
+        centered = errors - mean[local]
+        m2 = np.stack([np.bincount(local, centered[:, i] * centered[:, j], poses)
+                       for i in range(3) for j in range(3)], axis=1).reshape(poses, 3, 3)
+        np.maximum.at(self.max_error, pose, np.linalg.norm(errors, axis=1))
+
+        merged = self.count[window] + count
+        delta = mean - self.mean[window]
+        weight = np.where(merged > 0, self.count[window] * count / np.maximum(merged, 1), 0.0)
+        self.m2[window] += m2 + weight[:, None, None] * delta[:, :, None] * delta[:, None, :]
+        self.mean[window] += delta * np.where(merged > 0, count / np.maximum(merged, 1), 0.0)[:, None]
+        self.count[window] = merged
+
+    @property
+    def covariance(self) -> np.array:
+        return self.m2 / np.maximum(self.count - 1, 1)[:, None, None]
+
+
+def error_ellipsoids(covariance: np.array, confidence: float = 0.95):
+    """
+    Confidence ellipsoids of normally distributed errors.\n
+    :param covariance: Array (k, 3, 3)
+    :param confidence: 0.9, 0.95 or 0.99
+    :return: semi_axes, axes: Arrays (k, 3) sorted from the largest and (k, 3, 3) with unit axes in columns
+    """
+    if confidence not in CONFIDENCE_SCALES:
+        raise ValueError("Confidence must be one of: {}".format(', '.join(map(str, CONFIDENCE_SCALES))))
+    values, vectors = np.linalg.eigh(covariance)
+    semi_axes = CONFIDENCE_SCALES[confidence] * np.sqrt(np.clip(values[:, ::-1], 0, None))
+    return semi_axes, vectors[:, :, ::-1]
+
+
+def tolerance_sample_count(poses, samples: int, max_samples: int = None) -> int:
+    """
+    Validate requested poses and samples before poses are sampled or any array is allocated.\n
+    :param poses: Number of poses sampled across the workspace or list of poses
+    :param samples: Number of samples of every pose
+    :param max_samples: Largest number of samples of all poses
+    :return: Number of samples of all poses
+    """
+    if isinstance(poses, bool) or not isinstance(poses, (int, list, tuple)):
+        raise ValueError("Poses must be number of poses or list of poses")
+    count = poses if isinstance(poses, int) else len(poses)
+    if count < 1:
+        raise ValueError("At least 1 pose is needed")
+    if samples < 2:
+        raise ValueError("At least 2 samples are needed")
+    if max_samples is not None and count * samples > max_samples:
+        raise ValueError("at most {} samples of all poses".format(max_samples))
+    return count * samples
+
+
+def tolerance_analysis(chain, poses, length_tolerance, joint_tolerance, samples: int = 10000,
+                       distribution: str = 'normal', confidence: float = 0.95, seed=None) -> dict:
+    """
+    Monte Carlo analysis of end effector accuracy for every pose.\n
+    Samples of all poses are evaluated together in chunks of CHUNK_SIZE configurations,
+    so memory does not depend on the number of samples.\n
+    :param chain: KinematicChain
+    :param poses: Array like of shape (k, dof) in degrees
+    :param length_tolerance: Array like (n,) of DH rows length tolerances in mm, or one value for all rows
+    :param joint_tolerance: Array like (dof,) of joints errors in degrees, or one value for all joints
+    :param samples: Number of samples of every pose
+    :param distribution: "normal" - tolerances are standard deviations, "uniform" - half-widths
+    :param confidence: Probability of the error ellipsoids
+    :param seed: Seed of the random generator
+    :return: dictionary: nominal (k, 3), mean_error (k, 3), covariance (k, 3, 3), semi_axes (k, 3),
+     axes (k, 3, 3), rms_error (k,), max_error (k,), samples
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError("Distribution must be one of: {}".format(', '.join(DISTRIBUTIONS)))
+    poses = np.array(poses, dtype=float, ndmin=2)
+    if poses.shape[1] != chain.dof:
+        raise ValueError("Poses must have {} joint values".format(chain.dof))
+    length_tolerance = np.broadcast_to(np.asarray(length_tolerance, dtype=float), (len(chain.dh_table),))
+    joint_tolerance = np.broadcast_to(np.asarray(joint_tolerance, dtype=float), (chain.dof,))
+    if np.any(length_tolerance < 0) or np.any(joint_tolerance < 0):
+        raise ValueError("Tolerances must not be negative")
+    if samples < 2:
+        raise ValueError("At least 2 samples are needed")
+
+    generator = np.random.default_rng(seed)
+    nominal = chain.fk_positions(poses)[:, -1]
+    statistics = ErrorStatistics(len(poses))
+    # Flat index over (pose, sample) pairs, consecutive chunks cover all samples of all poses
+    total = len(poses) * samples
+    for start in range(0, total, CHUNK_SIZE):
+        pose = np.arange(start, min(start + CHUNK_SIZE, total)) // samples
+        positions = perturbed_positions(chain, poses[pose], length_tolerance, joint_tolerance, distribution,
+                                        generator)
+        statistics.update(pose, positions - nominal[pose])
+
+    covariance = statistics.covariance
+    semi_axes, axes = error_ellipsoids(covariance, confidence)
+    mean = statistics.mean
+    return {
+        'nominal': nominal,
+        'mean_error': mean,
+        'covariance': covariance,
+        'semi_axes': semi_axes,
+        'axes': axes,
+        'rms_error': np.sqrt(np.sum(mean ** 2, axis=1) + np.trace(covariance, axis1=1, axis2=2)),
+        'max_error': statistics.max_error,
+        'samples': samples,
+    }
+
+
+def tolerance_summary(result: dict, decimals: int = 4) -> dict:
+    """
+    Json serializable result with the worst pose across all analysed poses.\n
+    :param result: dictionary returned by tolerance_analysis
+    :param decimals: Number of decimals
+    :return: dictionary
+    """
+    summary = {name: np.round(value, decimals).tolist() if isinstance(value, np.ndarray) else value
+               for name, value in result.items()}
+    worst = int(np.argmax(result['semi_axes'][:, 0]))
+    summary['worst_pose'] = worst
+    summary['workspace'] = {
+        'largest_semi_axis': round(float(result['semi_axes'][worst, 0]), decimals),
+        'mean_rms_error': round(float(result['rms_error'].mean()), decimals),
+        'max_error': round(float(result['max_error'].max()), decimals),
+    }
+    return summary
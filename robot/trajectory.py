@@ -0,0 +1,162 @@
+""" Module allows time-optimal timing of a geometric joint path to be calculated under joints velocity and acceleration limits"""
+import numpy as np
+
+# Joint derivative along the path treated as zero
+EPS = 1e-9
+
+
+def interpolate_path(waypoints, samples: int = 200) -> np.array:
+    """
+    Sample piecewise linear joint path uniformly along its length in joint space.\n
+    :param waypoints: Array like of shape (k, dof) in degrees
+    :param samples: Number of path samples
+    :return: Array of shape (samples, dof), duplicated consecutive waypoints are dropped
+    """
+    waypoints = np.array(waypoints, dtype=float, ndmin=2)
+    if len(waypoints) < 2:
+        raise ValueError("Path must have at least 2 waypoints")
+    keep = np.concatenate([[True], np.linalg.norm(np.diff(waypoints, axis=0), axis=1) > EPS])
+    waypoints = waypoints[keep]
+    if len(waypoints) < 2:
+        raise ValueError("Path must have non zero length")
+
+    length = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(waypoints, axis=0), axis=1))])
+    s = np.union1d(np.linspace(0, length[-1], max(samples, 2)), length)
+    return np.stack([np.interp(s, length, joint) for joint in waypoints.T], axis=-1)
+
+
+def path_constraints(dq: np.array, ddq: np.array, vel_limits: np.array, acc_limits: np.array):
+    """
+    Joint limits mapped to path parameter for every path sample at once.\n
+    With x = s'^2 and u = s'': joint velocity dq s' and acceleration dq u + ddq x.\n
+    :param dq: Array (n, dof), derivatives of joints by path parameter
+    :param ddq: Array (n, dof), 2nd derivatives of joints by path parameter
+    :param vel_limits: Array (dof,) of joints velocities limits
+    :param acc_limits: Array (dof,) of joints accelerations limits
+    :return: x_max, moving: Array (n,) of largest x allowed by velocities and curvature of not moving joints,
+     bool array (n, dof) of joints with acceleration constraint -a <= dq u + ddq x <= a
+    """
+    moving = np.abs(dq) > EPS
+    curved = ~moving & (np.abs(ddq) > EPS)
+    with np.errstate(divide='ignore'):
+        x_velocity = np.where(moving, (vel_limits / np.abs(np.where(moving, dq, 1.0))) ** 2, np.inf)
+        # Joints not moving along the path are still accelerated by its curvature: |ddq| x <= a
+        x_curvature = np.where(curved, acc_limits / np.abs(np.where(curved, ddq, 1.0)), np.inf)
+    return np.minimum(x_velocity, x_curvature).min(axis=1), moving
+
+
+def x_range(a: np.array, b: np.array):
+    """
+    Smallest and largest x of the convex polygon a @ [x, u] <= b. \n
+    Vertices of every pair of constraints are checked at once.\n
+    :param a: Array (m, 2)
+    :param b: Array (m,)
+    :return: x_min, x_max, nan if polygon is empty
+    """
+    first, second = np.triu_indices(len(a), 1)
+    det = a[first, 0] * a[second, 1] - a[first, 1] * a[second, 0]
+    regular = np.abs(det) > EPS
+    det = np.where(regular, det, 1.0)
+    x = (b[first] * a[second, 1] - b[second] * a[first, 1]) / det
+    u = (a[first, 0] * b[second] - a[second, 0] * b[first]) / det
+    inside = np.all(a[:, 0, None] * x + a[:, 1, None] * u <= b[:, None] + 1e-9 * (1 + np.abs(b[:, None])), axis=0)
+    x = x[regular & inside]
+    if not len(x):
+        return np.nan, np.nan
+    return x.min(), x.max()
+
+
+def time_optimal_profile(path, vel_limits, acc_limits) -> dict:
+    """
+    Fastest timing of the geometric joint path, starting and ending at rest.\n
+    Path parameter s is the length in joint space. Joint limits are mapped to linear constraints of x = s'^2
+    and u = s'' for all path samples at once (reachability analysis, TOPP-RA):\n
+    backward pass finds the range of x at every sample from which the path end is still reachable,
+    forward pass applies the largest u which keeps x inside these ranges.\n
+    :param path: Array like of shape (n, dof) in degrees, e.g. returned by interpolate_path
+    :param vel_limits: Array like of shape (dof,) in deg/s
+    :param acc_limits: Array like of shape (dof,) in deg/s^2
+    :return: dictionary: duration [s], time (n,), s (n,), s_dot (n,), positions, velocities, accelerations (n, dof)
+    """
+    path = np.array(path, dtype=float, ndmin=2)
+    vel_limits = np.asarray(vel_limits, dtype=float)
+    acc_limits = np.asarray(acc_limits, dtype=float)
+    if len(path) < 2:
+        raise ValueError("Path must have at least 2 samples")
+    if vel_limits.shape != (path.shape[1],) or acc_limits.shape != (path.shape[1],):
+        raise ValueError("Limits must have one value for each joint")
+    # Missing limits of the robot are nan, they would give nan timing
+    if not np.all(np.isfinite(vel_limits) & (vel_limits > 0)) or \
+            not np.all(np.isfinite(acc_limits) & (acc_limits > 0)):
+        raise ValueError("Limits must be finite and positive")
+    keep = np.concatenate([[True], np.linalg.norm(np.diff(path, axis=0), axis=1) > EPS])
+    path = path[keep]
+    if len(path) < 2:
+        raise ValueError("Path must have non zero length")
+
+    s = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(path, axis=0), axis=1))])
+    ds = np.diff(s)
+    dq = np.gradient(path, s, axis=0)
+    ddq = np.gradient(dq, s, axis=0) if len(path) > 2 else np.zeros_like(dq)
+    x_max, moving = path_constraints(dq, ddq, vel_limits, acc_limits)
+
+    # Constraints a @ [x, u] <= b of every sample: +-(ddq x + dq u) <= acc, 0 <= x <= x_max
+    # and 2 rows for the next sample: x_next_min <= x + 2 ds u <= x_next_max
+    joints = np.stack([ddq, dq], axis=-1)
+    constraints = []
+    for i in range(len(s)):
+        rows = joints[i, moving[i]]
+        constraints.append((np.concatenate([rows, -rows, [[1, 0], [-1, 0]]]),
+                            np.concatenate([acc_limits[moving[i]], acc_limits[moving[i]], [x_max[i], 0]])))
+
+    # Backward pass - controllable ranges of x, path ends at rest
+    controllable = np.zeros((len(s), 2))
+    for i in range(len(s) - 2, -1, -1):
+        a, b = constraints[i]
+        a = np.concatenate([a, [[1, 2 * ds[i]], [-1, -2 * ds[i]]]])
+        b = np.concatenate([b, [controllable[i + 1, 1], -controllable[i + 1, 0]]])
+        controllable[i] = x_range(a, b)
+        if np.isnan(controllable[i, 0]):
+            raise ValueError("Path can not be executed within joints limits")
+    if controllable[0, 0] > 0:
+        raise ValueError("Path can not be executed from rest")
+
+    # Forward pass - greedy largest acceleration
+    x = np.zeros(len(s))
+    u = np.zeros(len(s))
+    for i in range(len(s) - 1):
+        a, b = constraints[i]
+        # Rows with positive u coefficient bound u from above
+        upper = a[:, 1] > EPS
+        u_max = np.min((b[upper] - a[upper, 0] * x[i]) / a[upper, 1]) if np.any(upper) else np.inf
+        u[i] = min(u_max, (controllable[i + 1, 1] - x[i]) / (2 * ds[i]))
+        x[i + 1] = min(max(x[i] + 2 * ds[i] * u[i], controllable[i + 1, 0], 0.0), controllable[i + 1, 1])
+    x[-1] = 0.0
+    u[:-1] = (x[1:] - x[:-1]) / (2 * ds)
+
+    s_dot = np.sqrt(x)
+    # Constant s'' inside segments
+    with np.errstate(divide='ignore'):
+        dt = np.where(s_dot[:-1] + s_dot[1:] > 0, 2 * ds / np.where(s_dot[:-1] + s_dot[1:] > 0,
+                                                                    s_dot[:-1] + s_dot[1:], 1.0), np.inf)
+    time = np.concatenate([[0], np.cumsum(dt)])
+    return {
+        'duration': float(time[-1]),
+        'time': time,
+        's': s,
+        's_dot': s_dot,
+        'positions': path,
+        'velocities': dq * s_dot[:, None],
+        'accelerations': dq * u[:, None] + ddq * x[:, None],
+    }
+
+
+def profile_to_dict(profile: dict, decimals: int = 3) -> dict:
+    """
+    Json serializable profile with rounded values.\n
+    :param profile: dictionary returned by time_optimal_profile
+    :param decimals: Number of decimals
+    :return: dictionary
+    """
+    return {name: round(value, decimals) if name == 'duration' else np.round(value, decimals).tolist()
+            for name, value in profile.items()}
@@ -0,0 +1,170 @@
+""" Module allows robots of a project with their FK/IK calculations to be exported and imported as CSV or JSON lines"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from robot.models import Robot, ForwardKinematics, InverseKinematics
+
+# Rows inserted with one bulk_create and rows fetched per database round trip on export
+CHUNK_SIZE = 500
+FORMATS = ('csv', 'jsonl')
+
+ROBOT_FIELDS = ['name', 'description', 'notes',
+                'link1', 'link2', 'link3', 'link4', 'link5',
+                'link1_min', 'link2_min', 'link3_min', 'link4_min', 'link5_min',
+                'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max',
+                'link1_vel', 'link2_vel', 'link3_vel', 'link4_vel',
+                'link1_acc', 'link2_acc', 'link3_acc', 'link4_acc', 'dh_params']
+FK_FIELDS = ['name', 'notes', 'status', 'theta1', 'theta2', 'theta3', 'theta4', 'x', 'y', 'z', 'alpha']
+IK_FIELDS = ['name', 'notes', 'status', 'x', 'y', 'z', 'alpha',
+             'theta1', 'theta2', 'theta3', 'theta4', 'theta11', 'theta22', 'theta33', 'theta44']
+# Flat row: robot fields, then "fk_" and "ik_" prefixed fields of its calculations
+COLUMNS = ROBOT_FIELDS + ['fk_' + name for name in FK_FIELDS] + ['ik_' + name for name in IK_FIELDS]
+
+
+def export_rows(project):
+    """
+    Rows of all robots of the project, fetched in chunks with iterator() so memory stays flat.\n
+    :param project: Project
+    :return: generator of dictionaries with COLUMNS keys
+    """
+    robots = Robot.objects.filter(project=project).select_related('fk_calc', 'ik_calc').order_by('pk')
+    for robot in robots.iterator(chunk_size=CHUNK_SIZE):
+        row = {name: getattr(robot, name) for name in ROBOT_FIELDS}
+        for prefix, relation, fields in (('fk_', 'fk_calc', FK_FIELDS), ('ik_', 'ik_calc', IK_FIELDS)):
+            calculation = getattr(robot, relation, None)
+            for name in fields:
+                row[prefix + name] = getattr(calculation, name) if calculation is not None else None
+        yield row
+
+
+def csv_lines(rows):
+    """
+    :param rows: Iterable of dictionaries with COLUMNS keys
+    :return: generator of CSV lines, header first. Empty cell is None, dh_params is json
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield line(COLUMNS)
+    for row in rows:
+        row['dh_params'] = json.dumps(row['dh_params']) if row['dh_params'] is not None else None
+        yield line(['' if row[name] is None else row[name] for name in COLUMNS])
+
+
+def jsonl_lines(rows):
+    """
+    :param rows: Iterable of dictionaries with COLUMNS keys
+    :return: generator of json lines
+    """
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def export_lines(project, file_format: str = 'csv'):
+    """
+    :param project: Project
+    :param file_format: "csv" or "jsonl"
+    :return: generator of lines
+    """
+    if file_format not in FORMATS:
+        raise ValueError("Format must be one of: {}".format(', '.join(FORMATS)))
+    rows = export_rows(project)
+    return csv_lines(rows) if file_format == 'csv' else jsonl_lines(rows)
+
+
+def parse_lines(lines, file_format: str = 'csv'):
+    """
+    Parse rows one by one, the file is never loaded at once.\n
+    :param lines: Iterable of text lines
+    :param file_format: "csv" or "jsonl"
+    :return: generator of (line number, dictionary) with None for empty values
+    """
+    if file_format not in FORMATS:
+        raise ValueError("Format must be one of: {}".format(', '.join(FORMATS)))
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            values = {name: (value if value != '' else None) for name, value in row.items() if name in COLUMNS}
+            if values.get('dh_params') is not None:
+                try:
+                    values['dh_params'] = json.loads(values['dh_params'])
+                except ValueError:
+                    raise ValueError("Line {}: dh_params must be json".format(reader.line_num))
+            yield reader.line_num, values
+    else:
+        for number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    raise ValueError("Line {}: incorrect json".format(number))
+                if not isinstance(row, dict):
+                    raise ValueError("Line {}: row must be json object".format(number))
+                yield number, row
+
+
+def _instance(model, fields: list, row: dict, prefix: str, number: int, exclude: list, **extra):
+    """
+    Unsaved and validated model instance from the row.\n
+    """
+    instance = model(**{name: row[prefix + name] for name in fields if row.get(prefix + name) is not None}, **extra)
+    try:
+        # Related objects are already validated, skipping them saves a query per row
+        instance.full_clean(exclude=exclude, validate_unique=False)
+    except ValidationError as error:
+        raise ValueError("Line {}: {}".format(number, '; '.join(
+            '{}{}: {}'.format(prefix, name, ' '.join(messages)) for name, messages in error.message_dict.items())))
+    return instance
+
+
+def import_rows(project, user, rows, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Create robots and their FK/IK calculations with bulk_create in chunks, all in one transaction.\n
+    Rows without any "fk_"/"ik_" value get no calculation record. Any incorrect row rolls back the whole import.\n
+    :param project: Target project
+    :param user: Owner of the robots and author of calculations
+    :param rows: Iterable of (line number, dictionary) returned by parse_lines
+    :param chunk_size: Rows inserted at once
+    :return: number of created robots
+    """
+    created = 0
+    with transaction.atomic():
+        chunk = []
+        for number, row in rows:
+            chunk.append((number, row))
+            if len(chunk) >= chunk_size:
+                created += _import_chunk(project, user, chunk)
+                chunk = []
+        if chunk:
+            created += _import_chunk(project, user, chunk)
+    return created
+
+
+def _import_chunk(project, user, chunk: list) -> int:
+    robots = [_instance(Robot, ROBOT_FIELDS, row, '', number, ['project', 'owner'], project=project, owner=user)
+              for number, row in chunk]
+    # Primary keys are set by bulk_create on PostgreSQL and SQLite
+    Robot.objects.bulk_create(robots)
+
+    fk_calculations = []
+    ik_calculations = []
+    for robot, (number, row) in zip(robots, chunk):
+        if any(row.get('fk_' + name) is not None for name in FK_FIELDS):
+            fk_calculations.append(_instance(ForwardKinematics, FK_FIELDS, row, 'fk_', number,
+                                             ['Robot', 'modified_by'], Robot=robot, modified_by=user))
+        if any(row.get('ik_' + name) is not None for name in IK_FIELDS):
+            ik_calculations.append(_instance(InverseKinematics, IK_FIELDS, row, 'ik_', number,
+                                             ['Robot', 'modified_by'], Robot=robot, modified_by=user))
+    ForwardKinematics.objects.bulk_create(fk_calculations)
+    InverseKinematics.objects.bulk_create(ik_calculations)
+    return len(robots)
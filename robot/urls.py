@@ -1,6 +1,6 @@
 from django.urls import path
 from django.conf import settings
-from .views import DashboardView, ProjectCreate, ProjectDelete, ProjectUpdate, ProjectDetail, RobotCreate, RobotDelete, RobotUpdate, RobotDetail, FkCreate, FkUpdate, IkCreate, IkUpdate
+from .views import DashboardView, ProjectCreate, ProjectDelete, ProjectUpdate, ProjectDetail, ProjectExport, ProjectImport, ProjectEvaluate, SceneUpdate, RobotCreate, RobotDelete, RobotUpdate, RobotDetail, RobotWorkspace, RobotWorkspaceTile, RobotManipulability, RobotTrajectory, RobotPlan, RobotSceneCheck, RobotTolerance, RobotCalibration, FkCreate, FkUpdate, FkStatus, FkJog, FkJogStream, IkCreate, IkUpdate, IkStatus
 from django.conf.urls.static import static
 
 urlpatterns = [
@@ -10,17 +10,33 @@ urlpatterns = [
     path('project-detail/<int:pk>/', ProjectDetail.as_view(), name='project-detail'),
     path('project-update/<int:pk>/', ProjectUpdate.as_view(), name='project-update'),
     path('project-delete/<int:pk>/', ProjectDelete.as_view(), name='project-delete'),
+    path('project-export/<int:pk>/', ProjectExport.as_view(), name='project-export'),
+    path('project-import/<int:pk>/', ProjectImport.as_view(), name='project-import'),
+    path('project-evaluate/<int:pk>/', ProjectEvaluate.as_view(), name='project-evaluate'),
+    path('scene-update/<int:pk>/', SceneUpdate.as_view(), name='scene-update'),
 
     path('robot-create/', RobotCreate.as_view(), name='robot-create'),
     path('robot-detail/<int:pk>/', RobotDetail.as_view(), name='robot-detail'),
     path('robot-update/<int:pk>/', RobotUpdate.as_view(), name='robot-update'),
     path('robot-delete/<int:pk>/', RobotDelete.as_view(), name='robot-delete'),
+    path('robot-workspace/<int:pk>/', RobotWorkspace.as_view(), name='robot-workspace'),
+    path('robot-workspace/<int:pk>/<int:level>/<int:tile>/', RobotWorkspaceTile.as_view(), name='robot-workspace-tile'),
+    path('robot-manipulability/<int:pk>/', RobotManipulability.as_view(), name='robot-manipulability'),
+    path('robot-trajectory/<int:pk>/', RobotTrajectory.as_view(), name='robot-trajectory'),
+    path('robot-plan/<int:pk>/', RobotPlan.as_view(), name='robot-plan'),
+    path('robot-scene-check/<int:pk>/', RobotSceneCheck.as_view(), name='robot-scene-check'),
+    path('robot-tolerance/<int:pk>/', RobotTolerance.as_view(), name='robot-tolerance'),
+    path('robot-calibration/<int:pk>/', RobotCalibration.as_view(), name='robot-calibration'),
 
     path('fk-create/', FkCreate.as_view(), name='fk-create'),
     path('fk-update/<int:pk>/', FkUpdate.as_view(), name='fk-update'),
+    path('fk-status/<int:pk>/', FkStatus.as_view(), name='fk-status'),
+    path('fk-jog/<int:pk>/', FkJog.as_view(), name='fk-jog'),
+    path('fk-jog/<int:pk>/stream/', FkJogStream.as_view(), name='fk-jog-stream'),
 
     path('ik-create/', IkCreate.as_view(), name='ik-create'),
     path('ik-update/<int:pk>/', IkUpdate.as_view(), name='ik-update'),
+    path('ik-status/<int:pk>/', IkStatus.as_view(), name='ik-status'),
 
 ]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
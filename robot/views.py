@@ -1,14 +1,33 @@
+import csv
 import datetime
+import io
+import json
 
+import numpy as np
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import request, Http404
-from django.shortcuts import redirect, render
+from django.core.cache import cache
+from django.core.exceptions import RequestDataTooBig
+from django.http import request, Http404, JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import redirect, render, get_object_or_404
 from django.urls import reverse_lazy
-from django.views.generic import DetailView, CreateView, UpdateView, DeleteView, ListView
+from django.views.generic import DetailView, CreateView, UpdateView, DeleteView, ListView, View
 
-from .models import Project, Robot, ForwardKinematics, InverseKinematics
+from .models import Project, Scene, Robot, ForwardKinematics, InverseKinematics, calculate_fk_records, \
+    calculate_ik_records, FK_RESULT_FIELDS, IK_RESULT_FIELDS
 
+from robot.calculations import links_arrays, evaluate_robots, evaluation_to_dict
+from robot.calibration import calibrate, calibration_to_dict
+from robot.collision import check_collisions
+from robot.jog import jog_cache_shared, jog_publish, jog_events
+from robot.manipulability import configuration_measures, manipulability_heatmap, heatmap_to_dict
+from robot.planner import RrtConnect, Validator
 from robot.robotic_arm import RoboticArm
+from robot.tasks import enqueue_calculation, background_result, resume_stale_calculation
+from robot.transfer import FORMATS, export_lines, parse_lines, import_rows
+from robot.tolerance import tolerance_analysis, tolerance_sample_count, tolerance_summary
+from robot.trajectory import interpolate_path, time_optimal_profile, profile_to_dict
+from robot.workspace import grid_samples, workspace_octree
 
 
 class DashboardView(ListView):
@@ -158,6 +177,283 @@ class RobotDetail(LoginRequiredMixin, DetailView):
         return super(RobotDetail, self).dispatch(request, *args, **kwargs)
 
 
+class RobotWorkspace(LoginRequiredMixin, View):
+    """
+        Octree description of robots sampled workspace: bounding cube, points and tiles of every level of detail. \n
+        The sample has at most KINEMATICS_WORKSPACE_MAX_POINTS configurations and is built in the background,
+        status 202 is returned until it is ready. \n
+        Only projects member can view workspace. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def get(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        key = robot.geometry_key()
+        if key is None:
+            raise Http404
+        chain = robot.get_chain()
+        samples = grid_samples(chain.dof, settings.KINEMATICS_WORKSPACE_SAMPLES,
+                               settings.KINEMATICS_WORKSPACE_MAX_POINTS)
+        octree = background_result(('workspace', key, samples), lambda: workspace_octree(
+            chain, samples, settings.KINEMATICS_WORKSPACE_MAX_LEVEL))
+        if octree is None:
+            return JsonResponse({'status': 'pending'}, status=202)
+        data = octree.info()
+        data['key'] = key
+        return JsonResponse(data)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotWorkspace, self).dispatch(request, *args, **kwargs)
+
+
+class RobotManipulability(LoginRequiredMixin, View):
+    """
+        Radius-height heatmaps of Yoshikawa manipulability and jacobian condition number over robots workspace. \n
+        Heatmaps are stored per robots geometry, the sample has at most KINEMATICS_WORKSPACE_MAX_POINTS
+        configurations and is built in the background, status 202 is returned until it is ready. \n
+        With ?thetas=theta1,theta2,theta3,theta4 measures of that configuration are returned too. \n
+        Only projects member can view manipulability. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def get(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        key = robot.geometry_key()
+        if key is None:
+            raise Http404
+        chain = robot.get_chain()
+        samples = grid_samples(chain.dof, settings.KINEMATICS_WORKSPACE_SAMPLES,
+                               settings.KINEMATICS_WORKSPACE_MAX_POINTS)
+        cells = settings.KINEMATICS_MANIPULABILITY_CELLS
+        heatmap = background_result(('manipulability', key, samples, cells), lambda: manipulability_heatmap(
+            chain, samples, cells))
+        if heatmap is None:
+            return JsonResponse({'status': 'pending'}, status=202)
+        data = heatmap_to_dict(heatmap)
+        data['key'] = key
+        if request.GET.get('thetas'):
+            try:
+                manipulability, condition = configuration_measures(
+                    chain, [float(value) for value in request.GET['thetas'].split(',')])[0]
+            except ValueError as error:
+                return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+            data['configuration'] = {'manipulability': round(float(manipulability), 3),
+                                     'condition': round(float(condition), 3)}
+        return JsonResponse(data)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotManipulability, self).dispatch(request, *args, **kwargs)
+
+
+class RobotWorkspaceTile(LoginRequiredMixin, View):
+    """
+        Points of one tile of robots workspace level of detail. \n
+        Tiles are cached per robots geometry, status 202 is returned while the workspace is built. \n
+        Only projects member can view workspace. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def get(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        key = robot.geometry_key()
+        level = self.kwargs['level']
+        tile = self.kwargs['tile']
+        if key is None or level > settings.KINEMATICS_WORKSPACE_MAX_LEVEL:
+            raise Http404
+
+        chain = robot.get_chain()
+        samples = grid_samples(chain.dof, settings.KINEMATICS_WORKSPACE_SAMPLES,
+                               settings.KINEMATICS_WORKSPACE_MAX_POINTS)
+        cache_key = 'workspace-tile:{}:{}:{}:{}'.format(key, samples, level, tile)
+        data = cache.get(cache_key)
+        if data is None:
+            octree = background_result(('workspace', key, samples), lambda: workspace_octree(
+                chain, samples, settings.KINEMATICS_WORKSPACE_MAX_LEVEL))
+            if octree is None:
+                return JsonResponse({'status': 'pending'}, status=202)
+            centroids, counts = octree.tile(level, tile)
+            data = {
+                'level': level,
+                'tile': tile,
+                'points': np.round(centroids, 1).ravel().tolist(),
+                'counts': counts.tolist(),
+            }
+            cache.set(cache_key, data, 60 * 60)
+        response = JsonResponse(data)
+        response['Cache-Control'] = 'private, max-age=3600'
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotWorkspaceTile, self).dispatch(request, *args, **kwargs)
+
+
+class ProjectExport(LoginRequiredMixin, View):
+    """
+        Stream robots of the project with their FK/IK calculations as CSV or JSON lines file. \n
+        Format is chosen with ?format=csv (default) or ?format=jsonl. \n
+        Only projects member can export project. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def get(self, request, *args, **kwargs):
+        project = get_object_or_404(Project.objects.filter(members=request.user), pk=self.kwargs['pk'])
+        file_format = request.GET.get('format', 'csv')
+        if file_format not in FORMATS:
+            return HttpResponseBadRequest('Format must be one of: {}'.format(', '.join(FORMATS)))
+        response = StreamingHttpResponse(export_lines(project, file_format),
+                                         content_type='text/csv' if file_format == 'csv' else 'application/jsonl')
+        response['Content-Disposition'] = 'attachment; filename="project_{}.{}"'.format(project.pk, file_format)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(ProjectExport, self).dispatch(request, *args, **kwargs)
+
+
+class ProjectImport(LoginRequiredMixin, View):
+    """
+        Import robots with their FK/IK calculations from CSV or JSON lines file exported by ProjectExport. \n
+        File is parsed line by line and rows are inserted in chunks, incorrect row cancels the whole import. \n
+        Only projects admin can import robots. \n
+        Unauthenticated user is redirected to home page.
+    """
+    template_name = 'robot/project_import.html'
+
+    def get_project(self):
+        return get_object_or_404(Project.objects.filter(admin=self.request.user), pk=self.kwargs['pk'])
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, {'project': self.get_project(), 'formats': FORMATS})
+
+    def post(self, request, *args, **kwargs):
+        project = self.get_project()
+        upload = request.FILES.get('file')
+        file_format = request.POST.get('format', 'csv')
+        context = {'project': project, 'formats': FORMATS}
+        if upload is None:
+            context['error'] = 'File is required'
+            return render(request, self.template_name, context, status=400)
+        try:
+            lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            import_rows(project, request.user, parse_lines(lines, file_format))
+        except (ValueError, UnicodeDecodeError, csv.Error) as error:
+            context['error'] = str(error)
+            return render(request, self.template_name, context, status=400)
+        return redirect('project-detail', pk=project.pk)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            if not request.user.is_authenticated:
+                return redirect('home')
+            return super(ProjectImport, self).dispatch(request, *args, **kwargs)
+        except Http404:
+            return redirect('dashboard')
+
+
+class ProjectEvaluate(LoginRequiredMixin, View):
+    """
+        Solve inverse kinematics of targets for every robot of the project at once. \n
+        Result is a feasibility and joint margin matrix of robots and targets with robots ranked for the task. \n
+        Robots described by DH parameters or with incorrect links are not evaluated ("evaluated": false). \n
+        GET renders the page, targets are given one per line as "x, y, z, alpha" in "targets" parameter. \n
+        POST json body: {"targets": [[x, y, z, alpha], ...]} returns json result. \n
+        Only projects member can evaluate robots. \n
+        Unauthenticated user is redirected to home page.
+    """
+    template_name = 'robot/project_evaluate.html'
+
+    def get_project(self):
+        return get_object_or_404(Project.objects.filter(members=self.request.user), pk=self.kwargs['pk'])
+
+    def evaluate(self, project, targets):
+        robots = list(Robot.objects.filter(project=project))
+        if len(targets) > settings.KINEMATICS_EVALUATE_MAX_TARGETS:
+            raise ValueError('at most {} targets'.format(settings.KINEMATICS_EVALUATE_MAX_TARGETS))
+        lengths, ranges, defined = links_arrays([robot.get_links() for robot in robots])
+        # Robots described by dh_params are not the 4 joints preset, they are not evaluated
+        defined &= np.array([not robot.dh_params for robot in robots], dtype=bool)
+        result = evaluation_to_dict(evaluate_robots(lengths, ranges, targets, defined),
+                                    [robot.name for robot in robots])
+        result['robot_ids'] = [robot.pk for robot in robots]
+        result['evaluated'] = defined.tolist()
+        return result
+
+    def get(self, request, *args, **kwargs):
+        project = self.get_project()
+        text = request.GET.get('targets', '')
+        context = {'project': project, 'targets': text}
+        if text.strip():
+            try:
+                targets = [[float(value) for value in line.replace(',', ' ').split()]
+                           for line in text.splitlines() if line.strip()]
+                result = self.evaluate(project, targets)
+            except (TypeError, ValueError) as error:
+                context['error'] = 'Incorrect data: {}'.format(error)
+                return render(request, self.template_name, context, status=400)
+            context['result'] = result
+            context['rows'] = [{'id': result['robot_ids'][index], 'name': result['robots'][index],
+                                'feasible_count': result['feasible_count'][index],
+                                'evaluated': result['evaluated'][index],
+                                'cells': list(zip(result['feasible'][index], result['margin'][index],
+                                                  result['configs'][index]))}
+                               for index in result['ranking']]
+            context['target_rows'] = targets
+        return render(request, self.template_name, context)
+
+    def post(self, request, *args, **kwargs):
+        project = self.get_project()
+        try:
+            result = self.evaluate(project, json.loads(request.body)['targets'])
+        except (KeyError, TypeError, ValueError) as error:
+            return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+        return JsonResponse(result)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            if not request.user.is_authenticated:
+                return redirect('home')
+            return super(ProjectEvaluate, self).dispatch(request, *args, **kwargs)
+        except Http404:
+            return redirect('dashboard')
+
+
+class SceneUpdate(LoginRequiredMixin, UpdateView):
+    """
+        Update obstacles scene of the project, scene is created when the form is saved first time. \n
+        Only projects admin can edit scene. \n
+        Fields to modify: name, boxes, spheres, planes. \n
+        Unauthenticated user is redirected to home page.
+    """
+    template_name = 'robot/scene_update.html'
+    model = Scene
+    fields = ['name', 'boxes', 'spheres', 'planes']
+    context_object_name = 'scene'
+
+    def get_object(self, queryset=None):
+        project = get_object_or_404(Project.objects.filter(admin=self.request.user), pk=self.kwargs['pk'])
+        return Scene.objects.filter(project=project).first() or Scene(project=project)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['project'] = self.object.project
+        return context
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            if not request.user.is_authenticated:
+                return redirect('home')
+            return super(SceneUpdate, self).dispatch(request, *args, **kwargs)
+        except Http404:
+            return redirect('dashboard')
+
+
 class RobotCreate(LoginRequiredMixin, CreateView):
     """
         Create new robotic arm. \n
@@ -165,13 +461,14 @@ class RobotCreate(LoginRequiredMixin, CreateView):
         'project', 'name', 'description', 'notes', \n
         'link1', 'link2', 'link3', 'link4', 'link5', \n
         'link1_min', 'link2_min', 'link3_min', 'link4_min', 'link5_min', \n
-        'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max' \n
+        'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max', \n
+        'dh_params' - optional DH table of arms with other number of joints \n
         Logged user is add to owner field as initial value. \n
         Unauthenticated user is redirected to home page.
     """
     template_name = 'robot/robot_form.html'
     model = Robot
-    fields = ['project', 'name', 'description', 'notes', 'link1', 'link2', 'link3', 'link4', 'link5', 'link1_min', 'link2_min', 'link3_min', 'link4_min', 'link5_min', 'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max']
+    fields = ['project', 'name', 'description', 'notes', 'link1', 'link2', 'link3', 'link4', 'link5', 'link1_min', 'link2_min', 'link3_min', 'link4_min', 'link5_min', 'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max', 'dh_params', 'link1_vel', 'link2_vel', 'link3_vel', 'link4_vel', 'link1_acc', 'link2_acc', 'link3_acc', 'link4_acc']
 
     def get_form(self, *args, **kwargs):
         form = super().get_form(*args, **kwargs)  # Get the form as usual
@@ -197,7 +494,7 @@ class RobotUpdate(LoginRequiredMixin, UpdateView):
     """
     template_name = 'robot/robot_update.html'
     model = Robot
-    fields = ['name', 'description', 'notes', 'link1', 'link2', 'link3', 'link4', 'link5', 'link1_min', 'link2_min', 'link3_min', 'link4_min', 'link5_min', 'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max']
+    fields = ['name', 'description', 'notes', 'link1', 'link2', 'link3', 'link4', 'link5', 'link1_min', 'link2_min', 'link3_min', 'link4_min', 'link5_min', 'link1_max', 'link2_max', 'link3_max', 'link4_max', 'link5_max', 'dh_params', 'link1_vel', 'link2_vel', 'link3_vel', 'link4_vel', 'link1_acc', 'link2_acc', 'link3_acc', 'link4_acc']
     context_object_name = 'robot'
 
     def get_queryset(self):
@@ -236,9 +533,242 @@ class RobotDelete(LoginRequiredMixin, DeleteView):
             return redirect('dashboard')
 
 
+class RobotTrajectory(LoginRequiredMixin, View):
+    """
+        Fastest timing of a path under robots joints velocity and acceleration limits. \n
+        Json body: {"waypoints": [[theta1, theta2, theta3, theta4], ...]} or
+        {"targets": [[x, y, z, alpha], ...]} solved with minimal joint motion, optional "samples". \n
+        Every sample is flagged if the robot collides with itself or the floor, the path is not changed. \n
+        Only projects member can plan trajectories. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def post(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        try:
+            data = json.loads(request.body)
+            samples = min(int(data.get('samples', 200)), 5000)
+            if 'targets' in data:
+                waypoints, _, _, status = RoboticArm(robot.get_links()).ik_solve_sequence(data['targets'])
+                if waypoints is None:
+                    return HttpResponseBadRequest(status)
+            else:
+                waypoints = data['waypoints']
+            velocity, acceleration = robot.get_joint_limits()
+            path = interpolate_path(waypoints, samples)
+            profile = time_optimal_profile(path, velocity, acceleration)
+            collision = check_collisions(robot.get_chain().fk_positions(path))
+        except (KeyError, TypeError, ValueError) as error:
+            return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+        data = profile_to_dict(profile)
+        data['waypoints'] = np.round(waypoints, 2).tolist()
+        data['collision'] = collision.tolist()
+        data['collision_free'] = not collision.any()
+        return JsonResponse(data)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotTrajectory, self).dispatch(request, *args, **kwargs)
+
+
+class RobotPlan(LoginRequiredMixin, View):
+    """
+        Collision free joint space path between two configurations, smoothed and timed with robots joints limits. \n
+        Json body: {"goal": [theta1, theta2, theta3, theta4], "start": [...], "obstacles": [[x, y, z, r], ...],
+        "max_condition": 100}, start defaults to the pose of robots forward kinematics calculation,
+        configurations with larger jacobian condition number are avoided if max_condition is given. \n
+        Obstacles of the project scene are always checked, at most KINEMATICS_PLANNER_MAX_OBSTACLES can be sent. \n
+        Only projects member can plan motions. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def post(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        try:
+            data = json.loads(request.body)
+            start = data.get('start')
+            if start is None:
+                fk = get_object_or_404(ForwardKinematics, Robot=robot)
+                start = [fk.theta1, fk.theta2, fk.theta3, fk.theta4]
+            if len(data.get('obstacles') or []) > settings.KINEMATICS_PLANNER_MAX_OBSTACLES:
+                raise ValueError('At most {} obstacles are allowed'.format(settings.KINEMATICS_PLANNER_MAX_OBSTACLES))
+            chain = robot.get_chain()
+            scene = Scene.objects.filter(project=robot.project).first()
+            max_condition = data.get('max_condition')
+            planner = RrtConnect(chain, Validator(chain, data.get('obstacles'),
+                                                  scene=scene.get_index() if scene else None,
+                                                  max_condition=float(max_condition) if max_condition else None))
+            path, status = planner.plan(start, data['goal'], settings.KINEMATICS_PLANNER_TIMEOUT)
+        except (KeyError, TypeError, ValueError) as error:
+            return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+
+        result = {'status_calc': status, 'path': None, 'duration': None, 'stats': planner.stats}
+        if path is not None:
+            result['path'] = np.round(path, 2).tolist()
+            try:
+                velocity, acceleration = robot.get_joint_limits()
+                result['duration'] = round(time_optimal_profile(interpolate_path(path), velocity,
+                                                                acceleration)['duration'], 3)
+            except (TypeError, ValueError):
+                pass
+        return JsonResponse(result)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotPlan, self).dispatch(request, *args, **kwargs)
+
+
+class RobotSceneCheck(LoginRequiredMixin, View):
+    """
+        Check many configurations against obstacles of the project scene, self-collision and the floor. \n
+        Json body: {"thetas": [[theta1, theta2, theta3, theta4], ...]}, at most KINEMATICS_MAX_BATCH configurations. \n
+        Only projects member can check collisions. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def post(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        try:
+            thetas = np.array(json.loads(request.body)['thetas'], dtype=float, ndmin=2)
+            if len(thetas) > settings.KINEMATICS_MAX_BATCH:
+                raise ValueError('At most {} configurations are allowed'.format(settings.KINEMATICS_MAX_BATCH))
+            positions = robot.get_chain().fk_positions(thetas)
+        except (KeyError, TypeError, ValueError) as error:
+            return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+        scene = Scene.objects.filter(project=robot.project).first()
+        index = scene.get_index() if scene else None
+        return JsonResponse({
+            'scene_collision': index.collisions(positions).tolist() if index else [False] * len(positions),
+            'collision': check_collisions(positions).tolist(),
+            'scene': index.info() if index else None,
+        })
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotSceneCheck, self).dispatch(request, *args, **kwargs)
+
+
+class RobotTolerance(LoginRequiredMixin, View):
+    """
+        Monte Carlo analysis of end effector accuracy of the robot under links tolerances and joints errors. \n
+        Json body: {"poses": [[theta1, theta2, theta3, theta4], ...] or number of poses sampled across the workspace,
+        "length_tolerance": [link1 ... link5] in mm, "joint_tolerance": [theta1 ... theta4] in degrees,
+        "samples": 10000, "distribution": "normal" or "uniform", "confidence": 0.95} \n
+        Only projects member can run the analysis. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def post(self, request, *args, **kwargs):
+        robot = get_object_or_404(Robot.objects.filter(project__members=request.user), pk=self.kwargs['pk'])
+        try:
+            data = json.loads(request.body)
+            chain = robot.get_chain()
+            poses = data['poses']
+            samples = int(data.get('samples', 10000))
+            tolerance_sample_count(poses, samples, settings.KINEMATICS_TOLERANCE_MAX_SAMPLES)
+            if isinstance(poses, int):
+                poses = chain.sample(poses, seed=0)
+            result = tolerance_analysis(chain, poses, data['length_tolerance'], data['joint_tolerance'], samples,
+                                        data.get('distribution', 'normal'), float(data.get('confidence', 0.95)),
+                                        seed=0)
+        except (KeyError, TypeError, ValueError) as error:
+            return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+        result['poses'] = np.asarray(poses, dtype=float)
+        return JsonResponse(tolerance_summary(result))
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotTolerance, self).dispatch(request, *args, **kwargs)
+
+
+class RobotCalibration(LoginRequiredMixin, View):
+    """
+        Fit links lengths (and optionally joints offsets) of the robot to measured end effector positions. \n
+        POST CSV file with header and columns theta1, theta2, theta3, theta4, x, y, z, or json body:
+        {"samples": [[theta1, theta2, theta3, theta4, x, y, z], ...], "offsets": false, "apply": false} \n
+        Json body is limited by DATA_UPLOAD_MAX_MEMORY_SIZE (about 40 000 samples by default), larger datasets are
+        uploaded as CSV file, which is streamed to disk and may hold KINEMATICS_CALIBRATION_MAX_SAMPLES rows. \n
+        With apply robots described by DH parameters store the fitted DH table in dh_params, robots of the 4 joints
+        preset store only the fitted links lengths rounded to the nearest mm, so they stay usable by FK/IK forms
+        and jog. Joints offsets can not be stored in the preset, apply with offsets is rejected for it. \n
+        Only projects member can calibrate robot. \n
+        Unauthenticated user is redirected to home page.
+    """
+    template_name = 'robot/robot_calibration.html'
+
+    def get_robot(self):
+        return get_object_or_404(Robot.objects.filter(project__members=self.request.user), pk=self.kwargs['pk'])
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name, {'robot': self.get_robot()})
+
+    def apply(self, robot, result):
+        """
+            Store fitted DH table of robot described by DH parameters, or fitted links lengths of the 4 joints preset.
+        """
+        if robot.dh_params:
+            robot.dh_params = result['chain'].to_dict()
+        else:
+            for name, value in zip(result['parameters'], result['fitted']):
+                # d1 is link1, a2 ... a5 are link2 ... link5 of the preset
+                if name == 'd1' or name in ('a2', 'a3', 'a4', 'a5'):
+                    setattr(robot, 'link{}'.format(name[1]), int(round(value)))
+        robot.save()
+
+    def post(self, request, *args, **kwargs):
+        robot = self.get_robot()
+        json_request = request.content_type == 'application/json'
+        try:
+            if json_request:
+                try:
+                    body = request.body
+                except RequestDataTooBig:
+                    raise ValueError('json body is larger than {} bytes, upload samples as CSV file'.format(
+                        settings.DATA_UPLOAD_MAX_MEMORY_SIZE))
+                data = json.loads(body)
+                samples = np.array(data['samples'], dtype=float, ndmin=2)
+                offsets, apply = bool(data.get('offsets', False)), bool(data.get('apply', False))
+            else:
+                if 'file' not in request.FILES:
+                    raise ValueError('file is required')
+                samples = np.loadtxt(io.TextIOWrapper(request.FILES['file'].file, encoding='utf-8-sig'),
+                                     delimiter=',', skiprows=1, ndmin=2)
+                offsets, apply = 'offsets' in request.POST, 'apply' in request.POST
+            if apply and offsets and not robot.dh_params:
+                raise ValueError('joints offsets can not be stored in robot defined by links, fit without offsets')
+            if samples.shape[1] != 7:
+                raise ValueError('samples must have 7 columns')
+            if len(samples) > settings.KINEMATICS_CALIBRATION_MAX_SAMPLES:
+                raise ValueError('at most {} samples'.format(settings.KINEMATICS_CALIBRATION_MAX_SAMPLES))
+            result = calibrate(robot.get_chain(), samples[:, :4], samples[:, 4:], offsets)
+        except (KeyError, TypeError, ValueError) as error:
+            if json_request:
+                return HttpResponseBadRequest('Incorrect data: {}'.format(error))
+            return render(request, self.template_name, {'robot': robot, 'error': 'Incorrect data: {}'.format(error)},
+                          status=400)
+        if apply:
+            self.apply(robot, result)
+
+        data = calibration_to_dict(result)
+        data['applied'] = apply
+        if json_request:
+            return JsonResponse(data)
+        rows = zip(data['parameters'], data['nominal'], data['fitted'], data['std_error'])
+        return render(request, self.template_name, {'robot': robot, 'result': data, 'rows': rows, 'applied': apply})
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(RobotCalibration, self).dispatch(request, *args, **kwargs)
+
+
 class FkCreate(LoginRequiredMixin, CreateView):
     """
-        Create forward kinematics calculation record. \n
+        Create forward kinematics calculation record, results are calculated in the background. \n
         Fields to modify: 'Robot', 'name', 'notes', 'theta1', 'theta2', 'theta3', 'theta4' \n
         Unauthenticated user is redirected to home page.
     """
@@ -254,11 +784,17 @@ class FkCreate(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.modified_by = self.request.user
+        if form.instance.Robot.dh_params:
+            form.add_error('Robot', 'Forward kinematics of robots described by DH parameters is not supported')
+            return self.form_invalid(form)
 
         if form.is_valid():
             form.instance.modified = datetime.datetime.now()
             form.save()
-        return super(FkCreate, self).form_valid(form)
+        response = super(FkCreate, self).form_valid(form)
+        # Results are calculated in the background, the update page shows progress until status is set
+        enqueue_calculation(self.object, calculate_fk_records, FK_RESULT_FIELDS)
+        return response
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -294,57 +830,19 @@ class FkUpdate(LoginRequiredMixin, UpdateView):
         context['link3_max'] = self.get_object().Robot.link3_max
         context['link4_max'] = self.get_object().Robot.link4_max
         context['link5_max'] = self.get_object().Robot.link5_max
+        context['jog_fps'] = settings.KINEMATICS_JOG_FPS
 
         return context
 
-    def calculate_fk(self, theta1, theta2, theta3, theta4):
-        """
-            Calculate forward kinematics of robotic arm.
-            :param theta1: theta1 value
-            :param theta2: theta2 value
-            :param theta3: theta3 value
-            :param theta4: theta4 value
-            :return: result_xyz, dh_table
-        """
-        context = self.get_context_data()
-        links = {"link1": [context['link1'], context['link1_min'], context['link1_max']],
-                 "link2": [context['link2'], context['link2_min'], context['link2_max']],
-                 "link3": [context['link3'], context['link3_min'], context['link3_max']],
-                 "link4": [context['link4'], context['link4_min'], context['link4_max']],
-                 "link5": [context['link5'], context['link5_min'], context['link5_max']]}
-        Robot_FK = RoboticArm(links)
-        result_xyz = Robot_FK.fk_solve_auto(theta1, theta2, theta3, theta4)
-        dh_table = Robot_FK.fk_dh(theta1, theta2, theta3, theta4)
-        return result_xyz, dh_table
-
     def form_valid(self, form):
         form.instance.modified_by = self.request.user
-
-        theta1 = form.instance.theta1
-        theta2 = form.instance.theta2
-        theta3 = form.instance.theta3
-        theta4 = form.instance.theta4
-
-        try:
-            calculation = self.calculate_fk(theta1, theta2, theta3, theta4)
-            x = calculation[0][1][0][0]
-            y = calculation[0][1][1][1]
-            z = calculation[0][1][2][2]
-            alpha = calculation[0][0]
-
-        except:
-            x = 0
-            y = 0
-            z = 0
-            alpha = 0
-            print("form invalid")
+        if form.instance.Robot.dh_params:
+            form.add_error(None, 'Forward kinematics of robots described by DH parameters is not supported')
+            return self.form_invalid(form)
 
         if form.is_valid():
-            form.instance.x = x
-            form.instance.y = y
-            form.instance.z = z
-            form.instance.alpha = alpha
-
+            # End effector position and orientation, the same calculation as the bulk recalculation of the robot
+            calculate_fk_records([form.instance])
             form.instance.modified = datetime.datetime.now()
             form.save()
 
@@ -356,9 +854,124 @@ class FkUpdate(LoginRequiredMixin, UpdateView):
         return super(FkUpdate, self).dispatch(request, *args, **kwargs)
 
 
+class CalculationStatus(LoginRequiredMixin, View):
+    """
+        Progress of the background calculation of stored record as json. \n
+        status: "pending", "done" or "failed", results are given when done. \n
+        Calculation pending longer than KINEMATICS_TASK_TIMEOUT seconds is started again. \n
+        Only projects member can see the calculation. \n
+        Unauthenticated user is redirected to home page.
+    """
+    model = None
+    fields = None
+    calculate = None
+
+    def get(self, request, *args, **kwargs):
+        record = get_object_or_404(self.model.objects.filter(Robot__project__members=request.user),
+                                   pk=self.kwargs['pk'])
+        if record.status is None:
+            resume_stale_calculation(record, self.calculate, self.fields)
+            return JsonResponse({'status': 'pending'})
+        if not record.status:
+            return JsonResponse({'status': 'failed'})
+        data = {'status': 'done', 'modified': record.modified}
+        data.update({name: getattr(record, name) for name in self.fields})
+        return JsonResponse(data)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(CalculationStatus, self).dispatch(request, *args, **kwargs)
+
+
+class FkStatus(CalculationStatus):
+    model = ForwardKinematics
+    fields = FK_RESULT_FIELDS
+    calculate = staticmethod(calculate_fk_records)
+
+
+JOG_CACHE_ERROR = 'Live jog needs cache shared between worker processes, configure CACHES'
+
+
+def jog_robot_error(fk):
+    """
+        Reason the robot of forward kinematics record can not be jogged, None if it can. \n
+        Jog uses the 4 joints preset, robots described by DH parameters or with incorrect links are rejected.
+    """
+    if fk.Robot.dh_params:
+        return 'Live jog of robots described by DH parameters is not supported'
+    if not links_arrays([fk.Robot.get_links()])[2][0]:
+        return 'Robots links are not defined correctly'
+    return None
+
+
+class FkJog(LoginRequiredMixin, View):
+    """
+        Receive slider state of live jog mode. \n
+        Nothing is saved to database, only the newest state is kept for the stream. \n
+        Thetas must be finite numbers, robot must be possible to jog (see FkJogStream). \n
+        Status 503 is returned if the cache is not shared between worker processes and DEBUG is off. \n
+        Only projects member can jog robotic arm. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def post(self, request, *args, **kwargs):
+        fk = get_object_or_404(ForwardKinematics.objects.select_related('Robot').filter(
+            Robot__project__members=request.user), pk=self.kwargs['pk'])
+        if not jog_cache_shared() and not settings.DEBUG:
+            return HttpResponse(JOG_CACHE_ERROR, status=503)
+        error = jog_robot_error(fk)
+        if error:
+            return HttpResponseBadRequest(error)
+        try:
+            thetas = [float(request.POST[name]) for name in ('theta1', 'theta2', 'theta3', 'theta4')]
+        except (KeyError, ValueError):
+            return HttpResponseBadRequest('Thetas values must be float')
+        if not np.all(np.isfinite(thetas)):
+            return HttpResponseBadRequest('Thetas values must be finite')
+        jog_publish(request.user.pk, fk.pk, thetas)
+        return HttpResponse(status=204)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(FkJog, self).dispatch(request, *args, **kwargs)
+
+
+class FkJogStream(LoginRequiredMixin, View):
+    """
+        Stream forward kinematics results of live jog mode as server-sent events. \n
+        Slider changes are coalesced to KINEMATICS_JOG_FPS frames per second. \n
+        Robots described by DH parameters or with incorrect links are rejected, jog uses the 4 joints preset. \n
+        Status 503 is returned if the cache is not shared between worker processes and DEBUG is off. \n
+        Only projects member can jog robotic arm. \n
+        Unauthenticated user is redirected to home page.
+    """
+
+    def get(self, request, *args, **kwargs):
+        fk = get_object_or_404(ForwardKinematics.objects.select_related('Robot').filter(
+            Robot__project__members=request.user), pk=self.kwargs['pk'])
+        if not jog_cache_shared() and not settings.DEBUG:
+            return HttpResponse(JOG_CACHE_ERROR, status=503)
+        error = jog_robot_error(fk)
+        if error:
+            return HttpResponseBadRequest(error)
+        robot_fk = RoboticArm(fk.Robot.get_links())
+        response = StreamingHttpResponse(jog_events(robot_fk, request.user.pk, fk.pk),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('home')
+        return super(FkJogStream, self).dispatch(request, *args, **kwargs)
+
+
 class IkCreate(LoginRequiredMixin, CreateView):
     """
-        Create inverse kinematics calculation record. \n
+        Create inverse kinematics calculation record, results are calculated in the background. \n
         Fields to modify: 'Robot', 'name', 'notes', 'x', 'y', 'z', 'alpha' \n
         Unauthenticated user is redirected to home page.
     """
@@ -374,11 +987,17 @@ class IkCreate(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.modified_by = self.request.user
+        if form.instance.Robot.dh_params:
+            form.add_error('Robot', 'Inverse kinematics of robots described by DH parameters is not supported')
+            return self.form_invalid(form)
 
         if form.is_valid():
             form.instance.modified = datetime.datetime.now()
             form.save()
-        return super(IkCreate, self).form_valid(form)
+        response = super(IkCreate, self).form_valid(form)
+        # Results are calculated in the background, the update page shows progress until status is set
+        enqueue_calculation(self.object, calculate_ik_records, IK_RESULT_FIELDS)
+        return response
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -386,6 +1005,12 @@ class IkCreate(LoginRequiredMixin, CreateView):
         return super(IkCreate, self).dispatch(request, *args, **kwargs)
 
 
+class IkStatus(CalculationStatus):
+    model = InverseKinematics
+    fields = IK_RESULT_FIELDS
+    calculate = staticmethod(calculate_ik_records)
+
+
 class IkUpdate(LoginRequiredMixin, UpdateView):
     """
         Display and update inverse kinematics calculation. \n
@@ -417,65 +1042,15 @@ class IkUpdate(LoginRequiredMixin, UpdateView):
 
         return context
 
-    def calculate_ik(self, x, y, z, alpha):
-        """
-            Calculate inverse kinematics of robotic arm.
-            :param x: x values
-            :param y: y value
-            :param z: z value
-            :param alpha: alpha value
-            :return: config1, config2
-            """
-        context = self.get_context_data()
-        links = {"link1": [context['link1'], context['link1_min'], context['link1_max']],
-                 "link2": [context['link2'], context['link2_min'], context['link2_max']],
-                 "link3": [context['link3'], context['link3_min'], context['link3_max']],
-                 "link4": [context['link4'], context['link4_min'], context['link4_max']],
-                 "link5": [context['link5'], context['link5_min'], context['link5_max']]}
-        Robot_IK = RoboticArm(links)
-        Robot_IK.ik_solver(x, y, z, alpha)
-        config_1 = Robot_IK.ik_get_config1()
-        config_2 = Robot_IK.ik_get_config2()
-        return config_1, config_2
-
     def form_valid(self, form):
         form.instance.modified_by = self.request.user
-
-        x = form.instance.x
-        y = form.instance.y
-        z = form.instance.z
-        alpha = form.instance.alpha
-
-        try:
-            calculation = self.calculate_ik(x, y, z , alpha)
-            theta1 = calculation[0][0][0]
-            theta2 = calculation[0][0][1]
-            theta3 = calculation[0][0][2]
-            theta4 = calculation[0][0][3]
-            theta11 = calculation[1][0][0]
-            theta22 = calculation[1][0][1]
-            theta33 = calculation[1][0][2]
-            theta44 = calculation[1][0][3]
-        except:
-            theta1 = 0
-            theta2 = 0
-            theta3 = 0
-            theta4 = 0
-            theta11 = 0
-            theta22 = 0
-            theta33 = 0
-            theta44 = 0
-            print("form invalid")
+        if form.instance.Robot.dh_params:
+            form.add_error(None, 'Inverse kinematics of robots described by DH parameters is not supported')
+            return self.form_invalid(form)
 
         if form.is_valid():
-            form.instance.theta1 = theta1
-            form.instance.theta2 = theta2
-            form.instance.theta3 = theta3
-            form.instance.theta4 = theta4
-            form.instance.theta11 = theta11
-            form.instance.theta22 = theta22
-            form.instance.theta33 = theta33
-            form.instance.theta44 = theta44
+            # Both configurations, the same calculation as the bulk recalculation of the robot
+            calculate_ik_records([form.instance])
             form.instance.modified = datetime.datetime.now()
             form.save()
 
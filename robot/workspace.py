@@ -0,0 +1,195 @@
+""" Module allows workspace of robotic arm to be sampled and streamed in levels of detail"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from robot.artifacts import store, geometry_hash
+from robot.kinematic_chain import sweep_positions
+
+# Number of configurations evaluated at once
+CHUNK_SIZE = 65536
+
+
+def grid_samples(dof: int, samples_per_joint: int, max_points: int) -> int:
+    """
+    Values of every joint of the regular grid, lowered so the grid has at most max_points configurations.\n
+    :param dof: Number of joints
+    :param samples_per_joint: Requested number of values of every joint
+    :param max_points: Largest number of configurations
+    :return: Number of values of every joint, at least 2
+    """
+    samples = 2
+    while samples < samples_per_joint and (samples + 1) ** dof <= max_points:
+        samples += 1
+    return samples
+
+
+def joint_grid(chain, samples_per_joint: int, start: int, stop: int) -> np.array:
+    """
+    Part of the regular grid of configurations inside joints ranges.\n
+    :param chain: KinematicChain
+    :param samples_per_joint: Number of values of every joint
+    :param start: First flat index of the grid
+    :param stop: Last flat index of the grid (exclusive)
+    :return: Array of shape (stop - start, dof)
+    """
+    values = np.linspace(chain.ranges[:, 0], chain.ranges[:, 1], samples_per_joint)
+    indices = np.unravel_index(np.arange(start, stop), (samples_per_joint,) * chain.dof)
+    return values[np.stack(indices, axis=-1), np.arange(chain.dof)]
+
+
+def sample_workspace(chain, samples_per_joint: int = 16) -> np.array:
+    """
+    End effector positions over the regular grid of configurations, calculated in chunks.\n
+    Outer joints are iterated, inner joints are swept at once reusing the prefix transforms of outer joints.\n
+    :param chain: KinematicChain
+    :param samples_per_joint: Number of values of every joint
+    :return: Array of shape (samples_per_joint ** dof, 3), float32
+    """
+    values = np.linspace(chain.ranges[:, 0], chain.ranges[:, 1], samples_per_joint).T
+    # Number of outer joints, so one sweep of inner joints fits into CHUNK_SIZE
+    outer = 0
+    while outer < chain.dof - 1 and samples_per_joint ** (chain.dof - outer) > CHUNK_SIZE:
+        outer += 1
+    inner = samples_per_joint ** (chain.dof - outer)
+
+    points = np.empty((samples_per_joint ** chain.dof, 3), dtype=np.float32)
+    for number, index in enumerate(np.ndindex(*(samples_per_joint,) * outer)):
+        grids = [values[joint, [i]] for joint, i in enumerate(index)] + list(values[outer:])
+        points[number * inner:(number + 1) * inner] = sweep_positions(chain, grids).reshape(-1, 3)
+    return points
+
+
+def workspace_points(chain, samples_per_joint: int = 16) -> np.array:
+    """
+    Sampled workspace stored as shared on disk artifact, built on first use.\n
+    :param chain: KinematicChain
+    :param samples_per_joint: Number of values of every joint
+    :return: Read only numpy.memmap of shape (samples_per_joint ** dof, 3)
+    """
+    return store.get_or_build('workspace-{}'.format(samples_per_joint), geometry_hash(chain),
+                              lambda: sample_workspace(chain, samples_per_joint))
+
+
+def morton_encode(cells: np.array) -> np.array:
+    """
+    Interleave bits of integer cell coordinates, cells of one octree node are contiguous in the order.\n
+    :param cells: Array of shape (n, 3) with values below 2 ** 21
+    :return: Array of shape (n,), uint64
+    """
+    cells = cells.astype(np.uint64)
+    codes = np.zeros(len(cells), dtype=np.uint64)
+    for axis in range(3):
+        value = cells[:, axis] & np.uint64(0x1fffff)
+        value = (value | value << np.uint64(32)) & np.uint64(0x1f00000000ffff)
+        value = (value | value << np.uint64(16)) & np.uint64(0x1f0000ff0000ff)
+        value = (value | value << np.uint64(8)) & np.uint64(0x100f00f00f00f00f)
+        value = (value | value << np.uint64(4)) & np.uint64(0x10c30c30c30c30c3)
+        value = (value | value << np.uint64(2)) & np.uint64(0x1249249249249249)
+        codes |= value << np.uint64(axis)
+    return codes
+
+
+class WorkspaceOctree:
+    """ Class allows sampled workspace to be decimated into octree levels of detail.
+    Level L keeps one point (centroid) per occupied cell of 2^L x 2^L x 2^L grid.
+    Levels above tile_level are split into tiles - occupied cells of tile_level grid.\n """
+
+    def __init__(self, points: np.array, max_level: int = 7, tile_level: int = 2) -> None:
+        """
+        :param points: Array of shape (n, 3)
+        :param max_level: Finest level of detail
+        :param tile_level: Level of the grid splitting finer levels into tiles
+        """
+        points = np.asarray(points, dtype=np.float64)
+        self.max_level = max_level
+        self.tile_level = min(tile_level, max_level)
+        self.origin = points.min(axis=0)
+        self.size = float(np.max(points.max(axis=0) - self.origin)) or 1.0
+
+        # Finest cells, points sorted by morton code once for all levels
+        cells = np.floor((points - self.origin) / self.size * 2 ** max_level)
+        cells = np.clip(cells, 0, 2 ** max_level - 1)
+        codes = morton_encode(cells)
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        points = points[order]
+
+        self.codes = []
+        self.centroids = []
+        self.counts = []
+        for level in range(max_level + 1):
+            level_codes = codes >> np.uint64(3 * (max_level - level))
+            starts = np.flatnonzero(np.concatenate([[True], level_codes[1:] != level_codes[:-1]]))
+            counts = np.diff(np.append(starts, len(level_codes)))
+            sums = np.add.reduceat(points, starts, axis=0)
+            self.codes.append(level_codes[starts])
+            self.centroids.append((sums / counts[:, None]).astype(np.float32))
+            self.counts.append(counts)
+
+    def _tile_shift(self, level: int) -> np.uint64:
+        return np.uint64(3 * (level - self.tile_level))
+
+    def tiles(self, level: int) -> list:
+        """
+        Tiles of the level, single tile 0 for levels not finer than tile_level.\n
+        :param level: Level of detail
+        :return: list of tile codes
+        """
+        if level <= self.tile_level:
+            return [0]
+        return np.unique(self.codes[level] >> self._tile_shift(level)).tolist()
+
+    def tile(self, level: int, tile: int):
+        """
+        Points of one tile of the level.\n
+        :param level: Level of detail
+        :param tile: Tile code returned by tiles
+        :return: centroids (k, 3), counts (k,) - number of dense samples represented by each point
+        """
+        if level <= self.tile_level:
+            return self.centroids[level], self.counts[level]
+        shift = self._tile_shift(level)
+        start, stop = np.searchsorted(self.codes[level], [np.uint64(tile) << shift, np.uint64(tile + 1) << shift])
+        return self.centroids[level][start:stop], self.counts[level][start:stop]
+
+    def info(self) -> dict:
+        """
+        Json serializable description of the octree.\n
+        :return: dictionary
+        """
+        return {
+            'origin': self.origin.tolist(),
+            'size': self.size,
+            'max_level': self.max_level,
+            'tile_level': self.tile_level,
+            'points': [len(codes) for codes in self.codes],
+            'tiles': [self.tiles(level) for level in range(self.max_level + 1)],
+        }
+
+
+_octrees = OrderedDict()
+_octrees_lock = threading.Lock()
+OCTREE_CACHE_SIZE = 4
+
+
+def workspace_octree(chain, samples_per_joint: int = 16, max_level: int = 7) -> WorkspaceOctree:
+    """
+    Octree of the sampled workspace, cached in the process per robots geometry.\n
+    :param chain: KinematicChain
+    :param samples_per_joint: Number of values of every joint of the dense sample
+    :param max_level: Finest level of detail
+    :return: WorkspaceOctree
+    """
+    key = (geometry_hash(chain), samples_per_joint, max_level)
+    with _octrees_lock:
+        if key in _octrees:
+            _octrees.move_to_end(key)
+            return _octrees[key]
+    octree = WorkspaceOctree(workspace_points(chain, samples_per_joint), max_level)
+    with _octrees_lock:
+        _octrees[key] = octree
+        while len(_octrees) > OCTREE_CACHE_SIZE:
+            _octrees.popitem(last=False)
+    return octree
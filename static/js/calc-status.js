@@ -0,0 +1,28 @@
+/*
+ * Background calculation progress: status of the record is polled until the calculation ends,
+ * then the page is reloaded to show its results.
+ */
+(function () {
+  const element = document.getElementById('calc-status');
+  if (!element) {
+    return;
+  }
+  const interval = 1000;
+
+  function poll() {
+    fetch(element.dataset.statusUrl, {headers: {'Accept': 'application/json'}})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        if (data.status === 'pending') {
+          setTimeout(poll, interval);
+        } else if (data.status === 'done') {
+          window.location.reload();
+        } else {
+          element.textContent = 'Calculation failed, check robots links and submit again';
+        }
+      })
+      .catch(function () { setTimeout(poll, interval); });
+  }
+
+  setTimeout(poll, interval);
+})();
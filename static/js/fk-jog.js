@@ -0,0 +1,62 @@
+/*
+ * Live jog mode: slider changes are sent at most once per frame,
+ * forward kinematics results are received from the server-sent events stream.
+ */
+(function () {
+  const panel = document.getElementById('jog-panel');
+  if (!panel) {
+    return;
+  }
+  const sliders = panel.querySelectorAll('input[type=range]');
+  const csrf = document.querySelector('[name=csrfmiddlewaretoken]').value;
+  const frameTime = 1000 / parseInt(panel.dataset.fps, 10);
+  let pending = false;
+  let lastSent = 0;
+  let source = null;
+
+  function send() {
+    pending = false;
+    lastSent = performance.now();
+    const data = new FormData();
+    sliders.forEach(function (slider) { data.append(slider.dataset.theta, slider.value); });
+    fetch(panel.dataset.jogUrl, {method: 'POST', headers: {'X-CSRFToken': csrf}, body: data});
+  }
+
+  function connect() {
+    if (source) {
+      return;
+    }
+    source = new EventSource(panel.dataset.streamUrl);
+    source.onmessage = function (event) {
+      const frame = JSON.parse(event.data);
+      ['x', 'y', 'z', 'alpha'].forEach(function (name) {
+        document.getElementById('jog-' + name).textContent = frame[name];
+      });
+      document.getElementById('jog-collision').textContent = frame.collision ? 'Collision' : 'OK';
+    };
+    // Stream is closed by the server when sliders are idle, next change opens it again
+    source.onerror = function () {
+      source.close();
+      source = null;
+    };
+  }
+
+  function schedule(event) {
+    document.getElementById('jog-value-' + event.target.dataset.theta).textContent = event.target.value;
+    connect();
+    if (pending) {
+      return;
+    }
+    pending = true;
+    setTimeout(send, Math.max(0, frameTime - (performance.now() - lastSent)));
+  }
+
+  sliders.forEach(function (slider) { slider.addEventListener('input', schedule); });
+
+  document.getElementById('jog-save').addEventListener('click', function () {
+    sliders.forEach(function (slider) {
+      document.getElementById('id_' + slider.dataset.theta).value = slider.value;
+    });
+    document.getElementById('id_theta1').form.submit();
+  });
+})();
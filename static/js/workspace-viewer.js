@@ -0,0 +1,87 @@
+/*
+ * Workspace viewer: loads octree levels of robots workspace from coarse to fine.
+ * Left half - top view (x, y), right half - side view (x, z).
+ */
+(function () {
+  const canvas = document.getElementById('workspace-canvas');
+  if (!canvas) {
+    return;
+  }
+  const status = document.getElementById('workspace-status');
+  const refine = document.getElementById('workspace-refine');
+  const infoUrl = canvas.dataset.url;
+  // Levels are loaded automatically while they have less points than the budget
+  const budget = parseInt(canvas.dataset.budget || '20000', 10);
+  let info = null;
+  let level = -1;
+  let points = new Float32Array(0);
+
+  function tileUrl(level, tile) {
+    return infoUrl + level + '/' + tile + '/';
+  }
+
+  // Workspace is built in the background, 202 responses are repeated until it is ready
+  function fetchReady(url) {
+    return fetch(url).then(function (response) {
+      if (response.status === 202) {
+        return new Promise(function (resolve) { setTimeout(resolve, 1000); }).then(function () {
+          return fetchReady(url);
+        });
+      }
+      return response.json();
+    });
+  }
+
+  function draw() {
+    const context = canvas.getContext('2d');
+    const half = canvas.width / 2;
+    const scale = Math.min(half, canvas.height) * 0.9 / info.size;
+    context.clearRect(0, 0, canvas.width, canvas.height);
+    context.fillStyle = 'rgba(203, 12, 159, 0.35)';
+    for (let i = 0; i < points.length; i += 3) {
+      const x = (points[i] - info.origin[0]) * scale + half * 0.05;
+      const y = (points[i + 1] - info.origin[1]) * scale;
+      const z = (points[i + 2] - info.origin[2]) * scale;
+      context.fillRect(x, canvas.height * 0.95 - y, 2, 2);
+      context.fillRect(half + x, canvas.height * 0.95 - z, 2, 2);
+    }
+  }
+
+  async function loadLevel(next) {
+    refine.disabled = true;
+    status.textContent = 'Loading level ' + next + '...';
+    const tiles = await Promise.all(info.tiles[next].map(function (tile) {
+      return fetchReady(tileUrl(next, tile));
+    }));
+    let length = 0;
+    tiles.forEach(function (tile) { length += tile.points.length; });
+    const merged = new Float32Array(length);
+    let offset = 0;
+    tiles.forEach(function (tile) {
+      merged.set(tile.points, offset);
+      offset += tile.points.length;
+    });
+    points = merged;
+    level = next;
+    draw();
+    status.textContent = 'Level ' + level + ' of ' + info.max_level + ': ' + info.points[level] + ' points';
+    refine.disabled = level >= info.max_level;
+  }
+
+  async function start() {
+    status.textContent = 'Sampling workspace...';
+    info = await fetchReady(infoUrl);
+    let next = 0;
+    do {
+      await loadLevel(next);
+      next += 1;
+    } while (next <= info.max_level && info.points[next] <= budget);
+  }
+
+  refine.addEventListener('click', function () {
+    if (info && level < info.max_level) {
+      loadLevel(level + 1);
+    }
+  });
+  start();
+})();